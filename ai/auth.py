@@ -0,0 +1,205 @@
+"""
+OAuth-токены Sber API (GigaChat, SaluteSpeech).
+
+Токен живет 30 минут и выдается по POST на GIGACHAT_OAUTH_URL с ключом
+авторизации и scope. TokenManager хранит токен одного scope:
+- обновление single-flight: сколько бы запросов ни пришло к моменту
+  истечения токена, в OAuth уходит один POST, остальные ждут его результат;
+- фоновая задача обновляет токен заранее (за TOKEN_REFRESH_MARGIN секунд до
+  expires_at), поэтому запросы пользователей не ждут OAuth;
+- POST в OAuth повторяется при временных ошибках и не отправляется, пока
+  breaker сервиса разомкнут (если передан ResilientCaller).
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+
+from config import DEBUG, AI_TIMEOUT, GIGACHAT_OAUTH_URL
+from ai.resilience import APIError, Deadline, ResilientCaller
+
+# За сколько секунд до истечения токен обновляется в фоне
+TOKEN_REFRESH_MARGIN = 300
+
+# Токен отдается запросам, пока до истечения больше этого запаса (секунд)
+TOKEN_EXPIRY_SAFETY = 60
+
+# Пауза перед повтором после неудачного фонового обновления (секунд)
+TOKEN_RETRY_DELAY = 10
+
+
+class TokenManager:
+    """Токен доступа одного scope с single-flight и фоновым обновлением"""
+
+    def __init__(
+        self,
+        auth_key: Optional[str],
+        scope: str,
+        session_getter: Optional[Callable[[], aiohttp.ClientSession]] = None,
+        oauth_url: str = GIGACHAT_OAUTH_URL,
+        caller: Optional[ResilientCaller] = None
+    ):
+        """
+        Args:
+            auth_key: Authorization Key из кабинета (Basic)
+            scope: GIGACHAT_API_PERS, SALUTE_SPEECH_PERS и т.д.
+            session_getter: Функция, возвращающая общую HTTP-сессию сервиса
+                (без нее для каждого обновления открывается своя сессия)
+            oauth_url: Адрес OAuth
+            caller: Повторы и circuit breaker сервиса (без него - одна попытка)
+        """
+        self.auth_key = auth_key
+        self.scope = scope
+        self.oauth_url = oauth_url
+        self._session_getter = session_getter
+        self._caller = caller
+
+        self.access_token: Optional[str] = None
+        self.expires_at = 0.0
+        self._valid_until = 0.0
+        self._refresh_at = 0.0
+
+        self._lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+
+        # Счетчики
+        self.refreshes = 0
+        self.failures = 0
+        self.cached = 0
+        self.waited = 0
+
+    def _is_valid(self) -> bool:
+        return bool(self.access_token) and time.time() < self._valid_until
+
+    async def get_token(self) -> str:
+        """Возвращает действующий токен, при необходимости дожидаясь единственного обновления"""
+        if self._is_valid():
+            self.cached += 1
+            return self.access_token
+
+        self.waited += 1
+        async with self._lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            if not self._is_valid():
+                await self._fetch_token()
+        self._ensure_refresher()
+        return self.access_token
+
+    def start(self) -> None:
+        """Запускает фоновое обновление (первый токен запрашивается сразу)"""
+        if self.auth_key:
+            self._ensure_refresher()
+
+    async def close(self) -> None:
+        """Останавливает фоновое обновление"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики обновлений и обращений к токену"""
+        return {
+            'scope': self.scope,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'cached': self.cached,
+            'waited': self.waited,
+            'expires_in': max(0, int(self.expires_at - time.time())),
+        }
+
+    def _ensure_refresher(self) -> None:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """Обновляет токен заранее, до того как он понадобится запросам"""
+        while True:
+            delay = self._refresh_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                async with self._lock:
+                    if time.time() >= self._refresh_at:
+                        await self._fetch_token()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Фоновое обновление токена {self.scope} не удалось: {e}")
+                await asyncio.sleep(TOKEN_RETRY_DELAY)
+
+    async def _fetch_token(self) -> None:
+        """
+        POST на OAuth (вызывается под self._lock):
+        Authorization: Basic {authorization_key}
+        scope: {scope}
+        """
+        if not self.auth_key:
+            raise ValueError(f"Ключ авторизации для {self.scope} не установлен в .env")
+
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+            'RqUID': str(uuid.uuid4()),
+            'Authorization': f'Basic {self.auth_key}'
+        }
+        data = {'scope': self.scope}
+
+        if DEBUG:
+            print(f"🔑 Запрашиваю токен {self.scope}...")
+
+        async def request(deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+            timeout = deadline.cap(AI_TIMEOUT) if deadline is not None else AI_TIMEOUT
+            if self._session_getter is not None:
+                return await self._post(self._session_getter(), headers, data, timeout)
+            async with aiohttp.ClientSession() as session:
+                return await self._post(session, headers, data, timeout)
+
+        try:
+            if self._caller is not None:
+                result = await self._caller.call(request)
+            else:
+                result = await request()
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ Ошибка при получении токена {self.scope}: {e}")
+            raise
+
+        fetched_at = time.time()
+        self.access_token = result['access_token']
+        # expires_at в миллисекундах, переводим в секунды
+        self.expires_at = result.get('expires_at', 0) / 1000
+        # Обновляем за TOKEN_REFRESH_MARGIN до истечения, но не раньше середины срока жизни
+        # (запасы сокращаются для токенов с коротким сроком жизни)
+        lifetime = max(0.0, self.expires_at - fetched_at)
+        self._refresh_at = self.expires_at - min(TOKEN_REFRESH_MARGIN, lifetime / 2)
+        self._valid_until = self.expires_at - min(TOKEN_EXPIRY_SAFETY, lifetime / 4)
+        self.refreshes += 1
+
+        if DEBUG:
+            print(f"✅ Токен {self.scope} получен, действителен до: {time.ctime(self.expires_at)}")
+
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        headers: Dict[str, str],
+        data: Dict[str, str],
+        timeout: float = AI_TIMEOUT
+    ) -> Dict[str, Any]:
+        async with session.post(
+            self.oauth_url,
+            headers=headers,
+            data=data,
+            ssl=False,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise APIError(response.status, f"Ошибка получения токена: {response.status} - {error_text}")
+            return await response.json()
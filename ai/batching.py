@@ -0,0 +1,181 @@
+"""
+Микро-батчинг анализов еды (необязательный, AI_BATCH_ENABLED).
+
+В часы пик одновременно идут десятки независимых запросов к GigaChat,
+и каждый несет полный промпт kbju_prompt.txt. BatchScheduler копит запросы
+не дольше max_wait секунд (или до max_size штук) и отправляет их одним
+запросом с пронумерованными текстами; ответ {"results": [{"id": N, ...}]}
+раскладывается обратно по ожидающим.
+
+- Один запрос в пачке отправляется обычным одиночным вызовом.
+- Если ответ пачки не разобрался (нет JSON, не хватает id), каждый текст
+  пачки отправляется отдельным одиночным вызовом.
+- Ошибка HTTP-запроса пачки передается всем ее ожидающим.
+- Отмененный ожидающий просто не получает результат; если до отправки
+  отменены все, запрос не отправляется.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ai.parsing import extract_json_objects
+
+# Заголовок списка текстов в промпте пачки
+BATCH_HEADER = 'Тексты пользователей:'
+
+# Инструкция к пачке (добавляется после промпта анализа)
+BATCH_INSTRUCTIONS = (
+    'Ниже {count} независимых текстов пользователей, пронумерованных по порядку. '
+    'Разбери каждый текст отдельно по правилам выше и верни ТОЛЬКО JSON вида:\n'
+    '{{"results": [{{"id": 1, "dishes": [...]}}, {{"id": 2, "dishes": [...]}}]}}\n'
+    'В results должен быть ровно один элемент на каждый номер.'
+)
+
+
+def build_batch_prompt(prompt_text: str, texts: List[str]) -> str:
+    """Промпт пачки: промпт анализа, инструкция и пронумерованные тексты"""
+    lines = [f'{i}. {" ".join(text.split())}' for i, text in enumerate(texts, 1)]
+    return '\n\n'.join([
+        prompt_text,
+        BATCH_INSTRUCTIONS.format(count=len(texts)),
+        BATCH_HEADER + '\n' + '\n'.join(lines),
+    ])
+
+
+def parse_batch_response(response_text: str, count: int) -> Optional[List[List[Any]]]:
+    """
+    Раскладывает ответ пачки по номерам текстов.
+
+    Returns:
+        Список из count "сырых" списков блюд (в порядке текстов) или None,
+        если ответ не удалось разобрать или для какого-то номера нет результата
+    """
+    objects, _ = extract_json_objects(response_text)
+    results = next((
+        data['results'] for data in objects
+        if isinstance(data, dict) and isinstance(data.get('results'), list)
+    ), None)
+    if results is None:
+        return None
+
+    by_id: Dict[int, List[Any]] = {}
+    for position, result in enumerate(results, 1):
+        if not isinstance(result, dict) or not isinstance(result.get('dishes'), list):
+            continue
+        try:
+            number = int(result.get('id', position))
+        except (TypeError, ValueError):
+            continue
+        by_id.setdefault(number, result['dishes'])
+
+    if any(number not in by_id for number in range(1, count + 1)):
+        return None
+    return [by_id[number] for number in range(1, count + 1)]
+
+
+class BatchScheduler:
+    """Накопление одновременных запросов в пачки"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[str]], Awaitable[Optional[List[Any]]]],
+        send_single: Callable[[str], Awaitable[Any]],
+        max_size: int,
+        max_wait: float
+    ):
+        """
+        Args:
+            send_batch: Отправка пачки текстов; результаты в порядке текстов
+                или None, если ответ не разобрался
+            send_single: Отправка одного текста
+            max_size: Максимум запросов в пачке
+            max_wait: Сколько ждать следующие запросы после первого (секунд)
+        """
+        self.send_batch = send_batch
+        self.send_single = send_single
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: set = set()
+
+        # Счетчики
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+
+    async def submit(self, text: str) -> Any:
+        """Ставит текст в очередь пачки и ждет его результат"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def close(self) -> None:
+        """Отправляет накопленное и дожидается отправленных пачек (при остановке бота)"""
+        self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики пачек"""
+        return {
+            'pending': len(self._pending),
+            'requests': self.requests,
+            'batches': self.batches,
+            'batched_requests': self.batched_requests,
+            'single_calls': self.single_calls,
+            'fallbacks': self.fallbacks,
+            'avg_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(text, future) for text, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            if len(batch) == 1:
+                self.single_calls += 1
+                results = [await self.send_single(texts[0])]
+            else:
+                self.batches += 1
+                self.batched_requests += len(batch)
+                results = await self.send_batch(texts)
+                if results is None:
+                    # Ответ пачки не разобрался - каждый текст отдельно
+                    self.fallbacks += 1
+                    self.single_calls += len(texts)
+                    results = await asyncio.gather(
+                        *(self.send_single(text) for text in texts), return_exceptions=True
+                    )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,158 @@
+"""
+Кэш результатов анализа текста перед GigaChat.
+
+Пользователи постоянно записывают одно и то же ("овсянка и кофе",
+"гречка с курицей"), поэтому результат анализа кэшируется по
+нормализованному тексту и версии промпта:
+- нормализация: регистр, ё/е, пробелы, пунктуация и порядок пунктов
+  списка ("кофе, овсянка" == "Овсянка и кофе.");
+- первый уровень - LRU в памяти процесса, второй - таблица analysis_cache
+  в SQLite (переживает перезапуск) со сроком жизни и ограничением размера.
+
+Смена промпта меняет версию и тем самым ключ, поэтому старые результаты
+не используются с новым промптом.
+"""
+
+import copy
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import database.aio
+
+# Записей в памяти процесса
+ANALYSIS_CACHE_SIZE = 2000
+
+# Срок жизни записи (секунд)
+ANALYSIS_CACHE_TTL = 30 * 24 * 3600
+
+# Максимум записей в таблице analysis_cache
+ANALYSIS_CACHE_MAX_ROWS = 50000
+
+# Очистка таблицы после каждых N сохранений
+ANALYSIS_CACHE_PRUNE_EVERY = 200
+
+# Разделители пунктов списка: запятая, точка с запятой, перевод строки, "+", союз "и"
+_ITEM_SEPARATORS = re.compile(r'[,;\n+]|\s+и\s+')
+# Все, кроме букв, цифр и пробелов (дробные числа "1.5" сохраняем)
+_PUNCTUATION = re.compile(r'(?<!\d)[.](?!\d)|[^\w\s.]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_food_text(text: str) -> str:
+    """
+    Приводит текст о еде к каноническому виду для ключа кэша.
+
+    Пример: "Овсянка и  кофе!" и "кофе, овсянка" -> "кофе, овсянка"
+    """
+    text = text.lower().replace('ё', 'е')
+    items = []
+    for item in _ITEM_SEPARATORS.split(f' {text} '):
+        item = _SPACES.sub(' ', _PUNCTUATION.sub(' ', item)).strip()
+        if item:
+            items.append(item)
+    return ', '.join(sorted(items))
+
+
+def analysis_cache_key(normalized_text: str, prompt_version: Optional[str]) -> str:
+    """Ключ кэша: хэш нормализованного текста и версии промпта"""
+    raw = f'{prompt_version or ""}\n{normalized_text}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Двухуровневый кэш анализа (память + SQLite) со счетчиками попаданий"""
+
+    def __init__(
+        self,
+        max_size: int = ANALYSIS_CACHE_SIZE,
+        ttl: int = ANALYSIS_CACHE_TTL,
+        max_rows: int = ANALYSIS_CACHE_MAX_ROWS
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._saves = 0
+
+        # Счетчики
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    async def get(self, text: str, prompt_version: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Возвращает копию закэшированных блюд или None"""
+        key = analysis_cache_key(normalize_food_text(text), prompt_version)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, dishes = entry
+            if time.time() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(dishes)
+            del self._entries[key]
+
+        dishes_json = await database.aio.get_cached_analysis(key, self.ttl)
+        if dishes_json is not None:
+            dishes = json.loads(dishes_json)
+            self._remember(key, dishes)
+            self.db_hits += 1
+            return copy.deepcopy(dishes)
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, prompt_version: Optional[str], dishes: List[Dict[str, Any]]) -> None:
+        """Сохраняет результат анализа в оба уровня"""
+        normalized = normalize_food_text(text)
+        if not normalized or not dishes:
+            return
+
+        key = analysis_cache_key(normalized, prompt_version)
+        dishes = copy.deepcopy(dishes)
+        self._remember(key, dishes)
+        self.stores += 1
+
+        await database.aio.save_cached_analysis(
+            key, prompt_version, normalized, json.dumps(dishes, ensure_ascii=False)
+        )
+
+        self._saves += 1
+        if self._saves % ANALYSIS_CACHE_PRUNE_EVERY == 0:
+            await database.aio.prune_analysis_cache(self.ttl, self.max_rows)
+
+    def clear_memory(self) -> None:
+        """Очищает уровень в памяти (таблица не трогается)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий по уровням"""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'memory_hits': self.memory_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, dishes: List[Dict[str, Any]]) -> None:
+        self._entries[key] = (time.time(), dishes)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+analysis_cache = AnalysisCache()
+
+
+def get_analysis_cache_stats() -> Dict[str, Any]:
+    """Счетчики кэша анализа процесса"""
+    return analysis_cache.stats()
@@ -0,0 +1,96 @@
+"""
+Объединение одинаковых одновременных запросов (request coalescing).
+
+Когда одинаковый текст приходит несколько раз одновременно (пересланное
+в группу сообщение, двойное нажатие "отправить"), в GigaChat должен уйти
+один запрос. RequestCoalescer запускает работу для ключа один раз, а все
+одновременные вызовы с тем же ключом ждут ее результат.
+
+- Ошибка работы передается всем ожидающим, ключ освобождается - следующий
+  вызов начнет новую попытку.
+- Отмена одного ожидающего не отменяет работу для остальных; работа
+  отменяется, только когда ее больше никто не ждет.
+"""
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Inflight:
+    """Выполняющаяся работа и число ее ожидающих"""
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """Общая задача на ключ для одновременных одинаковых запросов"""
+
+    def __init__(self):
+        self._inflight: Dict[str, _Inflight] = {}
+
+        # Счетчики
+        self.started = 0
+        self.joined = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет factory() для ключа или присоединяется к уже идущему выполнению.
+
+        Args:
+            key: Ключ запроса (одинаковые запросы - одинаковый ключ)
+            factory: Функция, создающая корутину работы
+
+        Returns:
+            Копия результата (каждый вызов может менять свой результат)
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = _Inflight(asyncio.ensure_future(factory()))
+            self._inflight[key] = inflight
+            inflight.task.add_done_callback(lambda task, key=key: self._finish(key, task))
+            self.started += 1
+        else:
+            self.joined += 1
+
+        inflight.waiters += 1
+        try:
+            # shield: отмена этого вызова не отменяет общую задачу
+            result = await asyncio.shield(inflight.task)
+        except asyncio.CancelledError:
+            if inflight.waiters == 1 and not inflight.task.done():
+                # Результат больше никому не нужен: отменяем работу и сразу
+                # освобождаем ключ, чтобы новые вызовы не присоединились к отменяемой
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+                inflight.task.cancel()
+            raise
+        finally:
+            inflight.waiters -= 1
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики объединения"""
+        calls = self.started + self.joined
+        return {
+            'inflight': len(self._inflight),
+            'started': self.started,
+            'joined': self.joined,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'coalesced_rate': self.joined / calls if calls else 0.0,
+        }
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.task is task:
+            del self._inflight[key]
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
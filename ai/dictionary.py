@@ -0,0 +1,100 @@
+"""
+Локальный словарь блюд перед GigaChat.
+
+Большинство сообщений - списки обычных продуктов, которые AI уже много раз
+разбирал. Пункты сообщения ищутся в словаре (database.dish_dictionary):
+уверенные совпадения считаются локально (КБЖУ на 100 г x граммы пункта
+или типичная порция), в GigaChat уходят только оставшиеся пункты.
+
+Уверенное совпадение:
+- запись словаря основана хотя бы на DICTIONARY_MIN_SAMPLES ответах AI;
+- названия совпадают точно или похожи не меньше DICTIONARY_MIN_SIMILARITY;
+- у пункта указан вес или не указано ничего (штуки без веса - в GigaChat).
+"""
+
+from typing import Any, Dict, List, Optional
+
+import database.aio
+from ai.food_items import FoodItem
+
+# Минимум неотредактированных ответов AI для записи словаря
+DICTIONARY_MIN_SAMPLES = 2
+
+# Минимальная похожесть названий (Жаккар по триграммам) для нечеткого совпадения
+DICTIONARY_MIN_SIMILARITY = 0.6
+
+
+class DishDictionary:
+    """Поиск пунктов сообщения в словаре блюд со счетчиками попаданий"""
+
+    def __init__(
+        self,
+        min_samples: int = DICTIONARY_MIN_SAMPLES,
+        min_similarity: float = DICTIONARY_MIN_SIMILARITY
+    ):
+        self.min_samples = min_samples
+        self.min_similarity = min_similarity
+
+        # Счетчики
+        self.items = 0
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.messages_local = 0
+
+    async def resolve(self, items: List[FoodItem]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Считает КБЖУ пунктов, уверенно найденных в словаре (один запрос к базе).
+
+        Returns:
+            Для каждого пункта - блюдо (source = 'dictionary') или None
+        """
+        self.items += len(items)
+        lookup = [i for i, item in enumerate(items) if item.count is None]
+        found = await database.aio.find_dishes(
+            [items[i].name for i in lookup], self.min_samples, self.min_similarity
+        )
+
+        dishes: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        for i, entry in zip(lookup, found):
+            if entry is None:
+                continue
+            dishes[i] = self._scale(entry, items[i].grams)
+            self.hits += 1
+            if entry['similarity'] < 1.0:
+                self.fuzzy_hits += 1
+
+        if items and all(dishes):
+            self.messages_local += 1
+        return dishes
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий по пунктам"""
+        return {
+            'items': self.items,
+            'hits': self.hits,
+            'fuzzy_hits': self.fuzzy_hits,
+            'messages_local': self.messages_local,
+            'hit_rate': self.hits / self.items if self.items else 0.0,
+        }
+
+    @staticmethod
+    def _scale(entry: Dict[str, Any], grams: Optional[float]) -> Dict[str, Any]:
+        grams = max(1, min(round(grams if grams is not None else entry['portion_grams']), 5000))
+        factor = grams / 100
+        return {
+            'name': entry['name'],
+            'calories': round(entry['calories_100g'] * factor),
+            'protein': round(entry['protein_100g'] * factor),
+            'fat': round(entry['fat_100g'] * factor),
+            'carbs': round(entry['carbs_100g'] * factor),
+            'grams': grams,
+            'source': 'dictionary',
+        }
+
+
+dish_dictionary = DishDictionary()
+
+
+def get_dish_dictionary_stats() -> Dict[str, Any]:
+    """Счетчики словаря блюд процесса"""
+    return dish_dictionary.stats()
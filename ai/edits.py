@@ -0,0 +1,232 @@
+"""
+Локальное применение простых правок приема пищи без GigaChat.
+
+Большинство правок - количество: "200г", "половина", "x2", "без сахара".
+Раньше каждая из них отправляла в GigaChat весь промпт редактирования
+с JSON приема пищи. Такие правки применяются сразу:
+- вес ("200г", "гречка 150 гр") - КБЖУ пересчитываются пропорционально
+  сохраненным граммам;
+- множитель ("x2", "в 2 раза меньше", "половина", "полторы порции",
+  "1/3") - КБЖУ и граммы умножаются;
+- "без X" - из блюда убирается доля продукта X, оцененная по таблице
+  продуктов (ai.estimator), и X убирается из названия.
+
+Правка может относиться ко всему приему пищи или к блюду по названию
+("гречка 150г, курица x2"); вес без названия - только для одного блюда.
+Если хоть одна часть правки не распознана, правка целиком уходит в
+GigaChat (AIService.process_edit_meal).
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai.estimator import FoodEstimator, food_estimator, stem
+from ai.food_items import parse_food_item
+from ai.parsing import validate_dishes
+from database.dish_dictionary import dish_key, name_similarity
+
+# Минимальная похожесть слова правки на слово названия блюда (Жаккар по триграммам)
+EDIT_MIN_SIMILARITY = 0.5
+
+# Части правки: запятая (не в дробном числе), точка с запятой, перевод строки, союз "и"
+_PART_SEPARATORS = re.compile(r'(?<!\d),|,(?!\d)|[;\n]|\s+и\s+')
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+# Множитель: шаблон и значение по найденным числам
+_FACTORS: Tuple[Tuple['re.Pattern', Any], ...] = (
+    (re.compile(rf'(?<!\w)[xх×*]\s*{_NUMBER}(?!\w)'), lambda n: n[0]),
+    (re.compile(rf'(?<!\w){_NUMBER}\s*[xх×*](?!\w)'), lambda n: n[0]),
+    (re.compile(rf'(?<!\w)в\s+{_NUMBER}\s+раза?\s+больше(?!\w)'), lambda n: n[0]),
+    (re.compile(rf'(?<!\w)в\s+{_NUMBER}\s+раза?\s+меньше(?!\w)'), lambda n: 1 / n[0]),
+    (re.compile(r'(?<!\w)(\d+)\s*/\s*(\d+)(?!\w)'), lambda n: n[0] / n[1]),
+    (re.compile(rf'(?<!\w){_NUMBER}\s+порци\w*'), lambda n: n[0]),
+    (re.compile(r'(?<!\w)вдвое\s+больше(?!\w)|(?<!\w)двойн\w*'), lambda n: 2),
+    (re.compile(r'(?<!\w)втрое\s+больше(?!\w)|(?<!\w)тройн\w*'), lambda n: 3),
+    (re.compile(r'(?<!\w)вдвое\s+меньше(?!\w)|(?<!\w)половин\w*|(?<!\w)пол(?:\s+|-)?(?=порци)|(?<!\w)пол(?!\w)'), lambda n: 0.5),
+    (re.compile(r'(?<!\w)втрое\s+меньше(?!\w)|(?<!\w)трет\w*'), lambda n: 1 / 3),
+    (re.compile(r'(?<!\w)четверт\w*'), lambda n: 0.25),
+    (re.compile(r'(?<!\w)полтор\w*'), lambda n: 1.5),
+)
+
+# "без сахара"
+_WITHOUT = re.compile(r'(?<!\w)без\s+(\w+)')
+
+# Слова, не меняющие смысл правки
+_FILLER = {
+    'порция', 'порции', 'порцию', 'порций', 'было', 'на', 'самом', 'деле',
+    'всего', 'итого', 'вес', 'весом', 'там', 'съел', 'съела', 'выпил', 'выпила',
+}
+
+_WORD = re.compile(r'\w+')
+
+# Значения блюда, которые пересчитываются правкой
+_FIELDS = ('calories', 'protein', 'fat', 'carbs')
+
+
+class LocalEditInterpreter:
+    """Применение правок количества без AI со счетчиками"""
+
+    def __init__(self, estimator: FoodEstimator = food_estimator, min_similarity: float = EDIT_MIN_SIMILARITY):
+        self.estimator = estimator
+        self.min_similarity = min_similarity
+
+        # Счетчики
+        self.edits = 0
+        self.handled = 0
+        self.kinds: Counter = Counter()
+
+    def apply(self, entries: List[Dict[str, Any]], edit_text: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Применяет правку к блюдам приема пищи.
+
+        Args:
+            entries: Записи приема пищи (name, calories, protein, fat, carbs, grams)
+            edit_text: Текст правки пользователя
+
+        Returns:
+            Обновленные блюда в порядке entries (как AIService.process_edit_meal)
+            или None, если правку нельзя применить локально
+        """
+        self.edits += 1
+        dishes = [{'name': entry['name'], **{key: entry[key] for key in (*_FIELDS, 'grams')}} for entry in entries]
+        kinds = []
+        for part in _PART_SEPARATORS.split(edit_text.lower().replace('ё', 'е')):
+            part = part.strip(' .!')
+            if not part:
+                continue
+            kind = self._apply_part(dishes, part)
+            if kind is None:
+                return None
+            kinds.append(kind)
+        if not kinds:
+            return None
+
+        self.handled += 1
+        self.kinds.update(kinds)
+        return validate_dishes(dishes)
+
+    def stats(self) -> Dict[str, Any]:
+        """Доля правок, примененных без AI, по видам"""
+        return {
+            'edits': self.edits,
+            'handled': self.handled,
+            'handled_rate': self.handled / self.edits if self.edits else 0.0,
+            'kinds': dict(self.kinds),
+        }
+
+    def _apply_part(self, dishes: List[Dict[str, Any]], part: str) -> Optional[str]:
+        """Применяет одну часть правки; возвращает ее вид или None, если она не распознана"""
+        factor = None
+        for pattern, value in _FACTORS:
+            match = pattern.search(part)
+            if match:
+                if factor is not None:
+                    return None
+                numbers = [float(group.replace(',', '.')) for group in match.groups() if group]
+                if any(number == 0 for number in numbers):
+                    return None
+                factor = value(numbers)
+                part = part[:match.start()] + ' ' + part[match.end():]
+
+        removed = _WITHOUT.findall(part)
+        part = _WITHOUT.sub(' ', part)
+
+        item = parse_food_item(part)
+        if item.count is not None or (item.grams is not None and factor is not None):
+            return None
+        if any(char.isdigit() for char in item.name):
+            # Еще одно число (второй вес, "не 200г, а 150г", штуки) - в AI
+            return None
+        words = [word for word in _WORD.findall(item.name) if word not in _FILLER]
+
+        targets = self._targets(dishes, words)
+        if not targets:
+            return None
+
+        if item.grams is not None:
+            # Вес без названия блюда - только если блюдо одно
+            if (not words and len(dishes) > 1) or item.grams <= 0 or removed:
+                return None
+            for dish in targets:
+                if dish['grams'] <= 0:
+                    return None
+                self._scale(dish, item.grams / dish['grams'])
+            return 'grams'
+
+        if factor is not None:
+            if factor <= 0 or removed:
+                return None
+            for dish in targets:
+                self._scale(dish, factor)
+            return 'scale'
+
+        if removed:
+            return 'without' if self._remove(targets, removed) else None
+        return None
+
+    def _targets(self, dishes: List[Dict[str, Any]], words: List[str]) -> List[Dict[str, Any]]:
+        """Блюда, к которым относится часть правки (все, если название не указано)"""
+        if not words:
+            return dishes
+        stems = [stem(word) for word in words]
+        targets = []
+        for dish in dishes:
+            dish_stems = [stem(word) for word in _WORD.findall(dish_key(dish['name']))]
+            if all(
+                any(word == dish_word or name_similarity(word, dish_word) >= self.min_similarity for dish_word in dish_stems)
+                for word in stems
+            ):
+                targets.append(dish)
+        return targets
+
+    def _remove(self, targets: List[Dict[str, Any]], words: List[str]) -> bool:
+        """Убирает продукты words из блюд, где они есть; False - ни в одном блюде их нет"""
+        changed = False
+        for word in words:
+            record = self.estimator.lookup(word)
+            if record is None:
+                return False
+            for dish in targets:
+                composition = self.estimator.composition(dish['name'])
+                parts = [grams for product, grams in composition if product == record]
+                if not parts or len(composition) == 1:
+                    # Продукта в блюде нет или блюдо из него одного (это удаление, а не правка)
+                    continue
+                removed = parts[0]
+                total_grams = sum(grams for _, grams in composition)
+                for field in _FIELDS:
+                    total = sum(getattr(product, field) * grams for product, grams in composition)
+                    if total > 0:
+                        dish[field] *= 1 - getattr(record, field) * removed / total
+                dish['grams'] *= 1 - removed / total_grams
+                dish['name'] = self._drop_word(dish['name'], record)
+                changed = True
+        return changed
+
+    def _drop_word(self, name: str, record: Any) -> str:
+        """Название без продукта record ("Чай с сахаром" -> "Чай")"""
+        words = list(_WORD.finditer(name))
+        for i, match in enumerate(words):
+            if len(match.group()) < 3 or self.estimator.lookup(match.group()) != record:
+                continue
+            start = match.start()
+            if i and words[i - 1].group().lower() in ('с', 'со', 'и'):
+                start = words[i - 1].start()
+            name = name[:start] + name[match.end():]
+            break
+        return re.sub(r'\s+', ' ', name).strip(' ,')
+
+    @staticmethod
+    def _scale(dish: Dict[str, Any], factor: float) -> None:
+        for field in (*_FIELDS, 'grams'):
+            dish[field] *= factor
+
+
+local_edits = LocalEditInterpreter()
+
+
+def get_local_edit_stats() -> Dict[str, Any]:
+    """Счетчики правок без AI процесса"""
+    return local_edits.stats()
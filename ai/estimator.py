@@ -0,0 +1,251 @@
+"""
+Оценка КБЖУ без AI по таблице продуктов (ai.food_table).
+
+Используется вместо GigaChat, когда он не ответил или недоступен
+(AIService._get_fallback_response). Раньше каждый пункт получал одни
+и те же 300 ккал / 150 г, и пользователь тратил запрос к AI на правку
+каждой записи. Теперь:
+- сообщение делится на пункты с количеством (ai.food_items):
+  "гречка 200г, 2 яйца и чай без сахара";
+- слова пункта сводятся к основе (отбрасываются окончания) и ищутся
+  в таблице по названиям и синонимам, при опечатке - по похожести
+  триграмм (инвертированный индекс по триграммам основ);
+- "без X" исключает продукт X, мерные слова ("стакан", "ложка", "кусок")
+  задают вес, если он не указан;
+- продукты пункта складываются порциями ("гречка с курицей" - порция
+  гречки и до половины ее веса курицы), затем масштабируются на
+  указанный вес или количество штук;
+- ненайденный пункт получает прежние значения (300 ккал на 150 г).
+
+Блюда помечаются source = 'fallback' (примерные значения): их
+пересчитывает через AI фоновая очередь ai.reanalysis, когда GigaChat
+снова отвечает.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ai.food_items import FoodItem, parse_food_item, split_food_items
+from ai.food_table import DEFAULT_RECORD, FOOD_TABLE, FoodRecord
+from database.dish_dictionary import dish_key, name_similarity
+
+# Минимальная похожесть основы слова на основу из таблицы (Жаккар по триграммам)
+ESTIMATOR_MIN_SIMILARITY = 0.4
+
+# Окончания, которые отбрасываются при сведении слова к основе (длинные - первыми)
+_ENDINGS = tuple(sorted(
+    (
+        'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ой', 'ей', 'ий', 'ый',
+        'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ом', 'ем', 'ам', 'ям', 'ах',
+        'ях', 'ов', 'ев', 'ую', 'юю', 'ью', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+    ),
+    key=len, reverse=True
+))
+
+# Минимальная длина основы (короткие слова - "щи", "чай" - не укорачиваются)
+_MIN_STEM = 3
+
+# Служебные слова, не влияющие на поиск продукта
+_STOPWORDS = {'с', 'со', 'и', 'на', 'в', 'во', 'из', 'под', 'по', 'для', 'к', 'от', 'без', 'немного', 'порция', 'порции'}
+
+# Мерные слова: вес в граммах одной меры
+_MEASURES = {
+    'стакан': 250, 'кружк': 300, 'чашк': 200, 'тарелк': 300, 'миск': 300,
+    'ложк': 15, 'ложечк': 5, 'кусок': 100, 'кусочек': 50, 'куск': 100, 'ломтик': 30,
+    'бутылк': 500, 'банк': 330, 'пачк': 200, 'горст': 30,
+}
+
+_WORD = re.compile(r'[а-яa-z]+|\d+(?:[.,]\d+)?')
+
+
+def stem(word: str) -> str:
+    """Основа слова: без окончания, но не короче _MIN_STEM букв"""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodEstimator:
+    """Оценка КБЖУ пунктов сообщения по таблице продуктов со счетчиками"""
+
+    def __init__(self, table: Tuple[FoodRecord, ...] = FOOD_TABLE, min_similarity: float = ESTIMATOR_MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+
+        # Основа слова -> продукт; набор основ многословного названия -> продукт
+        self._by_stem: Dict[str, FoodRecord] = {}
+        self._by_phrase: Dict[frozenset, FoodRecord] = {}
+        for record in table:
+            stems = [stem(word) for word in record.name.split()]
+            if len(stems) > 1:
+                self._by_phrase[frozenset(stems)] = record
+            else:
+                self._by_stem.setdefault(stems[0], record)
+            for synonym in record.synonyms:
+                self._by_stem.setdefault(stem(synonym), record)
+
+        # Триграмма -> основы таблицы с ней (кандидаты для нечеткого поиска)
+        self._trigram_index: Dict[str, List[str]] = {}
+        for word_stem in self._by_stem:
+            for trigram in _trigrams(word_stem):
+                self._trigram_index.setdefault(trigram, []).append(word_stem)
+
+        # Счетчики
+        self.items = 0
+        self.matched = 0
+        self.fuzzy_matched = 0
+        self.defaulted = 0
+
+    def estimate(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Оценивает КБЖУ каждого пункта сообщения.
+
+        Returns:
+            Блюда (source = 'fallback') в порядке пунктов; название блюда -
+            текст пункта, чтобы его можно было пересчитать через AI
+        """
+        items = split_food_items(text)
+        if not items and text.strip():
+            # Только количество без названия ("200г") - одно блюдо со значениями по умолчанию
+            items = [parse_food_item(text)]
+        return [self.estimate_item(item) for item in items]
+
+    def estimate_item(self, item: FoodItem) -> Dict[str, Any]:
+        """Оценка одного пункта: продукты из таблицы, масштабированные на количество"""
+        self.items += 1
+        records, measure = self._match(item.name)
+        if not records:
+            self.defaulted += 1
+            records = [DEFAULT_RECORD]
+        else:
+            self.matched += 1
+
+        head = records[0]
+        parts = self._parts(records)
+        portion = sum(parts)
+        if item.grams is not None:
+            grams = item.grams
+        elif measure is not None:
+            grams = measure * (item.count or 1)
+        elif item.count is not None and head.piece_grams is not None:
+            # Штуки основного продукта и добавки ("2 яйца с сыром")
+            grams = item.count * head.piece_grams + portion - head.portion_grams
+        else:
+            grams = portion * (item.count or 1)
+
+        factor = grams / portion / 100
+        totals = [
+            sum(getattr(record, field) * part for record, part in zip(records, parts)) * factor
+            for field in ('calories', 'protein', 'fat', 'carbs')
+        ]
+        calories, protein, fat, carbs = (round(value) for value in totals)
+        return {
+            'name': item.text,
+            'calories': max(0, min(calories, 2000)),
+            'protein': max(0, min(protein, 100)),
+            'fat': max(0, min(fat, 100)),
+            'carbs': max(0, min(carbs, 200)),
+            'grams': max(1, min(round(grams), 5000)),
+            'source': 'fallback',
+        }
+
+    def composition(self, name: str) -> List[Tuple[FoodRecord, float]]:
+        """
+        Продукты таблицы в названии блюда с граммами каждого в типичной
+        порции (без счетчиков; пустой список - ничего не найдено)
+        """
+        records, _ = self._match(dish_key(name))
+        return list(zip(records, self._parts(records))) if records else []
+
+    def lookup(self, word: str) -> Optional[FoodRecord]:
+        """Продукт таблицы по одному слову ("сахара" -> сахар) или None"""
+        word_stem = stem(dish_key(word))
+        return self._by_stem.get(word_stem) or self._fuzzy(word_stem)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики найденных в таблице пунктов"""
+        return {
+            'items': self.items,
+            'matched': self.matched,
+            'fuzzy_matched': self.fuzzy_matched,
+            'defaulted': self.defaulted,
+            'match_rate': self.matched / self.items if self.items else 0.0,
+        }
+
+    @staticmethod
+    def _parts(records: List[FoodRecord]) -> List[float]:
+        """Граммы продуктов в порции: основной - порцией, добавки ("с курицей") - не больше половины его порции"""
+        head = records[0]
+        return [head.portion_grams] + [
+            min(record.portion_grams, head.portion_grams / 2) for record in records[1:]
+        ]
+
+    def _match(self, name: str) -> Tuple[List[FoodRecord], Optional[float]]:
+        """Продукты таблицы в названии пункта (без повторов) и вес мерного слова"""
+        stems: List[str] = []
+        measure = None
+        number = None
+        skip_next = False
+        for word in _WORD.findall(name):
+            if word[0].isdigit():
+                # Число перед мерным словом: "2 куска", "1,5 стакана"
+                number = float(word.replace(',', '.'))
+                continue
+            if skip_next:
+                # "без сахара": продукт после "без" не учитывается
+                skip_next = False
+                continue
+            if word == 'без':
+                skip_next = True
+                continue
+            if word in _STOPWORDS:
+                continue
+            word_stem = stem(word)
+            if measure is None and word_stem in _MEASURES:
+                measure = _MEASURES[word_stem] * (number or 1)
+                continue
+            number = None
+            stems.append(word_stem)
+
+        phrase = self._by_phrase.get(frozenset(stems))
+        if phrase is not None:
+            return [phrase], measure
+
+        records: List[FoodRecord] = []
+        for word_stem in stems:
+            record = self._by_stem.get(word_stem) or self._fuzzy(word_stem)
+            if record is not None and record not in records:
+                records.append(record)
+        return records, measure
+
+    def _fuzzy(self, word_stem: str) -> Optional[FoodRecord]:
+        """Самая похожая основа таблицы (опечатки, другие формы слова)"""
+        if len(word_stem) < _MIN_STEM:
+            return None
+        candidates = {
+            candidate
+            for trigram in _trigrams(word_stem)
+            for candidate in self._trigram_index.get(trigram, ())
+        }
+        best, best_similarity = None, self.min_similarity
+        for candidate in candidates:
+            similarity = name_similarity(word_stem, candidate)
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is None:
+            return None
+        self.fuzzy_matched += 1
+        return self._by_stem[best]
+
+
+food_estimator = FoodEstimator()
+
+
+def get_food_estimator_stats() -> Dict[str, Any]:
+    """Счетчики оценок по таблице продуктов процесса"""
+    return food_estimator.stats()
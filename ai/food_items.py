@@ -0,0 +1,78 @@
+"""
+Разбор текста о еде на отдельные пункты с количеством.
+
+"гречка 200г, 2 яйца и кофе" -> три пункта: гречка (200 г), яйца (2 шт.), кофе.
+Количество распознается в граммах (г, гр, кг, мл, л - 1 мл считается 1 г)
+и в штуках (число без единицы измерения в начале или конце пункта).
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+from database.dish_dictionary import dish_key
+
+# Разделители пунктов: запятая (не в дробном числе), точка с запятой, перевод строки, "+", союз "и"
+_ITEM_SEPARATORS = re.compile(r'(?<!\d),|,(?!\d)|[;\n+]|\s+и\s+')
+
+# Вес или объем: "200г", "200 гр", "0,5 кг", "250 мл", "1.5 л"
+_WEIGHT = re.compile(
+    r'(\d+(?:[.,]\d+)?)\s*'
+    r'(кг|килограмм\w*|г|гр|грамм\w*|мл|миллилитр\w*|л|литр\w*)(?!\w)'
+)
+
+# Множитель единицы измерения до граммов
+_UNIT_GRAMS = {'кг': 1000, 'килограмм': 1000, 'л': 1000, 'литр': 1000}
+
+# Число штук в начале или в конце пункта: "2 яйца", "яйца 2", "яйца x2"
+_COUNT = re.compile(r'^(\d+(?:[.,]\d+)?)\s+(?=\D)|(?<=\D)\s+[xх×]?(\d+(?:[.,]\d+)?)$')
+
+
+class FoodItem(NamedTuple):
+    """Пункт сообщения о еде"""
+    text: str
+    name: str
+    grams: Optional[float]
+    count: Optional[float]
+
+
+def _number(value: str) -> float:
+    return float(value.replace(',', '.'))
+
+
+def _unit_grams(unit: str) -> int:
+    for prefix, grams in _UNIT_GRAMS.items():
+        if unit == prefix or (len(prefix) > 2 and unit.startswith(prefix)):
+            return grams
+    return 1
+
+
+def parse_food_item(text: str) -> FoodItem:
+    """Выделяет из пункта количество и нормализованное название"""
+    text = text.strip()
+    name = text.lower().replace('ё', 'е')
+
+    grams = None
+    weight = _WEIGHT.search(name)
+    if weight:
+        grams = _number(weight.group(1)) * _unit_grams(weight.group(2))
+        name = name[:weight.start()] + ' ' + name[weight.end():]
+
+    count = None
+    name = name.strip()
+    if grams is None:
+        match = _COUNT.search(name)
+        if match:
+            count = _number(match.group(1) or match.group(2))
+            name = name[:match.start()] + ' ' + name[match.end():]
+
+    return FoodItem(text, dish_key(name), grams, count)
+
+
+def split_food_items(text: str) -> List[FoodItem]:
+    """Делит сообщение на пункты; пустые пункты отбрасываются"""
+    items = []
+    for part in _ITEM_SEPARATORS.split(f' {text} '):
+        item = parse_food_item(part)
+        if item.name:
+            items.append(item)
+    return items
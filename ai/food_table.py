@@ -0,0 +1,126 @@
+"""
+Таблица распространенных продуктов и блюд для оценки КБЖУ без AI.
+
+Значения на 100 г - средние по справочным таблицам калорийности,
+порция - типичная порция в граммах, штука - вес одной штуки (если
+продукт считают штуками: яйца, фрукты, хлеб ломтиками).
+Синонимы - другие формы и названия, по которым продукт ищется
+(названия и синонимы сравниваются по основам слов, см. ai.estimator).
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+
+class FoodRecord(NamedTuple):
+    """Продукт таблицы: КБЖУ на 100 г, типичная порция и вес штуки"""
+    name: str
+    synonyms: Tuple[str, ...]
+    calories: float
+    protein: float
+    fat: float
+    carbs: float
+    portion_grams: float
+    piece_grams: Optional[float] = None
+
+
+FOOD_TABLE: Tuple[FoodRecord, ...] = (
+    # Крупы и гарниры (готовые)
+    FoodRecord('гречка', ('гречневая', 'греча'), 110, 4.2, 1.1, 21.3, 200),
+    FoodRecord('рис', ('рисовая', 'плов'), 130, 2.7, 0.3, 28.2, 200),
+    FoodRecord('овсянка', ('овсяная', 'геркулес'), 88, 3.0, 1.7, 15.0, 250),
+    FoodRecord('манная каша', ('манка', 'манная'), 98, 3.0, 3.2, 15.3, 250),
+    FoodRecord('пшенная каша', ('пшенка', 'пшено'), 109, 3.4, 1.6, 20.8, 250),
+    FoodRecord('макароны', ('паста', 'спагетти', 'вермишель', 'лапша'), 158, 5.8, 0.9, 30.9, 200),
+    FoodRecord('картофельное пюре', ('пюре',), 106, 2.5, 4.2, 14.7, 200),
+    FoodRecord('картофель', ('картошка', 'картофельная'), 82, 2.0, 0.4, 16.7, 200, 100),
+    FoodRecord('картофель фри', ('фри',), 312, 3.4, 15.0, 41.0, 120),
+    FoodRecord('булгур', (), 83, 3.1, 0.2, 18.6, 200),
+    FoodRecord('киноа', (), 120, 4.4, 1.9, 21.3, 200),
+
+    # Мясо, птица, рыба (готовые)
+    FoodRecord('курица', ('куриная', 'куриное', 'цыпленок', 'грудка'), 165, 31.0, 3.6, 0.0, 150),
+    FoodRecord('индейка', (), 139, 25.0, 4.2, 0.0, 150),
+    FoodRecord('говядина', ('говяжий', 'говяжья', 'телятина'), 218, 26.0, 12.5, 0.0, 150),
+    FoodRecord('свинина', ('свиная', 'свиной'), 259, 25.0, 17.5, 0.0, 150),
+    FoodRecord('котлета', ('котлеты',), 220, 14.6, 14.0, 9.1, 100, 100),
+    FoodRecord('тефтели', ('фрикадельки',), 190, 12.0, 12.0, 8.0, 150, 40),
+    FoodRecord('шашлык', (), 240, 22.0, 16.0, 1.5, 200),
+    FoodRecord('сосиска', ('сосиски', 'сардельки', 'сарделька'), 257, 11.0, 23.0, 1.5, 100, 50),
+    FoodRecord('колбаса', ('колбасы', 'ветчина', 'салями'), 280, 14.0, 24.0, 1.5, 50),
+    FoodRecord('пельмени', ('вареники', 'манты'), 248, 11.9, 12.4, 23.0, 250, 12),
+    FoodRecord('рыба', ('рыбная',), 140, 20.0, 6.0, 0.0, 150),
+    FoodRecord('лосось', ('семга', 'форель'), 208, 20.4, 13.4, 0.0, 150),
+    FoodRecord('тунец', (), 130, 28.0, 1.0, 0.0, 100),
+    FoodRecord('креветки', ('креветка',), 99, 20.9, 1.7, 0.2, 100),
+
+    # Яйца и молочные продукты
+    FoodRecord('яйцо', ('яйца', 'яиц', 'яйцами'), 157, 12.7, 11.5, 0.7, 110, 55),
+    FoodRecord('омлет', ('яичница', 'глазунья'), 184, 9.6, 15.4, 1.9, 150),
+    FoodRecord('молоко', ('молочная',), 60, 3.0, 3.2, 4.7, 250),
+    FoodRecord('кефир', ('ряженка', 'айран'), 53, 2.9, 2.5, 4.0, 250),
+    FoodRecord('йогурт', (), 80, 4.0, 2.5, 10.0, 150),
+    FoodRecord('творог', ('творожная', 'творожок'), 159, 16.7, 9.0, 2.0, 150),
+    FoodRecord('сырники', ('сырник', 'запеканка'), 220, 15.0, 10.0, 17.0, 150, 50),
+    FoodRecord('сметана', (), 206, 2.8, 20.0, 3.2, 20),
+    FoodRecord('сыр', ('сырная',), 356, 24.0, 29.5, 0.3, 30),
+    FoodRecord('сливочное масло', ('масло',), 748, 0.5, 82.5, 0.8, 10),
+
+    # Хлеб и выпечка
+    FoodRecord('хлеб', ('батон', 'тост', 'тосты', 'багет'), 250, 8.0, 2.0, 49.0, 60, 30),
+    FoodRecord('лаваш', (), 277, 9.1, 1.2, 56.0, 80),
+    FoodRecord('блины', ('блинчики', 'блин', 'оладьи'), 233, 6.1, 12.3, 26.0, 150, 50),
+    FoodRecord('пирожок', ('пирожки', 'пирог', 'беляш', 'чебурек'), 280, 7.0, 12.0, 36.0, 100, 80),
+    FoodRecord('круассан', (), 406, 8.2, 21.0, 45.8, 60, 60),
+    FoodRecord('печенье', ('печенька', 'крекер'), 450, 7.5, 18.0, 65.0, 40, 10),
+    FoodRecord('торт', ('пирожное',), 380, 5.0, 20.0, 45.0, 100),
+    FoodRecord('пицца', (), 266, 11.0, 10.0, 33.0, 200, 100),
+    FoodRecord('бургер', ('гамбургер', 'чизбургер'), 260, 13.0, 11.0, 28.0, 200, 200),
+    FoodRecord('шаурма', ('шаверма',), 230, 11.0, 11.0, 22.0, 300, 300),
+    FoodRecord('бутерброд', ('сэндвич', 'сендвич'), 250, 10.0, 12.0, 27.0, 100, 100),
+
+    # Первые блюда
+    FoodRecord('борщ', (), 49, 2.7, 2.5, 4.6, 300),
+    FoodRecord('щи', (), 32, 1.5, 1.8, 2.8, 300),
+    FoodRecord('суп', ('бульон', 'солянка', 'уха', 'рассольник'), 45, 2.5, 2.0, 4.5, 300),
+
+    # Овощи и салаты
+    FoodRecord('салат', ('овощной',), 60, 1.5, 4.0, 5.0, 150),
+    FoodRecord('салат цезарь', ('цезарь',), 190, 11.0, 13.0, 7.0, 200),
+    FoodRecord('салат оливье', ('оливье',), 198, 5.5, 16.5, 7.0, 200),
+    FoodRecord('винегрет', (), 76, 1.7, 4.6, 7.4, 150),
+    FoodRecord('огурец', ('огурцы',), 15, 0.8, 0.1, 2.8, 100, 100),
+    FoodRecord('помидор', ('помидоры', 'томат', 'томаты'), 20, 1.1, 0.2, 3.7, 100, 100),
+    FoodRecord('овощи', ('капуста', 'морковь', 'брокколи', 'кабачок'), 35, 1.5, 0.3, 6.0, 150),
+
+    # Фрукты и ягоды
+    FoodRecord('яблоко', ('яблоки',), 47, 0.4, 0.4, 9.8, 180, 180),
+    FoodRecord('банан', ('бананы',), 96, 1.5, 0.5, 21.0, 120, 120),
+    FoodRecord('апельсин', ('мандарин', 'мандарины', 'апельсины'), 43, 0.9, 0.2, 8.1, 150, 150),
+    FoodRecord('груша', ('груши',), 47, 0.4, 0.3, 10.3, 170, 170),
+    FoodRecord('виноград', (), 72, 0.6, 0.6, 15.4, 150),
+    FoodRecord('ягоды', ('клубника', 'черника', 'малина'), 45, 0.8, 0.4, 8.5, 150),
+    FoodRecord('сухофрукты', ('изюм', 'курага', 'финики', 'чернослив'), 280, 3.0, 0.5, 66.0, 30),
+    FoodRecord('орехи', ('миндаль', 'фундук', 'арахис', 'грецкие'), 600, 18.0, 52.0, 14.0, 30),
+
+    # Сладкое
+    FoodRecord('шоколад', ('шоколадка', 'шоколадный'), 540, 6.0, 31.0, 57.0, 25),
+    FoodRecord('конфета', ('конфеты',), 450, 4.0, 20.0, 65.0, 30, 15),
+    FoodRecord('мороженое', ('пломбир',), 230, 3.5, 15.0, 21.0, 80, 80),
+    FoodRecord('мед', (), 328, 0.8, 0.0, 80.3, 20),
+    FoodRecord('сахар', (), 399, 0.0, 0.0, 99.8, 5, 5),
+    FoodRecord('варенье', ('джем',), 265, 0.4, 0.3, 65.0, 20),
+
+    # Напитки
+    FoodRecord('чай', ('чая', 'чаю', 'чаек'), 1, 0.0, 0.0, 0.3, 250),
+    FoodRecord('кофе', ('американо', 'эспрессо'), 2, 0.2, 0.0, 0.3, 200),
+    FoodRecord('капучино', ('латте', 'раф'), 50, 2.5, 2.5, 4.0, 250),
+    FoodRecord('сок', (), 45, 0.5, 0.1, 10.0, 250),
+    FoodRecord('компот', ('морс',), 60, 0.2, 0.0, 14.5, 250),
+    FoodRecord('газировка', ('кола', 'лимонад', 'спрайт'), 42, 0.0, 0.0, 10.6, 330),
+    FoodRecord('пиво', (), 43, 0.3, 0.0, 4.6, 500),
+    FoodRecord('вино', (), 83, 0.1, 0.0, 2.7, 150),
+    FoodRecord('протеин', ('протеиновый', 'коктейль'), 110, 20.0, 1.5, 4.0, 300),
+)
+
+# Продукт не найден: 300 ккал на порцию 150 г (прежние запасные значения)
+DEFAULT_RECORD = FoodRecord('', (), 200, 8.0, 5.3, 26.7, 150)
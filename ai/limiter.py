@@ -0,0 +1,194 @@
+"""
+Ограничение нагрузки на GigaChat: адаптивный лимит одновременных запросов
+(AIMD) и token bucket на частоту запросов.
+
+Без ограничений в часы пик GigaChat отвечает 429, и каждый такой ответ
+превращается в запасные 300 ккал. AdaptiveLimiter стоит перед каждым
+запросом к chat/completions:
+- лимит одновременных запросов растет на 1/limit после каждого успешного
+  ответа (+1 за "окно") и умножается на backoff при перегрузке (429, 503,
+  таймаут) - не чаще одного раза на поколение запросов;
+- token bucket не пускает больше rate запросов в секунду (с запасом burst);
+- лишние запросы ждут в очереди (FIFO) до дедлайна и только по его
+  истечении получают LimiterTimeout.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+# HTTP-статусы, означающие перегрузку GigaChat
+OVERLOAD_STATUSES = (429, 503)
+
+
+class LimiterTimeout(Exception):
+    """Запрос не дождался своей очереди к AI до дедлайна"""
+
+
+class Permit:
+    """Разрешение на один запрос; overloaded() сообщает лимитеру о перегрузке"""
+    __slots__ = ('started_at', 'is_overloaded')
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.is_overloaded = False
+
+    def overloaded(self) -> None:
+        self.is_overloaded = True
+
+
+class AdaptiveLimiter:
+    """Очередь к AI с адаптивным лимитом одновременных запросов и token bucket"""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        rate: float,
+        burst: int,
+        queue_timeout: float,
+        backoff: float = 0.5
+    ):
+        """
+        Args:
+            initial_limit: Начальный лимит одновременных запросов
+            min_limit: Нижняя граница лимита
+            max_limit: Верхняя граница лимита
+            rate: Запросов в секунду (0 - без ограничения частоты)
+            burst: Запас токенов (сколько запросов можно отправить разом)
+            queue_timeout: Сколько запрос может ждать в очереди (секунд)
+            backoff: Во сколько раз уменьшать лимит при перегрузке
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+
+        self._inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Счетчики
+        self.acquired = 0
+        self.rejected = 0
+        self.overloads = 0
+        self.max_queue_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[Permit]:
+        """
+        Ждет очередь и разрешение на запрос.
+
+        Args:
+            timeout: Сколько ждать в очереди (по умолчанию queue_timeout)
+
+        Raises:
+            LimiterTimeout: Очередь не дошла до запроса за timeout секунд
+        """
+        await self._acquire(self.queue_timeout if timeout is None else timeout)
+        permit = Permit(time.monotonic())
+        try:
+            yield permit
+        except asyncio.TimeoutError:
+            # Таймаут ответа - тоже признак перегрузки
+            permit.overloaded()
+            raise
+        finally:
+            self._release(permit)
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущий лимит, очередь, ожидание и отказы"""
+        self._refill()
+        return {
+            'limit': round(self.limit, 2),
+            'inflight': self._inflight,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'acquired': self.acquired,
+            'rejected': self.rejected,
+            'overloads': self.overloads,
+            'avg_wait_ms': round(self.wait_total / self.acquired * 1000, 1) if self.acquired else 0.0,
+            'max_wait_ms': round(self.wait_max * 1000, 1),
+            'tokens': round(self._tokens, 2) if self.rate else None,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def _acquire(self, timeout: float) -> None:
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._grant()
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LimiterTimeout(f"Очередь к AI не подошла за {timeout:.1f} с") from None
+        except asyncio.CancelledError:
+            # Разрешение могло быть выдано в момент отмены - возвращаем его
+            if future.done() and not future.cancelled():
+                self._inflight -= 1
+                self._grant()
+            raise
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def _release(self, permit: Permit) -> None:
+        self._inflight -= 1
+        if permit.is_overloaded:
+            self.overloads += 1
+            # Одна перегрузка на поколение: запросы, начатые до прошлого
+            # снижения, лимит повторно не снижают
+            if permit.started_at >= self._decreased_at:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._decreased_at = time.monotonic()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._grant()
+
+    def _refill(self) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _grant(self) -> None:
+        """Выдает разрешения ожидающим по порядку, пока есть лимит и токены"""
+        self._refill()
+        while self._waiters and self._inflight < int(self.limit):
+            if self._waiters[0].done():
+                self._waiters.popleft()
+                continue
+            if self.rate and self._tokens < 1:
+                # Ждем следующий токен
+                if self._timer is None:
+                    delay = (1 - self._tokens) / self.rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            if self.rate:
+                self._tokens -= 1
+            self._inflight += 1
+            self._waiters.popleft().set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._grant()
@@ -0,0 +1,197 @@
+"""
+Разбор ответов GigaChat: JSON из текста модели и проверка блюд.
+
+Модель отвечает JSON, но не всегда чистым: ```json-обертка, пояснение
+до или после, два объекта подряд, оборванный по max_tokens ответ.
+Раньше каждый разборщик заново импортировал re, вызывал две
+некомпилированные регулярки и жадный \\{.*\\}, который на двух объектах
+захватывал текст между ними и терял весь ответ.
+
+- Быстрый путь: текст от первой "{" до последней "}" - один JSON (обычный
+  ответ, в т.ч. в markdown) - разбирается одним вызовом loads.
+- Несколько объектов или текст со скобками после JSON разбираются
+  json.JSONDecoder.raw_decode с начала каждого объекта.
+- Оборванный или невалидный объект extract_json_objects проходит один раз
+  по заранее скомпилированному шаблону токенов (строки целиком, скобки):
+  фигурные скобки внутри строк не мешают балансу, а из корневого объекта
+  берутся завершенные объекты его массивов (блюда из "dishes", которые
+  успели прийти).
+- loads использует orjson, если он установлен (необязательная зависимость),
+  иначе стандартный json.
+- validate_dishes - общая проверка блюд для анализа, пачек, потока и
+  редактирования.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без нее - стандартный json
+    orjson = None
+
+# Разбор объекта с произвольного места текста (у orjson такого нет)
+_DECODER = json.JSONDecoder()
+
+# Токены, важные для баланса скобок: строка JSON целиком (с экранированием) или скобка
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.DOTALL)
+
+
+def loads(text: str) -> Any:
+    """
+    Разбирает JSON (orjson, если установлен).
+
+    Raises:
+        ValueError: Невалидный JSON (json.JSONDecodeError и orjson.JSONDecodeError - его подклассы)
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def extract_json_objects(text: str) -> Tuple[List[Any], List[Any]]:
+    """
+    Находит JSON-объекты в тексте модели.
+
+    Returns:
+        (объекты верхнего уровня, разобранные по порядку;
+         завершенные объекты из массивов корневого объекта, который
+         оборван или не разобрался)
+    """
+    start = text.find('{')
+    if start < 0:
+        return [], []
+
+    # Быстрый путь: весь ответ - один объект (с оберткой или пояснением вокруг)
+    end = text.rfind('}')
+    if end > start:
+        try:
+            return [loads(text[start:end + 1])], []
+        except ValueError:
+            pass
+
+    # Объекты подряд (или с текстом между ними) - разбор json с места начала
+    objects: List[Any] = []
+    while start >= 0:
+        try:
+            data, end = _DECODER.raw_decode(text, start)
+        except ValueError:
+            break
+        objects.append(data)
+        start = text.find('{', end)
+    if start < 0:
+        return objects, []
+
+    # Оборванный или невалидный объект: баланс скобок за один проход по токенам
+    # и завершенные объекты из массивов корневого объекта ({"dishes": [{...}]})
+    spans: List[Tuple[int, int]] = []
+    fragments: List[Any] = []
+    # Открытые скобки: (символ, позиция)
+    stack: List[Tuple[str, int]] = []
+    for match in _JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        if token[0] == '"':
+            continue
+        if token == '{' or token == '[':
+            stack.append((token, match.start()))
+            continue
+        if not stack or stack[-1][0] != ('{' if token == '}' else '['):
+            # Непарная скобка - начинаем поиск заново
+            stack.clear()
+            spans = []
+            continue
+        _, opened_at = stack.pop()
+        if token != '}':
+            continue
+        if not stack:
+            # Закрылся объект верхнего уровня
+            parsed = _loads_or_none(text[opened_at:match.end()])
+            if parsed is not None:
+                objects.append(parsed)
+            else:
+                fragments.extend(_parse_spans(text, spans))
+            spans = []
+        elif len(stack) == 2 and stack[0][0] == '{' and stack[1][0] == '[':
+            spans.append((opened_at, match.end()))
+
+    if stack and stack[0][0] == '{':
+        # Корневой объект оборван (ответ обрезан по max_tokens)
+        fragments.extend(_parse_spans(text, spans))
+    return objects, fragments
+
+
+def extract_dishes(text: str, allow_single: bool = False) -> Optional[List[Any]]:
+    """
+    "Сырые" блюда из ответа модели: массивы "dishes" всех объектов ответа
+    (или завершенные блюда оборванного ответа).
+
+    Args:
+        text: Текст ответа модели
+        allow_single: Объект без "dishes" считать одним блюдом (ответ на редактирование)
+
+    Returns:
+        Список блюд для validate_dishes или None, если JSON в ответе нет
+    """
+    objects, fragments = extract_json_objects(text)
+    if not objects and not fragments:
+        return None
+
+    dishes: List[Any] = []
+    for data in objects:
+        if isinstance(data, dict) and isinstance(data.get('dishes'), list):
+            dishes.extend(data['dishes'])
+        elif isinstance(data, dict) and allow_single:
+            dishes.append(data)
+    if not objects:
+        dishes.extend(fragments)
+    return dishes
+
+
+def validate_dishes(dishes: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Проверяет блюда из ответа AI: округляет значения и ограничивает разумные пределы.
+    Блюда без названия или с нечисловыми значениями пропускаются.
+    """
+    valid_dishes = []
+    for dish in dishes:
+        if not isinstance(dish, dict):
+            continue
+
+        name = dish.get('name')
+        name = name.strip() if isinstance(name, str) else ''
+        if not name:
+            continue
+
+        get = dish.get
+        try:
+            # Значение по умолчанию, если поля нет; округление и разумные пределы
+            calories = round(float(get('calories') if get('calories') is not None else 300))
+            protein = round(float(get('protein') if get('protein') is not None else 10))
+            fat = round(float(get('fat') if get('fat') is not None else 10))
+            carbs = round(float(get('carbs') if get('carbs') is not None else 40))
+            grams = round(float(get('grams') if get('grams') is not None else 100))
+        except (TypeError, ValueError, OverflowError):
+            continue
+
+        valid_dishes.append({
+            'name': name,
+            'calories': max(0, min(calories, 2000)),
+            'protein': max(0, min(protein, 100)),
+            'fat': max(0, min(fat, 100)),
+            'carbs': max(0, min(carbs, 200)),
+            'grams': max(1, min(grams, 5000)),  # От 1г до 5кг
+        })
+    return valid_dishes
+
+
+def _loads_or_none(text: str) -> Optional[Any]:
+    try:
+        return loads(text)
+    except ValueError:
+        return None
+
+
+def _parse_spans(text: str, spans: List[Tuple[int, int]]) -> List[Any]:
+    parsed = (_loads_or_none(text[start:end]) for start, end in spans)
+    return [data for data in parsed if data is not None]
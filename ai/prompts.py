@@ -0,0 +1,126 @@
+"""
+Реестр промптов для GigaChat.
+
+Промпты из папки prompts/ читаются один раз (при запуске бота или при
+первом обращении) и хранятся в памяти. Не чаще раза в PROMPT_CHECK_INTERVAL
+секунд реестр сверяет mtime файла и перечитывает измененный промпт, так что
+правка промпта не требует перезапуска.
+
+У каждого промпта есть версия - короткий хэш текста. Она сохраняется вместе
+с каждой записью о еде (food_entries.prompt_version), чтобы результаты
+разных версий промпта можно было сравнивать.
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, NamedTuple, Optional
+
+from config import DEBUG
+
+# Папка с промптами (относительно корня проекта, а не текущей директории)
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prompts')
+
+# Как часто проверять изменение файлов промптов (секунд)
+PROMPT_CHECK_INTERVAL = 5.0
+
+# Имена промптов
+KBJU_PROMPT = 'kbju'
+EDIT_PROMPT = 'edit'
+
+# Файлы и минимальные промпты по умолчанию (если файла нет)
+PROMPT_SOURCES = {
+    KBJU_PROMPT: (
+        'kbju_prompt.txt',
+        """Проанализируй текст с описанием еды и верни JSON со списком блюд и их КБЖУ.
+Формат: {"dishes": [{"name": "название", "calories": число, "protein": число, "fat": число, "carbs": число}]}
+Всегда отвечай только в этом формате."""
+    ),
+    EDIT_PROMPT: (
+        'edit_prompt.txt',
+        """Отредактируй запись о еде на основе запроса пользователя.
+Формат: {"name": "название", "calories": число, "protein": число, "fat": число, "carbs": число}
+Всегда отвечай только в этом формате."""
+    ),
+}
+
+
+class Prompt(NamedTuple):
+    """Текст промпта и его версия"""
+    text: str
+    version: str
+
+
+def prompt_version(text: str) -> str:
+    """Версия промпта - первые 12 символов sha256 его текста"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+class PromptRegistry:
+    """Промпты в памяти с перечитыванием по mtime"""
+
+    def __init__(self, directory: str = PROMPTS_DIR, check_interval: float = PROMPT_CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._prompts: Dict[str, Prompt] = {}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self.reloads = 0
+
+    def load(self) -> None:
+        """Загружает все промпты (при запуске бота)"""
+        for name in PROMPT_SOURCES:
+            self._reload(name, self._mtime(name))
+
+    def get(self, name: str) -> Prompt:
+        """Возвращает промпт, перечитывая файл, если он изменился"""
+        now = time.monotonic()
+        if name not in self._prompts:
+            self._reload(name, self._mtime(name))
+        elif now - self._checked_at[name] >= self.check_interval:
+            mtime = self._mtime(name)
+            if mtime != self._mtimes[name]:
+                self._reload(name, mtime)
+            self._checked_at[name] = now
+        return self._prompts[name]
+
+    def versions(self) -> Dict[str, str]:
+        """Текущие версии загруженных промптов"""
+        return {name: prompt.version for name, prompt in self._prompts.items()}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, PROMPT_SOURCES[name][0])
+
+    def _mtime(self, name: str) -> Optional[float]:
+        try:
+            return os.stat(self._path(name)).st_mtime
+        except OSError:
+            return None
+
+    def _reload(self, name: str, mtime: Optional[float]) -> None:
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            # Минимальный промпт по умолчанию
+            text = PROMPT_SOURCES[name][1]
+
+        previous = self._prompts.get(name)
+        prompt = Prompt(text, prompt_version(text))
+        self._prompts[name] = prompt
+        self._mtimes[name] = mtime
+        self._checked_at[name] = time.monotonic()
+
+        if previous is not None and previous.version != prompt.version:
+            self.reloads += 1
+            print(f"🔄 Промпт {name} перечитан: версия {previous.version} -> {prompt.version}")
+        elif DEBUG:
+            print(f"📄 Промпт {name} загружен, версия {prompt.version}")
+
+
+prompt_registry = PromptRegistry()
+
+
+def get_prompt(name: str) -> Prompt:
+    """Промпт из общего реестра процесса"""
+    return prompt_registry.get(name)
@@ -0,0 +1,151 @@
+"""
+Фоновый пересчет примерных значений через AI.
+
+Пока GigaChat не отвечает, блюда получают оценку по таблице продуктов
+(ai.estimator, source = 'fallback'). Такие записи ставятся в очередь и
+пересчитываются по одной, когда AI снова доступен (breaker замкнут):
+- текст пункта (название записи) анализируется как обычное сообщение
+  (кэш анализа, очередь к GigaChat и повторы - общие);
+- если AI вернул несколько блюд, они складываются в одну запись, чтобы
+  не менялось число записей приема пищи. Такая запись получает source =
+  'ai_combined': сумма блюд - не пример для словаря блюд, и при правке ее
+  не нужно вычитать из словаря. Одно блюдо сохраняется со своим source
+  ('ai' - попадает в словарь, как обычный ответ AI; 'ai_cached' - ответ
+  из кэша, уже учтенный в словаре);
+- запись обновляется, только если она все еще примерная: отредактированные
+  и удаленные пользователем записи не трогаются;
+- пока AI недоступен, очередь ждет retry_interval; пункт, который AI не
+  смог разобрать max_attempts раз, из очереди убирается.
+
+Запросы идут по одному, чтобы пересчет не отнимал очередь к GigaChat у
+новых сообщений сразу после восстановления.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import database.aio
+
+
+class EstimateReanalyzer:
+    """Очередь записей с примерными значениями на пересчет через AI"""
+
+    def __init__(
+        self,
+        analyze: Callable[[str], Awaitable[Optional[List[Dict[str, Any]]]]],
+        is_available: Callable[[], bool],
+        retry_interval: float,
+        max_pending: int,
+        max_attempts: int
+    ):
+        """
+        Args:
+            analyze: Анализ текста (AIService.analyze_food_text)
+            is_available: Отвечает ли AI сейчас
+            retry_interval: Пауза, пока AI недоступен или не ответил (секунд)
+            max_pending: Максимум записей в очереди (старые вытесняются)
+            max_attempts: Попыток пересчета на запись
+        """
+        self._analyze = analyze
+        self._is_available = is_available
+        self.retry_interval = retry_interval
+        self.max_pending = max(1, max_pending)
+        self.max_attempts = max(1, max_attempts)
+
+        # ID записи -> (ID пользователя, текст пункта, сделано попыток)
+        self._pending: 'OrderedDict[int, Tuple[int, str, int]]' = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+
+        # Счетчики
+        self.scheduled = 0
+        self.reanalyzed = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def schedule(self, user_id: int, dishes: List[Dict[str, Any]]) -> None:
+        """Ставит в очередь сохраненные блюда с примерными значениями (с ключом id)"""
+        for dish in dishes:
+            if dish.get('source') != 'fallback' or 'id' not in dish:
+                continue
+            self._pending[dish['id']] = (user_id, dish['name'], 0)
+            self.scheduled += 1
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        if self._pending and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Останавливает пересчет (очередь не сохраняется)"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер очереди и счетчики пересчета"""
+        return {
+            'pending': self.pending,
+            'scheduled': self.scheduled,
+            'reanalyzed': self.reanalyzed,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+        }
+
+    async def _run(self) -> None:
+        while self._pending:
+            if not self._is_available():
+                await asyncio.sleep(self.retry_interval)
+                continue
+            entry_id, (user_id, text, attempts) = next(iter(self._pending.items()))
+            try:
+                done = await self._reanalyze(entry_id, user_id, text)
+            except Exception as e:
+                print(f"❌ Ошибка пересчета записи {entry_id}: {e}")
+                done = False
+            if done:
+                continue
+
+            # AI не ответил: пробуем позже, после остальных записей. Попытка
+            # считается, только если AI доступен (не разобрал именно этот пункт)
+            if entry_id in self._pending:
+                del self._pending[entry_id]
+                attempts += 1 if self._is_available() else 0
+                if attempts < self.max_attempts:
+                    self._pending[entry_id] = (user_id, text, attempts)
+                else:
+                    self.dropped += 1
+            await asyncio.sleep(self.retry_interval)
+
+    async def _reanalyze(self, entry_id: int, user_id: int, text: str) -> bool:
+        """Пересчитывает одну запись; False - AI не ответил"""
+        dishes = await self._analyze(text)
+        if not dishes or any(dish.get('source') not in ('ai', 'ai_cached') for dish in dishes):
+            return False
+
+        self._pending.pop(entry_id, None)
+        row = {
+            'id': entry_id,
+            'name': ', '.join(dish['name'] for dish in dishes),
+            'calories': sum(dish['calories'] for dish in dishes),
+            'protein': sum(dish['protein'] for dish in dishes),
+            'fat': sum(dish['fat'] for dish in dishes),
+            'carbs': sum(dish['carbs'] for dish in dishes),
+            'grams': sum(dish['grams'] for dish in dishes),
+            'prompt_version': dishes[0].get('prompt_version'),
+            'source': dishes[0]['source'] if len(dishes) == 1 else 'ai_combined',
+        }
+        if await database.aio.replace_estimated_entries(user_id, [row]):
+            self.reanalyzed += 1
+        else:
+            # Пользователь уже отредактировал или удалил запись
+            self.skipped += 1
+        return True
@@ -0,0 +1,284 @@
+"""
+Устойчивость запросов к AI: повторы с экспоненциальной задержкой и
+джиттером в пределах дедлайна запроса и circuit breaker.
+
+Без этого любая ошибка GigaChat сразу превращалась в запасные 300 ккал,
+а во время сбоя каждый запрос пользователя ждал свой таймаут.
+ResilientCaller выполняет операцию (HTTP-запрос к AI):
+- временные ошибки (сеть, таймаут, 429, 5xx) повторяются с задержкой
+  random(0, min(max_delay, base_delay * 2^попытка)) - "full jitter", чтобы
+  повторы разных пользователей не приходили в GigaChat одновременно;
+- у запроса один дедлайн (Deadline) на все попытки, ожидание очереди и
+  паузы: операция получает его и ограничивает им свои таймауты, а повтор,
+  который не успевает до дедлайна, не начинается;
+- CircuitBreaker считает подряд идущие сбои AI и после failure_threshold
+  "размыкается": запросы сразу получают CircuitOpenError, пока через
+  reset_timeout один пробный запрос не покажет, что AI снова отвечает.
+  429 - признак перегрузки, а не сбоя, и breaker не размыкает (нагрузку
+  регулирует AdaptiveLimiter).
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+
+T = TypeVar('T')
+
+# HTTP-статусы временных ошибок, после которых запрос стоит повторить
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Состояния breaker
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class APIError(Exception):
+    """Ответ AI с HTTP-статусом ошибки"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(Exception):
+    """AI недоступен (breaker разомкнут): запрос не отправлялся"""
+
+
+class DeadlineExceeded(Exception):
+    """Дедлайн запроса истек до очередной попытки"""
+
+
+class NonRetryableError(Exception):
+    """
+    Ошибка, после которой запрос нельзя повторить (например, часть потокового
+    ответа уже показана пользователю). Исходная ошибка - в __cause__.
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Временная ли ошибка (сеть, таймаут, 429, 5xx)"""
+    if isinstance(error, APIError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Признак сбоя AI для breaker: временная ошибка, кроме перегрузки (429)"""
+    if isinstance(error, NonRetryableError) and error.__cause__ is not None:
+        error = error.__cause__
+    if isinstance(error, APIError) and error.status == 429:
+        return False
+    return is_retryable(error)
+
+
+class Deadline:
+    """Момент, к которому запрос должен завершиться (все попытки вместе)"""
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось (0, если дедлайн прошел)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cap(self, timeout: float) -> float:
+        """
+        Таймаут одной операции, не выходящий за дедлайн.
+
+        Raises:
+            DeadlineExceeded: Времени не осталось
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Дедлайн запроса к AI истек")
+        return min(timeout, remaining)
+
+
+class CircuitBreaker:
+    """Размыкается после failure_threshold сбоев подряд, пробует снова через reset_timeout"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Args:
+            failure_threshold: Сколько сбоев подряд размыкают breaker
+            reset_timeout: Через сколько секунд после размыкания пробовать снова
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+
+        # Счетчики
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """closed, open или half_open (пора отправить пробный запрос)"""
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return CIRCUIT_HALF_OPEN
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """AI считается недоступным: запросы отклоняются без отправки"""
+        state = self.state
+        return state == CIRCUIT_OPEN or (state == CIRCUIT_HALF_OPEN and self._probe_inflight)
+
+    def before_call(self) -> None:
+        """
+        Пропускает запрос или отклоняет его.
+
+        Raises:
+            CircuitOpenError: Breaker разомкнут (или пробный запрос уже идет)
+        """
+        state = self.state
+        if state == CIRCUIT_CLOSED:
+            return
+        if state == CIRCUIT_HALF_OPEN and not self._probe_inflight:
+            # Один пробный запрос; остальные ждут его результата, получая отказ
+            self._state = CIRCUIT_HALF_OPEN
+            self._probe_inflight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError("AI временно недоступен")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_inflight = False
+        self._state = CIRCUIT_CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probe_inflight or self._failures >= self.failure_threshold:
+            if self._state != CIRCUIT_OPEN:
+                self.opened += 1
+                print(f"⚠️  AI недоступен ({self._failures} сбоев подряд), запросы отклоняются {self.reset_timeout:g} с")
+            self._state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_inflight = False
+
+    def release_probe(self) -> None:
+        """Пробный запрос прерван без результата: следующий запрос снова будет пробным"""
+        self._probe_inflight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'opened': self.opened,
+            'rejected': self.rejected,
+        }
+
+
+class ResilientCaller:
+    """Повторы с экспоненциальной задержкой и джиттером в пределах дедлайна и circuit breaker"""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float,
+        breaker: CircuitBreaker
+    ):
+        """
+        Args:
+            max_attempts: Сколько всего попыток на запрос
+            base_delay: Задержка перед первым повтором (верхняя граница, секунд)
+            max_delay: Максимальная задержка между попытками (секунд)
+            deadline: Дедлайн запроса по умолчанию (секунд на все попытки)
+            breaker: Общий breaker сервиса
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker
+
+        # Счетчики
+        self.calls = 0
+        self.retries = 0
+        self.recovered = 0
+        self.failed = 0
+        self.deadline_exceeded = 0
+
+    def new_deadline(self) -> Deadline:
+        """Дедлайн для нового запроса пользователя"""
+        return Deadline(self.deadline)
+
+    async def call(
+        self,
+        operation: Callable[[Deadline], Awaitable[T]],
+        deadline: Optional[Deadline] = None
+    ) -> T:
+        """
+        Выполняет operation(deadline), повторяя временные ошибки.
+
+        Args:
+            operation: Попытка запроса; таймауты внутри ограничивает deadline
+            deadline: Дедлайн запроса (по умолчанию - новый на self.deadline секунд)
+
+        Raises:
+            CircuitOpenError: AI недоступен, запрос не отправлялся
+            DeadlineExceeded: Дедлайн истек
+            Exception: Ошибка последней попытки
+        """
+        if deadline is None:
+            deadline = self.new_deadline()
+        self.calls += 1
+
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            attempt += 1
+            try:
+                result = await operation(deadline)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded):
+                    self.deadline_exceeded += 1
+                if is_upstream_failure(e):
+                    self.breaker.record_failure()
+                elif isinstance(e, APIError):
+                    # AI ответил (4xx, перегрузка) - он доступен
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release_probe()
+
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if not is_retryable(e) or attempt >= self.max_attempts or delay >= deadline.remaining():
+                    self.failed += 1
+                    if is_retryable(e) and attempt < self.max_attempts:
+                        self.deadline_exceeded += 1
+                    raise
+                self.retries += 1
+                print(f"🔁 Повтор запроса к AI через {delay:.2f} с (попытка {attempt + 1}/{self.max_attempts}): {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            if attempt > 1:
+                self.recovered += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попыток и состояние breaker"""
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'recovered': self.recovered,
+            'failed': self.failed,
+            'deadline_exceeded': self.deadline_exceeded,
+            'breaker': self.breaker.stats(),
+        }
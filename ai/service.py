@@ -6,114 +6,330 @@ https://developers.sber.ru/docs/ru/gigachat/quickstart/ind-using-api
 import json
 import asyncio
 import aiohttp
-import uuid
-import time
-from typing import List, Dict, Any, Optional
-from config import GIGACHAT_AUTH_KEY, DEBUG, AI_TIMEOUT
+from typing import Awaitable, Callable, List, Dict, Any, Optional
+from config import (
+    GIGACHAT_AUTH_KEY, DEBUG, AI_TIMEOUT, GIGACHAT_API_URL,
+    AI_CONNECTION_LIMIT, AI_KEEPALIVE_TIMEOUT, AI_DNS_CACHE_TTL,
+    AI_BATCH_ENABLED, AI_BATCH_MAX_SIZE, AI_BATCH_MAX_WAIT_MS, AI_STREAM_ENABLED,
+    AI_CONCURRENCY_INITIAL, AI_CONCURRENCY_MIN, AI_CONCURRENCY_MAX,
+    AI_RATE_LIMIT, AI_RATE_BURST, AI_QUEUE_TIMEOUT,
+    AI_REQUEST_DEADLINE, AI_RETRY_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY,
+    AI_BREAKER_THRESHOLD, AI_BREAKER_RESET_TIMEOUT,
+    AI_REANALYSIS_MAX_PENDING, AI_REANALYSIS_ATTEMPTS
+)
+from ai.auth import TokenManager
+from ai.prompts import prompt_registry, get_prompt, KBJU_PROMPT, EDIT_PROMPT
+from ai.cache import analysis_cache, analysis_cache_key, normalize_food_text
+from ai.coalescing import RequestCoalescer
+from ai.batching import BatchScheduler, build_batch_prompt, parse_batch_response
+from ai.streaming import IncrementalDishParser, iter_sse_chunks
+from ai.limiter import AdaptiveLimiter, OVERLOAD_STATUSES
+from ai.parsing import extract_dishes, loads, validate_dishes
+from ai.estimator import food_estimator
+from ai.reanalysis import EstimateReanalyzer
+from ai.resilience import (
+    APIError, CircuitBreaker, CircuitOpenError, Deadline, NonRetryableError, ResilientCaller
+)
+from database.dish_dictionary import dish_key
+
+# Обработчик блюда из потокового ответа (для показа прогресса)
+DishCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Системные сообщения запросов
+ANALYZE_SYSTEM_PROMPT = "Ты помощник для подсчёта КБЖУ. Всегда отвечай только в формате JSON."
+EDIT_SYSTEM_PROMPT = "Ты помощник для редактирования записей о еде. Всегда отвечай только в формате JSON."
+
+
+def _mark_repeated_dishes(dishes: List[Dict[str, Any]], fresh: bool) -> None:
+    """
+    Оставляет source = 'ai' только блюдам, которые словарь блюд еще не видел:
+    первому вхождению блюда в новом ответе AI. Повтор блюда в том же ответе
+    и ответ, полученный присоединившимся к чужому запросу, помечаются
+    'ai_cached' - их значения уже учтены (или будут учтены) в словаре.
+    """
+    seen = set()
+    for dish in dishes:
+        if dish.get('source') != 'ai':
+            continue
+        key = dish_key(dish['name'])
+        if not fresh or key in seen:
+            dish['source'] = 'ai_cached'
+        seen.add(key)
 
 class AIService:
     def __init__(self):
-        self.access_token = None
-        self.token_expires_at = 0
+        # Общая HTTP-сессия: соединения с GigaChat переиспользуются между запросами
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Повторы временных ошибок в пределах дедлайна и circuit breaker
+        # для всех HTTP-запросов к GigaChat (OAuth и chat/completions)
+        self.breaker = CircuitBreaker(AI_BREAKER_THRESHOLD, AI_BREAKER_RESET_TIMEOUT)
+        self.resilience = ResilientCaller(
+            AI_RETRY_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY,
+            AI_REQUEST_DEADLINE, self.breaker
+        )
+        self.token_manager = TokenManager(
+            GIGACHAT_AUTH_KEY, 'GIGACHAT_API_PERS', self._get_session, caller=self.resilience
+        )
+        # Объединение одинаковых одновременных анализов
+        self.coalescer = RequestCoalescer()
+        # Разные одновременные анализы - одним запросом (если включено)
+        self.batcher: Optional[BatchScheduler] = None
+        if AI_BATCH_ENABLED:
+            self.batcher = BatchScheduler(
+                self._call_gigachat_batch, self._call_single,
+                AI_BATCH_MAX_SIZE, AI_BATCH_MAX_WAIT_MS / 1000
+            )
+        
+        # Очередь перед каждым запросом к chat/completions (вместо 429 под нагрузкой)
+        self.limiter = AdaptiveLimiter(
+            AI_CONCURRENCY_INITIAL, AI_CONCURRENCY_MIN, AI_CONCURRENCY_MAX,
+            AI_RATE_LIMIT, AI_RATE_BURST, AI_QUEUE_TIMEOUT
+        )
+        
+        # Пересчет через AI примерных значений, когда AI снова отвечает
+        self.reanalyzer = EstimateReanalyzer(
+            self.analyze_food_text, lambda: self.available,
+            AI_BREAKER_RESET_TIMEOUT, AI_REANALYSIS_MAX_PENDING, AI_REANALYSIS_ATTEMPTS
+        )
+        
+        # Расход токенов по ответам GigaChat
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+    
+    async def start(self) -> None:
+        """Загружает промпты, открывает HTTP-сессию и запускает фоновое обновление токена (при запуске бота)"""
+        prompt_registry.load()
+        self._get_session()
+        self.token_manager.start()
+    
+    async def close(self) -> None:
+        """Закрывает HTTP-сессию и соединения (при остановке бота)"""
+        await self.reanalyzer.close()
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.token_manager.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая ее при первом обращении"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=AI_CONNECTION_LIMIT,
+                keepalive_timeout=AI_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=AI_DNS_CACHE_TTL,
+                ssl=False
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=AI_TIMEOUT)
+            )
+        return self._session
     
-    async def analyze_food_text(self, text: str) -> Optional[List[Dict[str, Any]]]:
+    @property
+    def available(self) -> bool:
+        """GigaChat отвечает (breaker не разомкнут); иначе анализы - примерные значения"""
+        return not self.breaker.is_open
+    
+    def stats(self) -> Dict[str, Any]:
+        """Очередь, повторы, состояние breaker и примерные значения"""
+        return {
+            'limiter': self.limiter.stats(),
+            'resilience': self.resilience.stats(),
+            'estimator': food_estimator.stats(),
+            'reanalysis': self.reanalyzer.stats(),
+            'usage': dict(self.usage),
+        }
+    
+    async def analyze_food_text(self, text: str, on_dish: Optional[DishCallback] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Основной метод: анализирует текст с едой через GigaChat API
+        
+        Args:
+            text: Текст пользователя
+            on_dish: Вызывается для каждого блюда, как только оно появилось
+                в потоковом ответе (если AI_STREAM_ENABLED); вызывающие,
+                присоединившиеся к уже идущему запросу, получают только итог
         """
         if DEBUG:
             print(f"🤖 Анализируем: '{text}'")
         
         try:
-            # Получаем токен
-            token = await self._get_access_token()
+            # Тот же текст с той же версией промпта уже анализировался
+            prompt_version = get_prompt(KBJU_PROMPT).version
+            cached = await analysis_cache.get(text, prompt_version)
+            if cached:
+                if DEBUG:
+                    print(f"⚡ Результат из кэша: {len(cached)} блюд")
+                # В кэше только ответы AI, они уже попали в словарь блюд,
+                # когда пришли впервые - повторно их не учитываем
+                for dish in cached:
+                    dish['source'] = 'ai_cached'
+                return cached
+            
+            # Одинаковые одновременные запросы ждут один общий вызов GigaChat
+            # (один дедлайн на очередь, токен, все повторы и ответ)
+            key = analysis_cache_key(normalize_food_text(text), prompt_version)
+            deadline = self.resilience.new_deadline()
+            started = []
             
-            # Отправляем запрос к GigaChat
-            dishes = await self._call_gigachat_api(token, text)
+            def analyze() -> Awaitable[List[Dict[str, Any]]]:
+                # Вызывается только для запроса, который начал общий вызов
+                started.append(True)
+                return self._analyze_with_api(text, on_dish, deadline)
+            
+            dishes = await self.coalescer.run(key, analyze)
             
             if dishes and len(dishes) > 0:
                 if DEBUG:
                     print(f"✅ Получено {len(dishes)} блюд")
+                _mark_repeated_dishes(dishes, fresh=bool(started))
                 return dishes
             else:
                 if DEBUG:
                     print("⚠️  Пустой ответ от AI, использую заглушку")
                 return self._get_fallback_response(text)
-                
+        
+        except CircuitOpenError:
+            # GigaChat недоступен - не ждем таймаута, сразу примерные значения
+            print("⚠️  AI недоступен, использую заглушку")
+            return self._get_fallback_response(text)
         except Exception as e:
             print(f"❌ Ошибка AI: {e}")
             return self._get_fallback_response(text)
     
+    async def _analyze_with_api(
+        self,
+        text: str,
+        on_dish: Optional[DishCallback] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        """Запрос к GigaChat и сохранение ответа в кэш (выполняется один раз на группу одинаковых запросов)"""
+        # Отправляем запрос к GigaChat: потоком (если ждут прогресс), отдельно или в составе пачки
+        if on_dish is not None and AI_STREAM_ENABLED:
+            dishes = await self._call_single(text, on_dish, deadline)
+        elif self.batcher is not None:
+            dishes = await self.batcher.submit(text)
+        else:
+            dishes = await self._call_single(text, deadline=deadline)
+        
+        if dishes:
+            # Запасной ответ не кэшируется - только ответ AI
+            await analysis_cache.put(text, dishes[0].get('prompt_version'), dishes)
+        return dishes
+    
     async def _get_access_token(self) -> str:
         """
-        Получаем access token по документации:
-        POST https://ngw.devices.sberbank.ru:9443/api/v2/oauth
-        Authorization: Basic {authorization_key}
-        scope: GIGACHAT_API_PERS
+        Получаем access token (scope GIGACHAT_API_PERS) через TokenManager:
+        токен обновляется в фоне, одновременные запросы не дублируют OAuth
+        """
+        return await self.token_manager.get_token()
+    
+    async def _call_single(
+        self,
+        text: str,
+        on_dish: Optional[DishCallback] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Анализ одного текста отдельным запросом"""
+        token = await self._get_access_token()
+        return await self._call_gigachat_api(token, text, on_dish, deadline)
+    
+    async def _call_gigachat_api(
+        self,
+        access_token: str,
+        text: str,
+        on_dish: Optional[DishCallback] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Отправляем запрос к GigaChat API для анализа текста
+        (с on_dish - потоком, блюда передаются по мере получения)
         """
-        # Если токен ещё действителен (30 минут - 5 минут запаса)
-        if self.access_token and time.time() < self.token_expires_at - 300:
-            return self.access_token
+        # Промпт из реестра (в памяти, перечитывается при изменении файла)
+        prompt = get_prompt(KBJU_PROMPT)
         
-        if not GIGACHAT_AUTH_KEY:
-            raise ValueError("GIGACHAT_AUTH_KEY не установлен в .env")
+        # Формируем полный промпт
+        full_prompt = f"{prompt.text}\n\nТекст пользователя: {text}"
         
-        # Создаем уникальный RqUID
-        rquid = str(uuid.uuid4())
+        if DEBUG:
+            print(f"📤 Отправляю запрос к GigaChat API...")
         
-        # Заголовки как в документации
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Accept': 'application/json',
-            'RqUID': rquid,
-            'Authorization': f'Basic {GIGACHAT_AUTH_KEY}'
-        }
+        on_delta = None
+        if on_dish is not None:
+            parser = IncrementalDishParser()
+            
+            async def on_delta(chunk: str) -> None:
+                for dish in self._validate_dishes(parser.feed(chunk)):
+                    dish['prompt_version'] = prompt.version
+                    dish['source'] = 'ai'
+                    await on_dish(dish)
         
-        # Данные формы
-        data = {'scope': 'GIGACHAT_API_PERS'}
+        try:
+            response_text = await self._post_chat(
+                access_token, ANALYZE_SYSTEM_PROMPT, full_prompt, on_delta=on_delta, deadline=deadline
+            )
+            
+            # Парсим JSON и помечаем блюда версией промпта и источником
+            dishes = self._parse_ai_response(response_text)
+            for dish in dishes:
+                dish['prompt_version'] = prompt.version
+                dish['source'] = 'ai'
+            return dishes
+                
+        except Exception as e:
+            print(f"❌ Ошибка при вызове GigaChat API: {e}")
+            raise
+    
+    async def _call_gigachat_batch(self, texts: List[str]) -> Optional[List[List[Dict[str, Any]]]]:
+        """
+        Анализ нескольких текстов одним запросом.
+        
+        Returns:
+            Списки блюд в порядке texts или None, если ответ не разобрался
+        """
+        token = await self._get_access_token()
+        prompt = get_prompt(KBJU_PROMPT)
         
         if DEBUG:
-            print(f"🔑 Запрашиваю токен...")
+            print(f"📤 Отправляю пачку из {len(texts)} текстов к GigaChat API...")
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    'https://ngw.devices.sberbank.ru:9443/api/v2/oauth',
-                    headers=headers,
-                    data=data,
-                    ssl=False,
-                    timeout=AI_TIMEOUT
-                ) as response:
-                    
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Ошибка получения токена: {response.status} - {error_text}")
-                    
-                    result = await response.json()
-                    
-                    # Сохраняем токен
-                    self.access_token = result['access_token']
-                    # expires_at в миллисекундах, переводим в секунды
-                    self.token_expires_at = result.get('expires_at', 0) / 1000
-                    
-                    if DEBUG:
-                        print(f"✅ Токен получен, действителен до: {time.ctime(self.token_expires_at)}")
-                    
-                    return self.access_token
-                    
-            except Exception as e:
-                print(f"❌ Ошибка при получении токена: {e}")
-                raise
+        response_text = await self._post_chat(
+            token, ANALYZE_SYSTEM_PROMPT, build_batch_prompt(prompt.text, texts),
+            max_tokens=1000 * len(texts)
+        )
+        
+        results = parse_batch_response(response_text, len(texts))
+        if results is None:
+            if DEBUG:
+                print(f"⚠️  Ответ пачки не разобран: {response_text[:200]}")
+            return None
+        
+        batch_dishes = []
+        for raw_dishes in results:
+            dishes = self._validate_dishes(raw_dishes)
+            for dish in dishes:
+                dish['prompt_version'] = prompt.version
+                dish['source'] = 'ai'
+            batch_dishes.append(dishes)
+        return batch_dishes
     
-    async def _call_gigachat_api(self, access_token: str, text: str) -> Optional[List[Dict[str, Any]]]:
+    async def _post_chat(
+        self,
+        access_token: str,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 1000,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
         """
-        Отправляем запрос к GigaChat API для анализа текста
-        """
-        # Загружаем промпт
-        prompt = await self._load_prompt()
-        
-        # Формируем полный промпт
-        full_prompt = f"{prompt}\n\nТекст пользователя: {text}"
+        Отправляет запрос в chat/completions и возвращает текст ответа модели.
+        С on_delta ответ читается потоком (SSE), on_delta получает каждый кусок текста.
         
+        Временные ошибки повторяются в пределах deadline (по умолчанию -
+        AI_REQUEST_DEADLINE от начала запроса), пока breaker сервиса замкнут.
+        """
         # Заголовки для API запроса
         headers = {
             'Authorization': f'Bearer {access_token}',
@@ -127,161 +343,117 @@ class AIService:
             "messages": [
                 {
                     "role": "system",
-                    "content": "Ты помощник для подсчёта КБЖУ. Всегда отвечай только в формате JSON."
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
-                    "content": full_prompt
+                    "content": user_prompt
                 }
             ],
             "temperature": 0.3,
-            "max_tokens": 1000,
-            "stream": False
+            "max_tokens": max_tokens,
+            "stream": on_delta is not None
         }
+        if on_delta is not None:
+            headers['Accept'] = 'text/event-stream'
         
-        if DEBUG:
-            print(f"📤 Отправляю запрос к GigaChat API...")
-        
-        async with aiohttp.ClientSession() as session:
+        return await self.resilience.call(
+            lambda attempt_deadline: self._post_chat_once(headers, payload, on_delta, attempt_deadline),
+            deadline
+        )
+    
+    async def _post_chat_once(
+        self,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        on_delta: Optional[Callable[[str], Awaitable[None]]],
+        deadline: Deadline
+    ) -> str:
+        """Одна попытка запроса в chat/completions (очередь и ответ - в пределах дедлайна)"""
+        delivered = False
+        # Очередь к GigaChat: адаптивный лимит одновременных запросов и частоты
+        async with self.limiter.slot(deadline.cap(self.limiter.queue_timeout)) as permit:
+            session = self._get_session()
             try:
                 async with session.post(
-                    'https://gigachat.devices.sberbank.ru/api/v1/chat/completions',
+                    GIGACHAT_API_URL,
                     headers=headers,
                     json=payload,
-                    ssl=False,
-                    timeout=AI_TIMEOUT
+                    timeout=aiohttp.ClientTimeout(total=deadline.cap(AI_TIMEOUT))
                 ) as response:
                     
                     if response.status != 200:
+                        if response.status in OVERLOAD_STATUSES:
+                            permit.overloaded()
                         error_text = await response.text()
-                        raise Exception(f"Ошибка API: {response.status} - {error_text}")
-                    
-                    result = await response.json()
+                        raise APIError(response.status, f"Ошибка API: {response.status} - {error_text}")
                     
-                    if DEBUG:
-                        print(f"📥 Ответ получен, парсим...")
-                    
-                    # Извлекаем текст ответа
-                    response_text = result['choices'][0]['message']['content']
-                    
-                    # Парсим JSON
-                    return self._parse_ai_response(response_text)
-                    
-            except Exception as e:
-                print(f"❌ Ошибка при вызове GigaChat API: {e}")
+                    if on_delta is None:
+                        result = await response.json(loads=loads)
+                        usage = result.get('usage') or {}
+                        # Извлекаем текст ответа
+                        content = result['choices'][0]['message']['content']
+                    else:
+                        # Потоковый ответ: куски текста в choices[0].delta.content,
+                        # usage - в последнем событии
+                        parts = []
+                        usage = {}
+                        async for event in iter_sse_chunks(response):
+                            usage = event.get('usage') or usage
+                            choices = event.get('choices') or [{}]
+                            chunk = (choices[0].get('delta') or {}).get('content') or ''
+                            if chunk:
+                                parts.append(chunk)
+                                delivered = True
+                                await on_delta(chunk)
+                        content = ''.join(parts)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if delivered:
+                    # Часть блюд уже показана - повтор показал бы их второй раз
+                    raise NonRetryableError(f"Потоковый ответ прерван: {e!r}") from e
                 raise
-    
-    async def _load_prompt(self) -> str:
-        """Загружаем промпт из файла"""
-        try:
-            with open('prompts/kbju_prompt.txt', 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            # Минимальный промпт по умолчанию
-            return """Проанализируй текст с описанием еды и верни JSON со списком блюд и их КБЖУ.
-Формат: {"dishes": [{"name": "название", "calories": число, "protein": число, "fat": число, "carbs": число}]}
-Всегда отвечай только в этом формате."""
+            
+            if DEBUG:
+                print(f"📥 Ответ получен, парсим...")
+            
+            self.usage['requests'] += 1
+            self.usage['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            self.usage['completion_tokens'] += usage.get('completion_tokens', 0)
+            return content
     
     def _parse_ai_response(self, response_text: str) -> List[Dict[str, Any]]:
         """
         Парсим ответ AI в список блюд
         """
-        try:
-            # Очищаем ответ от возможного markdown
-            import re
-            
-            # Убираем ```json и ```
-            clean_text = re.sub(r'```json|```', '', response_text).strip()
-            
-            # Ищем JSON объект
-            json_match = re.search(r'\{.*\}', clean_text, re.DOTALL)
-            if not json_match:
-                if DEBUG:
-                    print(f"❌ JSON не найден в ответе: {response_text[:200]}")
-                return []
-            
-            json_str = json_match.group()
-            data = json.loads(json_str)
-            
-            dishes = data.get('dishes', [])
-            
-            # Валидируем и нормализуем данные
-            valid_dishes = []
-            for dish in dishes:
-                if not isinstance(dish, dict):
-                    continue
-                
-                name = dish.get('name', '').strip()
-                if not name:
-                    continue
-                
-                # Округляем значения
-                calories = round(float(dish.get('calories', 300)))
-                protein = round(float(dish.get('protein', 10)))
-                fat = round(float(dish.get('fat', 10)))
-                carbs = round(float(dish.get('carbs', 40)))
-                grams = round(float(dish.get('grams', 100)))
-                
-                # Ограничиваем разумные пределы
-                calories = max(0, min(calories, 2000))
-                protein = max(0, min(protein, 100))
-                fat = max(0, min(fat, 100))
-                carbs = max(0, min(carbs, 200))
-                grams = max(1, min(grams, 5000))  # От 1г до 5кг
-                
-                valid_dishes.append({
-                    'name': name,
-                    'calories': calories,
-                    'protein': protein,
-                    'fat': fat,
-                    'carbs': carbs,
-                    'grams': grams
-                })
-            
+        dishes = extract_dishes(response_text)
+        if dishes is None:
             if DEBUG:
-                print(f"✅ Распарсено {len(valid_dishes)} блюд")
-            
-            return valid_dishes
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ Ошибка декодирования JSON: {e}")
-            print(f"Текст ответа: {response_text[:200]}...")
-            return []
-        except Exception as e:
-            print(f"❌ Ошибка парсинга ответа: {e}")
+                print(f"❌ JSON не найден в ответе: {response_text[:200]}")
             return []
+        
+        # Валидируем и нормализуем данные
+        valid_dishes = self._validate_dishes(dishes)
+        
+        if DEBUG:
+            print(f"✅ Распарсено {len(valid_dishes)} блюд")
+        
+        return valid_dishes
+    
+    def _validate_dishes(self, dishes: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Проверяет блюда из ответа AI: округляет значения и ограничивает разумные пределы
+        """
+        return validate_dishes(dishes)
     
     def _get_fallback_response(self, text: str) -> List[Dict[str, Any]]:
         """
-        Запасной вариант на случай ошибки AI
+        Запасной вариант на случай ошибки AI: оценка по таблице продуктов
+        (source = 'fallback', значения примерные)
         """
         if DEBUG:
             print(f"🔄 Использую запасной вариант для: {text}")
         
-        # Простая логика разделения
-        parts = []
-        if ' и ' in text:
-            parts = text.split(' и ')
-        elif ', ' in text:
-            parts = text.split(', ')
-        else:
-            parts = [text]
-        
-        dishes = []
-        for part in parts:
-            part = part.strip()
-            if part:
-                # Простые значения по умолчанию
-                dishes.append({
-                    'name': part,
-                    'calories': 300,
-                    'protein': 12,
-                    'fat': 8,
-                    'carbs': 40,
-                    'grams': 150
-                })
-        
-        return dishes
+        return food_estimator.estimate(text)
     
     async def process_edit(self, original_entry: Dict[str, Any], edit_text: str) -> Optional[Dict[str, Any]]:
         """
@@ -302,8 +474,8 @@ class AIService:
             # Получаем токен
             token = await self._get_access_token()
             
-            # Загружаем промпт для редактирования
-            prompt = await self._load_edit_prompt()
+            # Промпт для редактирования из реестра
+            prompt = get_prompt(EDIT_PROMPT)
             
             # Формируем список оригинальных блюд
             original_dishes = []
@@ -319,80 +491,28 @@ class AIService:
             
             original_json = json.dumps({"dishes": original_dishes}, ensure_ascii=False)
             
-            full_prompt = f"{prompt}\n\nОригинальный прием пищи: {original_json}\nЗапрос пользователя: {edit_text}"
-            
-            # Заголовки для API запроса
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            # Тело запроса
-            payload = {
-                "model": "GigaChat",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Ты помощник для редактирования записей о еде. Всегда отвечай только в формате JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ],
-                "temperature": 0.3,
-                "max_tokens": 1000,
-                "stream": False
-            }
+            full_prompt = f"{prompt.text}\n\nОригинальный прием пищи: {original_json}\nЗапрос пользователя: {edit_text}"
             
             if DEBUG:
                 print(f"📤 Отправляю запрос на редактирование к GigaChat API...")
             
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.post(
-                        'https://gigachat.devices.sberbank.ru/api/v1/chat/completions',
-                        headers=headers,
-                        json=payload,
-                        ssl=False,
-                        timeout=AI_TIMEOUT
-                    ) as response:
-                        
-                        if response.status != 200:
-                            error_text = await response.text()
-                            raise Exception(f"Ошибка API: {response.status} - {error_text}")
-                        
-                        result = await response.json()
-                        
-                        if DEBUG:
-                            print(f"📥 Ответ получен, парсим...")
-                        
-                        # Извлекаем текст ответа
-                        response_text = result['choices'][0]['message']['content']
-                        
-                        # Парсим JSON
-                        return self._parse_edit_meal_response(response_text, len(original_entries))
-                        
-                except Exception as e:
-                    print(f"❌ Ошибка при вызове GigaChat API для редактирования: {e}")
-                    raise
+            try:
+                response_text = await self._post_chat(token, EDIT_SYSTEM_PROMPT, full_prompt)
+                
+                # Парсим JSON и помечаем блюда версией промпта
+                dishes = self._parse_edit_meal_response(response_text, len(original_entries))
+                for dish in dishes or []:
+                    dish['prompt_version'] = prompt.version
+                return dishes
+                    
+            except Exception as e:
+                print(f"❌ Ошибка при вызове GigaChat API для редактирования: {e}")
+                raise
                     
         except Exception as e:
             print(f"❌ Ошибка при обработке редактирования: {e}")
             return None
     
-    async def _load_edit_prompt(self) -> str:
-        """Загружаем промпт для редактирования из файла"""
-        try:
-            with open('prompts/edit_prompt.txt', 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            # Минимальный промпт по умолчанию
-            return """Отредактируй запись о еде на основе запроса пользователя.
-Формат: {"name": "название", "calories": число, "protein": число, "fat": число, "carbs": число}
-Всегда отвечай только в этом формате."""
-    
     def _parse_edit_response(self, response_text: str) -> Optional[Dict[str, Any]]:
         """
         Парсит ответ AI при редактировании в словарь с обновленными данными
@@ -405,83 +525,37 @@ class AIService:
         """
         Парсит ответ AI при редактировании приема пищи в список обновленных блюд
         """
-        try:
-            # Очищаем ответ от возможного markdown
-            import re
-            
-            # Убираем ```json и ```
-            clean_text = re.sub(r'```json|```', '', response_text).strip()
-            
-            # Ищем JSON объект
-            json_match = re.search(r'\{.*\}', clean_text, re.DOTALL)
-            if not json_match:
-                if DEBUG:
-                    print(f"❌ JSON не найден в ответе: {response_text[:200]}")
-                return None
-            
-            json_str = json_match.group()
-            data = json.loads(json_str)
-            
-            # Проверяем формат ответа - может быть список блюд или один объект
-            dishes = []
-            if 'dishes' in data:
-                dishes = data['dishes']
-            elif isinstance(data, list):
-                dishes = data
-            else:
-                # Один объект блюда
-                dishes = [data]
-            
-            # Валидируем и нормализуем данные
-            valid_dishes = []
-            for dish in dishes:
-                if not isinstance(dish, dict):
-                    continue
-                
-                name = dish.get('name', '').strip()
-                if not name:
-                    continue
-                
-                # Округляем значения
-                calories = round(float(dish.get('calories', 300)))
-                protein = round(float(dish.get('protein', 10)))
-                fat = round(float(dish.get('fat', 10)))
-                carbs = round(float(dish.get('carbs', 40)))
-                grams = round(float(dish.get('grams', 100)))
-                
-                # Ограничиваем разумные пределы
-                calories = max(0, min(calories, 2000))
-                protein = max(0, min(protein, 100))
-                fat = max(0, min(fat, 100))
-                carbs = max(0, min(carbs, 200))
-                grams = max(1, min(grams, 5000))  # От 1г до 5кг
-                
-                valid_dishes.append({
-                    'name': name,
-                    'calories': calories,
-                    'protein': protein,
-                    'fat': fat,
-                    'carbs': carbs,
-                    'grams': grams
-                })
-            
-            # Проверяем, что количество блюд совпадает
-            if len(valid_dishes) != expected_count:
-                if DEBUG:
-                    print(f"⚠️  Количество блюд не совпадает: ожидалось {expected_count}, получено {len(valid_dishes)}")
-                # Если количество не совпадает, возвращаем то что есть или None
-                if len(valid_dishes) == 0:
-                    return None
-            
+        # Ответ - список блюд в "dishes" или один объект блюда
+        dishes = extract_dishes(response_text, allow_single=True)
+        if dishes is None:
             if DEBUG:
-                print(f"✅ Распарсено редактирование: {len(valid_dishes)} блюд")
-            
-            return valid_dishes
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ Ошибка декодирования JSON: {e}")
-            print(f"Текст ответа: {response_text[:200]}...")
+                print(f"❌ JSON не найден в ответе: {response_text[:200]}")
             return None
-        except Exception as e:
-            print(f"❌ Ошибка парсинга ответа редактирования: {e}")
-            return None
\ No newline at end of file
+        
+        # Валидируем и нормализуем данные
+        valid_dishes = self._validate_dishes(dishes)
+        
+        # Проверяем, что количество блюд совпадает
+        if len(valid_dishes) != expected_count:
+            if DEBUG:
+                print(f"⚠️  Количество блюд не совпадает: ожидалось {expected_count}, получено {len(valid_dishes)}")
+            # Если количество не совпадает, возвращаем то что есть или None
+            if len(valid_dishes) == 0:
+                return None
+        
+        if DEBUG:
+            print(f"✅ Распарсено редактирование: {len(valid_dishes)} блюд")
+        
+        return valid_dishes
+
+
+# Общий экземпляр на процесс: одна HTTP-сессия и один токен для всех обработчиков
+_ai_service: Optional[AIService] = None
+
+
+def get_ai_service() -> AIService:
+    """Возвращает общий AIService процесса"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
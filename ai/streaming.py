@@ -0,0 +1,104 @@
+"""
+Потоковые ответы GigaChat ("stream": true).
+
+GigaChat присылает ответ событиями SSE:
+    data: {"choices": [{"delta": {"content": "..."}}], ...}
+    data: [DONE]
+
+IncrementalDishParser получает куски текста модели и возвращает блюда
+по мере того, как закрывается JSON-объект очередного блюда в массиве
+"dishes", не дожидаясь конца ответа. Итоговый список блюд по-прежнему
+берется из полного текста ответа - потоковые блюда нужны для показа
+прогресса пользователю.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from ai.parsing import loads
+
+_DONE = '[DONE]'
+
+
+async def iter_sse_chunks(response: aiohttp.ClientResponse) -> AsyncIterator[Dict[str, Any]]:
+    """Читает события SSE ответа и возвращает их данные (JSON) до [DONE]"""
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').strip()
+        if not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == _DONE:
+            return
+        try:
+            event = loads(data)
+        except ValueError:
+            continue
+        yield event
+
+
+class IncrementalDishParser:
+    """
+    Выделяет блюда из JSON вида {"dishes": [{...}, {...}]}, приходящего кусками.
+
+    Отслеживает вложенность скобок (с учетом строк и экранирования) и
+    разбирает каждый объект второго уровня вложенности, как только он
+    закрылся. Текст до первой "{" (например, ```json) пропускается.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.dishes = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Добавляет кусок текста и возвращает блюда, закрывшиеся в нем"""
+        found = []
+        for char in chunk:
+            if self._in_string:
+                if self._buffer:
+                    self._buffer.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = self._started
+                if self._buffer:
+                    self._buffer.append(char)
+            elif char in '{[':
+                self._started = True
+                self._depth += 1
+                # Объект внутри массива верхнего объекта: {"dishes": [ {...} ]}
+                if char == '{' and self._depth == 3:
+                    self._buffer = ['{']
+                elif self._buffer:
+                    self._buffer.append(char)
+            elif char in '}]':
+                if self._buffer:
+                    self._buffer.append(char)
+                if char == '}' and self._depth == 3 and self._buffer:
+                    dish = self._parse(''.join(self._buffer))
+                    if dish is not None:
+                        found.append(dish)
+                    self._buffer = []
+                self._depth = max(0, self._depth - 1)
+            elif self._buffer:
+                self._buffer.append(char)
+        self.dishes += len(found)
+        return found
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            dish = loads(text)
+        except ValueError:
+            return None
+        return dish if isinstance(dish, dict) else None
@@ -0,0 +1,114 @@
+"""
+Бенчмарк HTTP-сессии AIService: новая aiohttp.ClientSession на каждый
+запрос (TCP + TLS handshake каждый раз) против общей сессии с пулом
+keep-alive соединений.
+
+Запросы идут в локальную HTTPS-заглушку (benchmarks/stub_server.py),
+печатаются p50/p99 задержки одного анализа последовательно и при
+параллельных запросах.
+
+Запуск:
+    python benchmarks/bench_ai_session.py [запросов] [параллельно] [задержка_заглушки_мс]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+
+import aiohttp
+
+from ai import service as ai_service_module
+from ai.prompts import KBJU_PROMPT, get_prompt
+from ai.limiter import AdaptiveLimiter
+from ai.service import AIService
+from benchmarks.stub_server import start_stub
+
+
+async def legacy_call(service: AIService, token: str, text: str) -> list:
+    """Старая реализация: отдельная сессия (и соединение) на каждый запрос"""
+    prompt = get_prompt(KBJU_PROMPT).text
+    payload = {
+        "model": "GigaChat",
+        "messages": [{"role": "user", "content": f"{prompt}\n\nТекст пользователя: {text}"}],
+        "stream": False
+    }
+    headers = {'Authorization': f'Bearer {token}'}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(ai_service_module.GIGACHAT_API_URL, headers=headers, json=payload, ssl=False) as response:
+            result = await response.json()
+            return service._parse_ai_response(result['choices'][0]['message']['content'])
+
+
+async def shared_call(service: AIService, token: str, text: str) -> list:
+    """Новая реализация: общая сессия AIService"""
+    return await service._call_gigachat_api(token, text)
+
+
+async def measure(call, service: AIService, token: str, requests: int, concurrency: int) -> list:
+    """Возвращает задержки запросов в миллисекундах"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            dishes = await call(service, token, f'гречка с курицей {i}')
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert dishes, "Заглушка вернула пустой ответ"
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+    # Промпты читаются относительно корня репозитория
+    os.chdir(ROOT)
+
+    runner, base_url, state = await start_stub(latency=latency_ms / 1000)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    # Без очереди ai.limiter: сравниваются только сессии, legacy_call идет мимо нее
+    service.limiter = AdaptiveLimiter(concurrency, concurrency, concurrency, 0, 1, service.limiter.queue_timeout)
+    await service.start()
+    token = await service._get_access_token()
+
+    print(f"📊 {requests} запросов к {base_url}, задержка заглушки {latency_ms:.0f} мс")
+    try:
+        for parallel in (1, concurrency):
+            for label, call in (('сессия на запрос', legacy_call), ('общая сессия   ', shared_call)):
+                # Прогрев
+                await measure(call, service, token, min(10, requests), parallel)
+                latencies = await measure(call, service, token, requests, parallel)
+                print(
+                    f"  {label} (параллельно {parallel:2d}): "
+                    f"p50 {percentile(latencies, 50):6.1f} мс, "
+                    f"p99 {percentile(latencies, 99):6.1f} мс, "
+                    f"среднее {statistics.mean(latencies):6.1f} мс"
+                )
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+    print(f"📈 Запросов к заглушке: {state.requests}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Бенчмарк кэша анализа текста: задержка analyze_food_text при промахе
+(запрос в GigaChat-заглушку), при попадании в память и в SQLite, а также
+доля попаданий на потоке типичных повторяющихся сообщений.
+
+Запуск:
+    python benchmarks/bench_analysis_cache.py [сообщений] [задержка_заглушки_мс]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_analysis_cache.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.cache import analysis_cache, normalize_food_text
+from ai.service import AIService
+from benchmarks.stub_server import start_stub
+
+# Типичные сообщения и их варианты написания
+MEALS = [
+    ['овсянка и кофе', 'Кофе, овсянка', 'овсянка  и кофе.'],
+    ['гречка с курицей', 'Гречка с курицей!', 'гречка с курицей'],
+    ['борщ и хлеб', 'хлеб, борщ', 'Борщ и хлеб'],
+    ['2 яйца и тост', 'тост и 2 яйца'],
+    ['творог 200г', 'Творог 200г.'],
+    ['салат цезарь', 'Салат Цезарь'],
+    ['пельмени со сметаной', 'Пельмени со сметаной'],
+    ['яблоко', 'Яблоко'],
+]
+
+
+async def timed(service: AIService, text: str) -> float:
+    started = time.perf_counter()
+    await service.analyze_food_text(text)
+    return (time.perf_counter() - started) * 1000
+
+
+async def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 300.0
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(latency=latency_ms / 1000)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+
+    try:
+        print("🔤 Нормализация:")
+        for variants in MEALS[:3]:
+            print(f"   {variants} -> {normalize_food_text(variants[0])!r}")
+
+        text = f'контрольное блюдо {time.time()}'
+        miss = await timed(service, text)
+        memory = statistics.median([await timed(service, text) for _ in range(50)])
+        analysis_cache.clear_memory()
+        db = await timed(service, text)
+        print(f"⏱  Промах (GigaChat): {miss:7.1f} мс | память: {memory:6.3f} мс | SQLite: {db:6.2f} мс")
+
+        # Поток сообщений: 80% - повторяющиеся блюда, 20% - уникальные
+        chat_before = state.requests['chat']
+        rng = random.Random(1)
+        started = time.perf_counter()
+        for i in range(messages):
+            if rng.random() < 0.8:
+                text = rng.choice(rng.choice(MEALS))
+            else:
+                text = f'редкое блюдо номер {i}'
+            await service.analyze_food_text(text)
+        elapsed = time.perf_counter() - started
+        api_calls = state.requests['chat'] - chat_before
+
+        print(f"📊 {messages} сообщений за {elapsed:.1f} с, запросов в GigaChat: {api_calls} "
+              f"(без кэша было бы {messages})")
+        print(f"📈 Кэш: {analysis_cache.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Бенчмарк микро-батчинга анализов: N одновременных разных сообщений
+через AIService без пачек и с пачками (запросы идут в GigaChat-заглушку,
+кэш анализа очищается).
+
+Сравниваются число запросов, токены промпта (по usage ответов) и пропускная
+способность. Проверяется, что при неразобранном ответе пачки все тексты
+отправляются по одному и все вызывающие получают ответ AI.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_batching.py [сообщений] [размер_пачки] [ожидание_мс] [задержка_заглушки_мс]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_batching.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.batching import BatchScheduler
+from ai.cache import analysis_cache
+from ai.service import AIService
+from benchmarks.stub_server import start_stub, STUB_DISHES
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+async def run(service: AIService, state, messages: int, label: str) -> dict:
+    """Отправляет messages разных сообщений одновременно"""
+    analysis_cache.clear_memory()
+    chat_before = state.requests['chat']
+    tokens_before = service.usage['prompt_tokens']
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        service.analyze_food_text(f'{label} блюдо номер {i} с гарниром') for i in range(messages)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        'results': results,
+        'requests': state.requests['chat'] - chat_before,
+        'prompt_tokens': service.usage['prompt_tokens'] - tokens_before,
+        'elapsed': elapsed,
+    }
+
+
+async def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    max_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    max_wait_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 300.0
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=latency_ms / 1000)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+
+    stub_name = STUB_DISHES['dishes'][0]['name']
+    try:
+        service.batcher = None
+        single = await run(service, state, messages, 'одиночное')
+
+        service.batcher = BatchScheduler(
+            service._call_gigachat_batch, service._call_single, max_size, max_wait_ms / 1000
+        )
+        batched = await run(service, state, messages, 'пачка')
+
+        print(f"📊 {messages} одновременных сообщений, пачка до {max_size} за {max_wait_ms:.0f} мс, "
+              f"задержка заглушки {latency_ms:.0f} мс")
+        for name, result in (('По одному', single), ('Пачками', batched)):
+            print(f"   {name:10s}: запросов {result['requests']:4d} | токенов промпта {result['prompt_tokens']:7d} | "
+                  f"{result['elapsed'] * 1000:7.0f} мс | {messages / result['elapsed']:7.1f} сообщ/с")
+        saved = 1 - batched['prompt_tokens'] / single['prompt_tokens']
+        print(f"💰 Экономия токенов промпта: {saved:.0%}")
+
+        check(all(r and r[0]['name'] == stub_name and r[0]['source'] == 'ai' for r in batched['results']),
+              "все вызовы в пачках получили ответ AI")
+        check(batched['requests'] == -(-messages // max_size), f"запросов в GigaChat: {batched['requests']}")
+        check(batched['prompt_tokens'] < single['prompt_tokens'], "пачки расходуют меньше токенов промпта")
+
+        print("💥 Неразобранный ответ пачки")
+        state.break_batch = True
+        fallbacks_before = service.batcher.fallbacks
+        broken = await run(service, state, max_size, 'сломанная')
+        state.break_batch = False
+        check(all(r and r[0]['name'] == stub_name for r in broken['results']),
+              "все вызовы получили ответ AI по одному")
+        check(service.batcher.fallbacks == fallbacks_before + 1 and broken['requests'] == max_size + 1,
+              f"одна пачка + {max_size} одиночных запросов (было {broken['requests']})")
+
+        print(f"📈 {service.batcher.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
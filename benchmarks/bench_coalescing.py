@@ -0,0 +1,112 @@
+"""
+Проверка объединения одинаковых одновременных запросов analyze_food_text.
+
+Сценарии (запросы идут в GigaChat-заглушку, кэш анализа очищается):
+- N одновременных одинаковых вызовов -> один запрос в GigaChat;
+- ошибка GigaChat -> все N получают запасной ответ, запрос один;
+- отмена части вызывающих не мешает остальным, отмена всех отменяет запрос.
+
+Завершается с кодом 1, если какой-то сценарий не выполнен.
+
+Запуск:
+    python benchmarks/bench_coalescing.py [одновременных_вызовов]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_coalescing.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.service import AIService
+from benchmarks.stub_server import start_stub, STUB_DISHES
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+async def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=0.2)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+
+    stub_name = STUB_DISHES['dishes'][0]['name']
+    try:
+        print(f"📊 {calls} одновременных одинаковых вызовов")
+        before = state.requests['chat']
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            service.analyze_food_text(f'Гречка с курицей{"!" * (i % 3)}') for i in range(calls)
+        ))
+        elapsed = (time.perf_counter() - started) * 1000
+        check(state.requests['chat'] - before == 1, f"один запрос в GigaChat (было {state.requests['chat'] - before}), {elapsed:.0f} мс")
+        check(all(r and r[0]['name'] == stub_name for r in results), "все вызовы получили ответ AI")
+        results[0][0]['name'] = 'изменено'
+        check(results[1][0]['name'] == stub_name, "результаты вызовов независимы (копии)")
+
+        print("💥 Ошибка GigaChat")
+        state.fail_chat = True
+        before = state.requests['chat']
+        results = await asyncio.gather(*(service.analyze_food_text('борщ со сметаной') for _ in range(calls)))
+        # Общий вызов повторяется (ResilientCaller), но один на всех
+        attempts = service.resilience.max_attempts
+        check(state.requests['chat'] - before == attempts, f"один неудачный вызов на всех ({attempts} попытки)")
+        check(all(r and r[0]['source'] == 'fallback' for r in results), "все вызовы получили запасной ответ")
+        state.fail_chat = False
+        results = await service.analyze_food_text('борщ со сметаной')
+        check(results[0]['name'] == stub_name, "следующий вызов после ошибки делает новую попытку")
+
+        print("🛑 Отмена")
+        before = state.requests['chat']
+        tasks = [asyncio.create_task(service.analyze_food_text('плов')) for _ in range(calls)]
+        await asyncio.sleep(0.05)
+        for task in tasks[:calls // 2]:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        done = [r for r in results if not isinstance(r, BaseException)]
+        check(len(done) == calls - calls // 2 and all(r[0]['name'] == stub_name for r in done),
+              "отмена половины не мешает остальным")
+        check(state.requests['chat'] - before == 1, "запрос по-прежнему один")
+
+        cancelled_before = service.coalescer.cancelled
+        tasks = [asyncio.create_task(service.analyze_food_text('манты')) for _ in range(calls)]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        check(service.coalescer.cancelled == cancelled_before + 1, "отмена всех отменяет общий запрос")
+        check(service.coalescer.stats()['inflight'] == 0, "ключ освобожден")
+
+        print(f"📈 {service.coalescer.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Бенчмарк кэша текущего дня: сколько SELECT уходит в SQLite на одно
+сообщение о еде (log_meal + get_or_create_current_day + get_user_timezone)
+без кэша и с кэшем.
+
+С кэшем остается одно чтение entries_count внутри транзакции записи
+(нумерация новых блюд в ответе).
+
+Запуск:
+    python benchmarks/bench_day_cache.py [сообщений] [пользователей]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_day_cache.db'))
+
+import database
+from database.connection import get_pool
+from database.day_cache import day_cache
+
+DISH = {'name': 'Гречка с курицей', 'calories': 350, 'protein': 30, 'fat': 8, 'carbs': 40, 'grams': 250}
+
+statements = Counter()
+
+
+def _trace(sql: str) -> None:
+    # Шаги триггеров тоже попадают в trace, поэтому считаем только чтения
+    if sql.lstrip().upper().startswith('SELECT'):
+        statements['SELECT'] += 1
+
+
+def _traced_pool():
+    """Включает подсчет запросов на всех подключениях пула"""
+    pool = get_pool()
+    create = pool._create_connection
+
+    def create_traced():
+        conn = create()
+        conn.set_trace_callback(_trace)
+        return conn
+
+    pool._create_connection = create_traced
+    for conn in pool._all:
+        conn.set_trace_callback(_trace)
+
+
+def handle_message(user_id: int) -> None:
+    """Запросы к базе, которые делает одно сообщение о еде"""
+    database.get_user_timezone(user_id)
+    database.get_or_create_current_day(user_id)
+    database.log_meal(user_id, 'bench', 'Bench', None, [DISH])
+
+
+def run(messages: int, users: int, cached: bool) -> dict:
+    day_cache.clear()
+    # Прогрев: пользователи и дни уже существуют
+    for user_id in range(1, users + 1):
+        handle_message(user_id)
+    statements.clear()
+
+    started = time.perf_counter()
+    for i in range(messages):
+        if not cached:
+            day_cache.clear()
+        handle_message(i % users + 1)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'selects': statements['SELECT'] / messages,
+        'msg_per_s': messages / elapsed,
+    }
+
+
+def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    database.init_database()
+    _traced_pool()
+
+    print(f"📊 {messages} сообщений, {users} пользователей")
+    for cached in (False, True):
+        result = run(messages, users, cached)
+        label = 'с кэшем ' if cached else 'без кэша'
+        print(f"  {label}: {result['msg_per_s']:8.0f} сообщ/с, SELECT на сообщение: {result['selects']:.2f}")
+
+    print(f"📈 Кэш: {database.get_day_cache_stats()}")
+
+
+if __name__ == '__main__':
+    main()
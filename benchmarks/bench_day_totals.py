@@ -0,0 +1,76 @@
+"""
+Бенчмарк: итоги дня через SUM() по записям против чтения строки дня.
+
+Создает пользователей с тысячами записей за день и сравнивает старый
+запрос агрегации с get_day_totals, который читает итоги, поддерживаемые
+триггерами.
+
+Запуск:
+    python benchmarks/bench_day_totals.py [записей_на_пользователя] [пользователей]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_day_totals.db'))
+
+import database
+from database.connection import get_connection
+
+ITERATIONS = 2000
+
+OLD_TOTALS_SQL = '''
+    SELECT SUM(calories), SUM(protein), SUM(fat), SUM(carbs), COUNT(*)
+    FROM food_entries
+    WHERE user_id = ? AND day_id = ?
+'''
+
+
+def populate(entries_per_user: int, users: int) -> list:
+    """Создает пользователей с entries_per_user записями в текущем дне"""
+    dish = {'name': 'Гречка с курицей', 'calories': 350, 'protein': 30, 'fat': 8, 'carbs': 40, 'grams': 250}
+    days = []
+    for user_id in range(1, users + 1):
+        meal = database.log_meal(user_id, None, None, None, [dish] * entries_per_user)
+        days.append((user_id, meal['day_id']))
+    return days
+
+
+def bench_old(days: list) -> float:
+    with get_connection() as conn:
+        started = time.perf_counter()
+        for i in range(ITERATIONS):
+            conn.execute(OLD_TOTALS_SQL, days[i % len(days)]).fetchone()
+        return (time.perf_counter() - started) / ITERATIONS
+
+
+def bench_new(days: list) -> float:
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        database.get_day_totals(*days[i % len(days)])
+    return (time.perf_counter() - started) / ITERATIONS
+
+
+def main():
+    entries_per_user = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    database.init_database()
+    days = populate(entries_per_user, users)
+    mismatches = database.check_day_totals()
+
+    old = bench_old(days)
+    new = bench_new(days)
+
+    print(f"Пользователей: {users}, записей на пользователя: {entries_per_user}")
+    print(f"SUM() по food_entries:   {old * 1e6:10.1f} мкс на запрос")
+    print(f"Итоги из строки дня:     {new * 1e6:10.1f} мкс на запрос")
+    print(f"Ускорение: x{old / new:.1f}")
+    print(f"Расхождений итогов: {len(mismatches)}")
+
+
+if __name__ == '__main__':
+    main()
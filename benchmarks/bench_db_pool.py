@@ -0,0 +1,80 @@
+"""
+Бенчмарк: сообщения/сек через DB-вызовы handle_food_message.
+
+Сравнивает старое поведение (новое подключение на каждый вызов, без PRAGMA)
+с пулом долгоживущих подключений в режиме WAL.
+
+Запуск:
+    python benchmarks/bench_db_pool.py [количество_сообщений]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_db_pool.db'))
+
+import database
+from database import connection
+
+DISHES = [
+    {'name': 'Овсянка', 'calories': 150, 'protein': 5, 'fat': 3, 'carbs': 27, 'grams': 200},
+    {'name': 'Кофе', 'calories': 2, 'protein': 0, 'fat': 0, 'carbs': 0, 'grams': 200},
+    {'name': 'Банан', 'calories': 90, 'protein': 1, 'fat': 0, 'carbs': 23, 'grams': 120},
+]
+
+
+class UnpooledConnectionPool(connection.ConnectionPool):
+    """Поведение до пула: новое подключение без PRAGMA на каждый вызов"""
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def run_messages(count: int) -> float:
+    """Прогоняет DB-вызовы одного сообщения о еде count раз, возвращает сообщений/сек"""
+    started = time.perf_counter()
+    for i in range(count):
+        user_id = 1000 + i % 50
+        database.save_user(user_id, 'bench', 'Bench', None)
+        day_id, _ = database.get_or_create_current_day(user_id)
+        database.count_food_entries_for_day(user_id, day_id)
+        database.save_food_entries(user_id, day_id, DISHES)
+    return count / (time.perf_counter() - started)
+
+
+def bench(pool: connection.ConnectionPool, count: int) -> float:
+    connection.close_pool()
+    connection._pool = pool
+    database.init_database()
+    return run_messages(count)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, 'before.db')
+        after_path = os.path.join(tmp, 'after.db')
+
+        before = bench(UnpooledConnectionPool(before_path), count)
+        after = bench(connection.ConnectionPool(after_path), count)
+        connection.close_pool()
+
+    print(f"Сообщений: {count}")
+    print(f"До (connect на каждый вызов): {before:8.1f} сообщений/сек")
+    print(f"После (пул + WAL):            {after:8.1f} сообщений/сек")
+    print(f"Ускорение: x{after / before:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Проверка локального словаря блюд в FoodService.process_food_message.
+
+Сценарии (запросы идут в GigaChat-заглушку, она всегда отвечает
+"Гречка с курицей" 250 г / 350 ккал):
+- ответы AI пополняют словарь, после DICTIONARY_MIN_SAMPLES записей блюдо
+  считается локально и масштабируется по граммам;
+- в смешанном сообщении в GigaChat уходят только неизвестные пункты;
+- нечеткое совпадение по триграммам ("гречку с курицей");
+- правка записи убирает ее вклад из словаря;
+- повтор сообщения (ответ из кэша или общий вызов для одновременных
+  одинаковых сообщений) и повтор блюда в одном ответе не добавляют
+  записей в словарь.
+
+Завершается с кодом 1, если какой-то сценарий не выполнен.
+
+Запуск:
+    python benchmarks/bench_dish_dictionary.py [сообщений]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_dish_dictionary.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.cache import analysis_cache
+from ai.dictionary import DishDictionary, DICTIONARY_MIN_SAMPLES
+from ai.food_items import split_food_items
+from ai.service import AIService
+from benchmarks.stub_server import STUB_DISHES, start_stub
+from services.food_service import FoodService
+
+USER_ID = 1
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+async def log(food_service: FoodService, text: str) -> dict:
+    return await food_service.process_food_message(USER_ID, 'bench', 'Bench', None, text)
+
+
+async def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=0.05)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    dictionary = DishDictionary()
+    food_service = FoodService(service, dictionary)
+
+    try:
+        print("🔤 Разбор пунктов:")
+        for item in split_food_items('Гречка 200г, 2 яйца и кофе 0,5 л + хлеб x2'):
+            print(f"   {item}")
+
+        print(f"📚 Обучение: {DICTIONARY_MIN_SAMPLES} ответа AI")
+        for i in range(DICTIONARY_MIN_SAMPLES):
+            # Разные тексты: повтор сообщения - ответ из кэша, он не учится
+            meal = await log(food_service, f'гречка с курицей (порция {i + 1})')
+            check(meal['sources'] == {'ai': 1}, f"запись {i + 1} получена от AI")
+
+        before = state.requests['chat']
+        meal = await log(food_service, 'Гречка с курицей 200г')
+        dish = meal['dishes'][0]
+        check(state.requests['chat'] == before, "известное блюдо не идет в GigaChat")
+        check(dish['source'] == 'dictionary' and dish['grams'] == 200 and dish['calories'] == 280,
+              f"КБЖУ масштабированы по граммам ({dish['calories']} ккал / {dish['grams']} г)")
+
+        meal = await log(food_service, 'гречку с курицей')
+        check(meal['sources'] == {'dictionary': 1} and meal['dishes'][0]['grams'] == 250,
+              "нечеткое совпадение, типичная порция")
+
+        before = state.requests['chat']
+        meal = await log(food_service, 'борщ, гречка с курицей 150г')
+        check(state.requests['chat'] - before == 1 and 'борщ' in state.last_prompt
+              and 'гречка' not in state.last_prompt.split('Текст пользователя:')[-1],
+              "в GigaChat ушел только неизвестный пункт")
+        check(meal['sources'] == {'ai': 1, 'dictionary': 1}, f"источники по блюдам: {meal['sources']}")
+
+        meal = await log(food_service, '3 гречки с курицей')
+        check(meal['sources'] == {'ai': 1}, "штуки без веса считает AI")
+
+        print("✏️  Правка")
+        ai_entry = next(d for d in meal['dishes'] if d['source'] == 'ai')
+        samples_before = database.find_dishes(['гречка с курицей'], 1, 1.0)[0]['samples']
+        await database.aio.update_food_entries(USER_ID, [{**ai_entry, 'calories': 500, 'source': 'edit'}])
+        found = database.find_dishes(['гречка с курицей'], 1, 1.0)[0]
+        check(found is not None and found['samples'] == samples_before - 1,
+              f"правка вычла запись из словаря (записей AI: {samples_before} -> {found and found['samples']})")
+        check(round(found['calories_100g']) == 140, "КБЖУ на 100 г не изменились")
+
+        print("🔁 Повторы")
+        samples_before = found['samples']
+        meal = await log(food_service, '3 гречки с курицей')
+        check(meal['sources'] == {'ai_cached': 1}, f"повтор сообщения - ответ из кэша: {meal['sources']}")
+        analysis_cache.clear_memory()
+        meals = await asyncio.gather(*(log(food_service, 'ужин на двоих') for _ in range(2)))
+        sources = [dish['source'] for meal in meals for dish in meal['dishes']]
+        check(sorted(sources) == ['ai', 'ai_cached'], f"одновременные одинаковые сообщения: {sources}")
+        state.chat_dishes = {'dishes': STUB_DISHES['dishes'] * 3}
+        meal = await log(food_service, 'обед из трех тарелок')
+        state.chat_dishes = STUB_DISHES
+        check(meal['sources'] == {'ai': 1, 'ai_cached': 2}, f"повтор блюда в ответе: {meal['sources']}")
+        samples = database.find_dishes(['гречка с курицей'], 1, 1.0)[0]['samples']
+        check(samples == samples_before + 2,
+              f"в словарь попали только новые ответы AI (записей AI: {samples_before} -> {samples})")
+
+        # Поток сообщений: типичные продукты, часть - с весом
+        print(f"📊 Поток из {messages} сообщений")
+        rng = random.Random(1)
+        before = state.requests['chat']
+        dictionary_before = dictionary.stats()
+        started = time.perf_counter()
+        for i in range(messages):
+            parts = ['гречка с курицей' + rng.choice(['', ' 200г', ' 300 гр'])]
+            if rng.random() < 0.3:
+                parts.append(f'редкое блюдо {i}')
+            analysis_cache.clear_memory()
+            await log(food_service, ', '.join(parts))
+        elapsed = time.perf_counter() - started
+        stats = dictionary.stats()
+        hits = stats['hits'] - dictionary_before['hits']
+        items = stats['items'] - dictionary_before['items']
+        print(f"   {elapsed:.1f} с, запросов в GigaChat: {state.requests['chat'] - before} из {messages}, "
+              f"пунктов из словаря: {hits} из {items}")
+        print(f"📈 {dictionary.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+"""
+Оценка КБЖУ без AI (ai.estimator) и фоновый пересчет примерных значений
+(ai.reanalysis).
+
+- Точность: корпус сообщений со справочной калорийностью; средняя ошибка
+  прежнего запасного ответа (300 ккал на каждую часть) и оценки по
+  таблице продуктов с количеством ("200г", "2 яйца", "стакан").
+- Скорость: оценок в секунду (оценка идет в обработчике сообщения).
+- Пересчет: GigaChat-заглушка отказывает, сообщения сохраняются с
+  примерными значениями; после восстановления очередь пересчитывает их
+  через AI, итоги дня обновляются, отредактированная пользователем
+  запись не перезаписывается.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_estimator.py [секунд_на_замер]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_estimator.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.estimator import FoodEstimator
+from ai.resilience import CIRCUIT_CLOSED
+from ai.service import AIService
+from benchmarks.stub_server import STUB_DISHES, start_stub
+from services.food_service import FoodService
+
+USER_ID = 1
+
+# Сообщение -> справочная калорийность всего сообщения
+CORPUS = {
+    'гречка 200г, 2 яйца и чай без сахара': 377,
+    'овсянка на молоке': 260,
+    'борщ со сметаной': 190,
+    'банан': 105,
+    'яблоко': 85,
+    'кофе с молоком': 60,
+    'пельмени 300г': 750,
+    'стакан кефира': 130,
+    'шаурма': 650,
+    'пицца 2 куска': 540,
+    'салат цезарь': 400,
+    'чай с сахаром': 40,
+    '3 сырника со сметаной': 450,
+    'макароны с котлетой': 550,
+    'шоколад 50г': 270,
+    'пиво 0,5л': 215,
+    'курица 150г, рис 200г и огурец': 530,
+    'картошка жареная': 380,
+    'творог 5% 200г с медом': 330,
+    'бутерброд с сыром и кофе': 270,
+}
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def legacy_fallback(text: str) -> List[Dict[str, Any]]:
+    """Прежний AIService._get_fallback_response"""
+    if ' и ' in text:
+        parts = text.split(' и ')
+    elif ', ' in text:
+        parts = text.split(', ')
+    else:
+        parts = [text]
+    return [
+        {'name': part.strip(), 'calories': 300, 'protein': 12, 'fat': 8, 'carbs': 40, 'grams': 150, 'source': 'fallback'}
+        for part in parts if part.strip()
+    ]
+
+
+def mean_error(estimate) -> float:
+    """Средняя относительная ошибка калорийности сообщения по корпусу"""
+    errors = [
+        abs(sum(dish['calories'] for dish in estimate(text)) - reference) / reference
+        for text, reference in CORPUS.items()
+    ]
+    return sum(errors) / len(errors)
+
+
+async def check_reanalysis() -> None:
+    runner, base_url, state = await start_stub(tls=False, latency=0.02)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+    # Короткие паузы, чтобы бенчмарк шел секунды
+    service.resilience.base_delay = 0.01
+    service.resilience.max_delay = 0.02
+    service.breaker.failure_threshold = 2
+    service.breaker.reset_timeout = 0.2
+    service.reanalyzer.retry_interval = 0.1
+    food_service = FoodService(service)
+
+    try:
+        print("💥 GigaChat отказывает: сообщения сохраняются с примерными значениями")
+        state.fail_chat = True
+        meals = []
+        for text in ('гречка 200г, 2 яйца', 'борщ со сметаной', 'овсянка на молоке'):
+            meals.append(await food_service.process_food_message(USER_ID, 'bench', 'Bench', None, text))
+        check(all(meal and meal['estimated'] for meal in meals), "все приемы пищи помечены как примерные")
+        check(meals[0]['dishes'][0]['grams'] == 200 and meals[0]['dishes'][1]['grams'] == 110,
+              "количество из сообщения учтено в примерных значениях")
+        queued = service.reanalyzer.pending
+        check(queued == sum(len(meal['dishes']) for meal in meals), f"в очереди на пересчет {queued} записей")
+
+        # Пользователь поправил одну запись сам, пока AI недоступен
+        edited = meals[1]['dishes'][0]
+        edit = {key: edited[key] for key in ('id', 'name', 'protein', 'fat', 'carbs', 'grams')}
+        await database.aio.update_food_entries(USER_ID, [{**edit, 'calories': 123}])
+        day_id = meals[0]['day_id']
+        totals_before = await database.aio.get_day_totals(USER_ID, day_id)
+
+        print("🩹 GigaChat восстановился")
+        chat_before = state.requests['chat']
+        state.fail_chat = False
+        started = time.perf_counter()
+        while service.reanalyzer.pending and time.perf_counter() - started < 10:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        check(service.reanalyzer.pending == 0, f"очередь пересчитана за {elapsed * 1000:.0f} мс "
+                                               f"(запросов в GigaChat: {state.requests['chat'] - chat_before})")
+        check(service.breaker.state == CIRCUIT_CLOSED, "пересчет замкнул breaker")
+
+        entries = await database.aio.get_food_entries_for_day(USER_ID, day_id)
+        stub_calories = sum(dish['calories'] for dish in STUB_DISHES['dishes'])
+        # (id, dish_name, calories, protein, fat, carbs, grams)
+        calories = {entry[0]: entry[2] for entry in entries}
+        reanalyzed = [dish['id'] for meal in meals for dish in meal['dishes'] if dish['id'] != edited['id']]
+        check(all(calories[entry_id] == stub_calories for entry_id in reanalyzed),
+              "примерные значения заменены ответом AI")
+        check(calories[edited['id']] == 123, "отредактированная пользователем запись не перезаписана")
+        totals_after = await database.aio.get_day_totals(USER_ID, day_id)
+        check(totals_after['calories'] == sum(calories.values()) != totals_before['calories'],
+              f"итоги дня обновлены: {totals_before['calories']} -> {totals_after['calories']} ккал")
+        print(f"📈 {service.reanalyzer.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+
+async def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    estimator = FoodEstimator()
+    print(f"🎯 Средняя ошибка калорийности на {len(CORPUS)} сообщениях")
+    for text, reference in CORPUS.items():
+        legacy = sum(dish['calories'] for dish in legacy_fallback(text))
+        estimated = sum(dish['calories'] for dish in estimator.estimate(text))
+        print(f"   {text:38s}: справочно {reference:4d} | прежде {legacy:4d} | оценка {estimated:4d}")
+    legacy_error = mean_error(legacy_fallback)
+    estimator_error = mean_error(estimator.estimate)
+    print(f"   прежний запасной ответ: {legacy_error:.0%}, оценка по таблице: {estimator_error:.0%}")
+    check(estimator_error * 2 < legacy_error, "оценка по таблице как минимум вдвое точнее")
+    check(estimator.stats()['match_rate'] >= 0.9, f"найдено в таблице {estimator.stats()['match_rate']:.0%} пунктов")
+
+    texts = list(CORPUS)
+    estimates = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for text in texts:
+            estimator.estimate(text)
+        estimates += len(texts)
+    per_second = estimates / (time.perf_counter() - started)
+    print(f"⏱️  {per_second:.0f} сообщений в секунду")
+    check(per_second > 2000, "оценка занимает меньше 0,5 мс на сообщение")
+
+    try:
+        await check_reanalysis()
+    finally:
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
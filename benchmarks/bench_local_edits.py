@@ -0,0 +1,155 @@
+"""
+Правки приема пищи без GigaChat (ai.edits) в FoodService.edit_food_entries.
+
+- Корпус правок, как их пишут пользователи: количество, множители,
+  "без X", замены и уточнения. Какая доля применяется локально, и
+  совпадают ли пересчитанные значения с ожидаемыми.
+- Задержка правки: локально и через GigaChat-заглушку; запросов в
+  GigaChat на корпус правок.
+- Правка, которую нельзя применить локально, по-прежнему уходит в AI.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_local_edits.py [задержка_заглушки_мс]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_local_edits.db'))
+
+import database
+from ai import service as ai_service_module
+from ai.edits import LocalEditInterpreter
+from ai.service import AIService
+from benchmarks.stub_server import start_stub
+from services.food_service import FoodService
+
+USER_ID = 1
+
+PORRIDGE = {'name': 'Овсянка на молоке', 'calories': 300, 'protein': 10, 'fat': 8, 'carbs': 46, 'grams': 250}
+TEA = {'name': 'Чай с сахаром', 'calories': 60, 'protein': 0, 'fat': 0, 'carbs': 15, 'grams': 260}
+LUNCH = [
+    {'name': 'Гречка', 'calories': 220, 'protein': 8, 'fat': 2, 'carbs': 43, 'grams': 200},
+    {'name': 'Куриная грудка', 'calories': 250, 'protein': 46, 'fat': 5, 'carbs': 0, 'grams': 150},
+]
+
+# (прием пищи, правка, ожидаемые калории блюд или None - правка для AI)
+CORPUS = [
+    ([PORRIDGE], '200г', [240]),
+    ([PORRIDGE], '300 гр', [360]),
+    ([PORRIDGE], 'было 0,5 кг', [600]),
+    ([PORRIDGE], 'половина', [150]),
+    ([PORRIDGE], 'пол порции', [150]),
+    ([PORRIDGE], 'x2', [600]),
+    ([PORRIDGE], 'х1.5', [450]),
+    ([PORRIDGE], 'полторы порции', [450]),
+    ([PORRIDGE], 'в 2 раза меньше', [150]),
+    ([PORRIDGE], 'двойная порция', [600]),
+    ([PORRIDGE], '1/3', [100]),
+    ([PORRIDGE], 'на воде, а не на молоке', None),
+    ([PORRIDGE], 'добавь банан', None),
+    ([PORRIDGE], 'это была гречка', None),
+    ([TEA], 'без сахара', [7]),
+    ([TEA], 'x3', [180]),
+    ([TEA], 'с лимоном', None),
+    (LUNCH, 'x2', [440, 500]),
+    (LUNCH, 'гречка 150г', [165, 250]),
+    (LUNCH, 'гречка 150г, курица x2', [165, 500]),
+    (LUNCH, 'курицы половина', [220, 125]),
+    (LUNCH, '200г', None),
+    (LUNCH, 'гречка была с маслом', None),
+    (LUNCH, 'замени курицу на индейку', None),
+    (LUNCH, '2 яйца вместо курицы', None),
+]
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+async def main() -> None:
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 300.0
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    print(f"✏️  Корпус: {len(CORPUS)} правок")
+    interpreter = LocalEditInterpreter()
+    wrong = []
+    for meal, edit, expected in CORPUS:
+        dishes = interpreter.apply(meal, edit)
+        calories = [dish['calories'] for dish in dishes] if dishes else None
+        mark = 'локально' if dishes else 'в AI'
+        print(f"   {edit:28s}: {mark:9s} {calories if calories else ''}")
+        if calories != expected:
+            wrong.append(edit)
+    stats = interpreter.stats()
+    expected_local = sum(1 for _, _, expected in CORPUS if expected)
+    print(f"   применено без AI: {stats['handled']} из {stats['edits']} ({stats['handled_rate']:.0%}), по видам {stats['kinds']}")
+    check(not wrong, f"локальные правки совпадают с ожидаемыми, остальные уходят в AI {wrong if wrong else ''}")
+    check(stats['handled'] == expected_local, f"без AI применяются все {expected_local} правок количества")
+
+    runner, base_url, state = await start_stub(tls=False, latency=latency_ms / 1000)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+    local_service = FoodService(service, edits=LocalEditInterpreter())
+    # Правки, которые никогда не применяются локально (как до ai.edits)
+    ai_only = LocalEditInterpreter()
+    ai_only.apply = lambda entries, edit_text: None
+    ai_service = FoodService(service, edits=ai_only)
+
+    try:
+        print(f"⏱️  Правки через FoodService, задержка заглушки {latency_ms:.0f} мс")
+        results = {}
+        for name, food_service in (('только AI', ai_service), ('с ai.edits', local_service)):
+            chat_before = state.requests['chat']
+            latencies = []
+            for meal, edit, _ in CORPUS:
+                saved = await database.aio.log_meal(USER_ID, 'bench', 'Bench', None, [dict(dish) for dish in meal])
+                started = time.perf_counter()
+                await food_service.edit_food_entries(USER_ID, saved['ids'], edit)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                'requests': state.requests['chat'] - chat_before,
+                'median': statistics.median(latencies),
+                'total': sum(latencies),
+            }
+            print(f"   {name:11s}: запросов в GigaChat {results[name]['requests']:3d} | "
+                  f"медиана {results[name]['median']:6.1f} мс | всего {results[name]['total']:6.0f} мс")
+        check(results['с ai.edits']['requests'] == len(CORPUS) - expected_local,
+              "в GigaChat уходят только нераспознанные правки")
+        check(results['с ai.edits']['median'] * 10 < results['только AI']['median'],
+              "медиана задержки правки меньше в 10 раз")
+
+        saved = await database.aio.log_meal(USER_ID, 'bench', 'Bench', None, [dict(PORRIDGE)])
+        result = await local_service.edit_food_entries(USER_ID, saved['ids'], 'половина')
+        entry = await database.aio.get_food_entry_by_id(saved['ids'][0], USER_ID)
+        check(result and entry['calories'] == 150 and entry['grams'] == 125, "локальная правка сохранена в базе")
+        print(f"📈 {local_service.edits.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Бенчмарк: задержка event loop во время массовой записи в базу.
+
+Пока идет запись большого приема пищи, отдельная корутина каждые 5 мс
+просыпается и замеряет, насколько позже положенного она проснулась.
+Сравниваются синхронный вызов прямо в event loop и database.aio.
+
+Запуск:
+    python benchmarks/bench_loop_lag.py [количество_блюд]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_loop_lag.db'))
+
+import database
+
+TICK = 0.005
+# Допустимая задержка loop при асинхронной записи (секунд)
+MAX_ALLOWED_LAG = 0.05
+
+
+def make_dishes(count: int) -> list:
+    return [
+        {'name': f'Блюдо {i}', 'calories': 100, 'protein': 5, 'fat': 5, 'carbs': 10, 'grams': 100}
+        for i in range(count)
+    ]
+
+
+async def measure_lag(write) -> float:
+    """Выполняет write() и возвращает максимальную задержку loop за это время"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - expected)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+    await write()
+    done.set()
+    await ticker_task
+    return max(lags)
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    dishes = make_dishes(count)
+    user_id = 1
+    database.init_database()
+    day_id, _ = await database.aio.get_or_create_current_day(user_id)
+
+    async def sync_write():
+        database.save_food_entries(user_id, day_id, dishes)
+
+    async def async_write():
+        await database.aio.save_food_entries(user_id, day_id, dishes)
+
+    sync_lag = await measure_lag(sync_write)
+    async_lag = await measure_lag(async_write)
+
+    print(f"Запись {count} блюд")
+    print(f"Синхронно в event loop: макс. задержка loop {sync_lag * 1000:8.1f} мс")
+    print(f"Через database.aio:     макс. задержка loop {async_lag * 1000:8.1f} мс")
+
+    database.aio.shutdown()
+
+    if async_lag > MAX_ALLOWED_LAG:
+        print(f"❌ Задержка превышает {MAX_ALLOWED_LAG * 1000:.0f} мс")
+        sys.exit(1)
+    print("✅ Задержка loop ограничена")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+Бенчмарк разбора ответов GigaChat (ai.parsing) на корпусе ответов в том
+виде, в каком их присылает модель: чистый JSON, в ```json-обертке, с
+пояснением, два объекта подряд, оборванный по max_tokens, фигурные
+скобки в названиях, ответ на редактирование одним объектом.
+
+Сравниваются прежний разбор (re.sub + жадный \\{.*\\} при каждом вызове)
+и ai.parsing со стандартным json и с orjson (если установлен): разборов в
+секунду и сколько блюд удалось достать из каждого вида ответа.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_parsing.py [блюд_в_ответе] [секунд_на_замер]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai import parsing
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def legacy_parse(response_text: str) -> List[Dict[str, Any]]:
+    """Прежний AIService._parse_ai_response (с прежней проверкой блюд)"""
+    try:
+        import re
+        clean_text = re.sub(r'```json|```', '', response_text).strip()
+        json_match = re.search(r'\{.*\}', clean_text, re.DOTALL)
+        if not json_match:
+            return []
+        data = json.loads(json_match.group())
+        valid_dishes = []
+        for dish in data.get('dishes', []):
+            if not isinstance(dish, dict):
+                continue
+            name = dish.get('name', '').strip()
+            if not name:
+                continue
+            valid_dishes.append({
+                'name': name,
+                'calories': max(0, min(round(float(dish.get('calories', 300))), 2000)),
+                'protein': max(0, min(round(float(dish.get('protein', 10))), 100)),
+                'fat': max(0, min(round(float(dish.get('fat', 10))), 100)),
+                'carbs': max(0, min(round(float(dish.get('carbs', 40))), 200)),
+                'grams': max(1, min(round(float(dish.get('grams', 100))), 5000)),
+            })
+        return valid_dishes
+    except Exception:
+        return []
+
+
+def new_parse(response_text: str) -> List[Dict[str, Any]]:
+    """Разбор ai.parsing (как AIService._parse_ai_response)"""
+    dishes = parsing.extract_dishes(response_text)
+    return parsing.validate_dishes(dishes) if dishes else []
+
+
+def make_dishes(count: int, offset: int = 0) -> List[Dict[str, Any]]:
+    names = ['Овсянка на молоке', 'Борщ со сметаной', 'Котлета {домашняя}', 'Гречка', 'Салат "Цезарь"', 'Чай с сахаром']
+    return [
+        {'name': names[(i + offset) % len(names)], 'calories': 120 + i * 7, 'protein': 6.4, 'fat': 4.2,
+         'carbs': 18.9, 'grams': 150 + i * 10}
+        for i in range(count)
+    ]
+
+
+def build_corpus(count: int) -> Dict[str, Any]:
+    """Вид ответа -> (текст, сколько блюд в нем можно достать)"""
+    dishes = make_dishes(count)
+    body = json.dumps({'dishes': dishes}, ensure_ascii=False)
+    pretty = json.dumps({'dishes': dishes}, ensure_ascii=False, indent=2)
+    second = json.dumps({'dishes': make_dishes(2, offset=3)}, ensure_ascii=False)
+    # Обрезаем посреди последнего блюда: остальные блюда завершены
+    truncated = body[:body.rindex('{"name"') + 12]
+    return {
+        'чистый JSON': (body, count),
+        'markdown': (f'```json\n{pretty}\n```', count),
+        'с пояснением': (f'Вот расчет КБЖУ:\n{body}\nЗначения приблизительные {{по таблицам}}.', count),
+        'два объекта': (f'{body}\n{second}', count + 2),
+        'оборванный': (truncated, count - 1),
+        'без JSON': ('Извините, я не могу помочь с этим запросом.', 0),
+    }
+
+
+def measure(parsers: Dict[str, Callable[[str], Any]], texts: List[str], seconds: float, rounds: int = 5) -> Dict[str, float]:
+    """
+    Разборов в секунду на корпусе для каждого разборщика. Разборщики
+    чередуются по раундам, берется медиана раундов (меньше влияние шума машины)
+    """
+    speeds: Dict[str, List[float]] = {name: [] for name in parsers}
+    for _ in range(rounds):
+        for name, parse in parsers.items():
+            parses = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < seconds / rounds:
+                for text in texts:
+                    parse(text)
+                parses += len(texts)
+            speeds[name].append(parses / (time.perf_counter() - started))
+    return {name: statistics.median(values) for name, values in speeds.items()}
+
+
+def using_orjson(module: Any, parse: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Разборщик с заданным модулем orjson (None - стандартный json)"""
+    def run(text: str) -> Any:
+        parsing.orjson = module
+        return parse(text)
+    return run
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    corpus = build_corpus(count)
+    orjson_module = parsing.orjson
+
+    print(f"🧩 Блюд в ответе: {count}")
+    for name, (text, expected) in corpus.items():
+        legacy = legacy_parse(text)
+        parsing.orjson = None
+        with_json = new_parse(text)
+        parsing.orjson = orjson_module
+        with_orjson = new_parse(text)
+        print(f"   {name:13s}: прежний разбор {len(legacy):2d} блюд, ai.parsing {len(with_json):2d} (ожидается {expected})")
+        check(len(with_json) == expected and with_json == with_orjson, f"{name}: все блюда, json и orjson совпадают")
+        if len(legacy) == expected:
+            check(with_json == legacy, f"{name}: результат совпадает с прежним разбором")
+
+    edit = json.dumps(make_dishes(1)[0], ensure_ascii=False)
+    dishes = parsing.extract_dishes(f'```json\n{edit}\n```', allow_single=True)
+    check(parsing.validate_dishes(dishes or []) == legacy_parse(json.dumps({'dishes': make_dishes(1)})),
+          "ответ на редактирование одним объектом")
+    check(parsing.validate_dishes([{'name': 'Каша', 'calories': 'много'}, {'name': 'Чай', 'calories': None}]) ==
+          [{'name': 'Чай', 'calories': 300, 'protein': 10, 'fat': 10, 'carbs': 40, 'grams': 100}],
+          "блюдо с нечисловым значением пропускается, а не роняет весь ответ")
+
+    texts = [text for text, _ in corpus.values()]
+    clean = [corpus['чистый JSON'][0], corpus['markdown'][0]]
+    parsers = {'прежний разбор': legacy_parse, 'ai.parsing, json': using_orjson(None, new_parse)}
+    if orjson_module is not None:
+        parsers['ai.parsing, orjson'] = using_orjson(orjson_module, new_parse)
+    print(f"⏱️  Разборов в секунду (весь корпус / только обычные ответы)")
+    corpus_speed = measure(parsers, texts, seconds)
+    clean_speed = measure(parsers, clean, seconds)
+    parsing.orjson = orjson_module
+    for name in parsers:
+        print(f"   {name:18s}: {corpus_speed[name]:9.0f} / {clean_speed[name]:9.0f}")
+    if orjson_module is None:
+        print("   orjson не установлен")
+    # Скорость только печатается, проверки - на полноту разбора выше: на обычных
+    # ответах разница с прежним разбором в пределах шума машины, а на испорченных
+    # ai.parsing дольше, потому что достает блюда там, где прежний разбор сдается
+    for name in parsers:
+        if name != 'прежний разбор':
+            print(f"   {name:18s}: {clean_speed[name] / clean_speed['прежний разбор']:.0%} скорости прежнего разбора на обычных ответах")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
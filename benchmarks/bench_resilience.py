@@ -0,0 +1,142 @@
+"""
+Бенчмарк устойчивости запросов к GigaChat (ResilientCaller, CircuitBreaker)
+против заглушки с временными сбоями и полным отказом.
+
+- Временный сбой (503 на пару запросов): ответ AI вместо запасного.
+- Отказ GigaChat: сколько запросов и времени уходит на N сообщений с
+  breaker и без него; после размыкания сообщения получают запасной ответ
+  сразу, без запросов в GigaChat.
+- Восстановление: через reset_timeout пробный запрос замыкает breaker.
+- Дедлайн: повторы не выходят за дедлайн запроса.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_resilience.py [сообщений] [задержка_заглушки_мс]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_resilience.db'))
+
+import database
+import texts
+from ai import service as ai_service_module
+from ai.resilience import CIRCUIT_CLOSED, CIRCUIT_OPEN
+from ai.service import AIService
+from benchmarks.stub_server import start_stub
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def configure(service: AIService, threshold: int, reset_timeout: float, deadline: float) -> None:
+    """Короткие паузы и таймауты, чтобы бенчмарк шел секунды"""
+    service.resilience.base_delay = 0.05
+    service.resilience.max_delay = 0.2
+    service.resilience.deadline = deadline
+    service.breaker.failure_threshold = threshold
+    service.breaker.reset_timeout = reset_timeout
+    service.breaker.record_success()
+
+
+async def sequential(service: AIService, messages: int, label: str) -> dict:
+    """messages разных сообщений подряд (как приходят от пользователей во время сбоя)"""
+    started = time.perf_counter()
+    fallbacks = 0
+    for i in range(messages):
+        dishes = await service.analyze_food_text(f'{label} {time.time()} блюдо {i}')
+        fallbacks += sum(1 for dish in dishes if dish['source'] == 'fallback')
+    return {'elapsed': time.perf_counter() - started, 'fallbacks': fallbacks}
+
+
+async def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=latency_ms / 1000)
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+
+    try:
+        print("🔁 Временный сбой: 503 на два запроса")
+        configure(service, threshold=5, reset_timeout=1.0, deadline=10)
+        state.fail_chat_next = 2
+        chat_before = state.requests['chat']
+        dishes = await service.analyze_food_text('временный сбой')
+        check(dishes[0]['source'] == 'ai', f"ответ AI после повторов (запросов: {state.requests['chat'] - chat_before})")
+        check(service.resilience.recovered == 1, "запрос восстановлен повтором")
+
+        print(f"💥 Отказ GigaChat: {messages} сообщений подряд, задержка {latency_ms:.0f} мс")
+        state.fail_chat = True
+        results = {}
+        for name, threshold in (('без breaker', 10 ** 6), ('с breaker', 3)):
+            configure(service, threshold=threshold, reset_timeout=60, deadline=10)
+            chat_before = state.requests['chat']
+            result = await sequential(service, messages, name)
+            result['requests'] = state.requests['chat'] - chat_before
+            results[name] = result
+            print(f"   {name:12s}: запросов в GigaChat {result['requests']:4d} | "
+                  f"{result['elapsed'] * 1000:7.0f} мс | запасных блюд {result['fallbacks']}")
+        check(results['с breaker']['requests'] <= 3 * service.resilience.max_attempts,
+              f"после размыкания запросы не отправляются ({results['с breaker']['requests']} запросов)")
+        check(results['с breaker']['elapsed'] * 3 < results['без breaker']['elapsed'],
+              "сообщения во время отказа обрабатываются в разы быстрее")
+        check(service.breaker.state == CIRCUIT_OPEN and not service.available, "breaker разомкнут, AI недоступен")
+        check('недоступен' in texts.get_estimated_values_text(service.available),
+              "пользователь видит, что значения примерные из-за недоступности AI")
+
+        print("🩹 Восстановление")
+        configure(service, threshold=3, reset_timeout=0.3, deadline=10)
+        for _ in range(3):
+            await service.analyze_food_text(f'сбой {time.time()}')
+        check(service.breaker.state == CIRCUIT_OPEN, "breaker снова разомкнут")
+        state.fail_chat = False
+        await asyncio.sleep(0.35)
+        chat_before = state.requests['chat']
+        probes = await asyncio.gather(*(service.analyze_food_text(f'проба {time.time()} {i}') for i in range(5)))
+        check(state.requests['chat'] - chat_before == 1, "после паузы уходит один пробный запрос")
+        check(service.breaker.state == CIRCUIT_CLOSED and service.available, "пробный запрос замкнул breaker")
+        dishes = await service.analyze_food_text(f'после восстановления {time.time()}')
+        check(dishes[0]['source'] == 'ai' and probes[0][0]['source'] == 'ai', "снова ответы AI")
+
+        print("⏱️  Дедлайн")
+        deadline = latency_ms / 1000 * 2.5
+        configure(service, threshold=10 ** 6, reset_timeout=60, deadline=deadline)
+        service.resilience.max_attempts = 10
+        state.fail_chat = True
+        started = time.perf_counter()
+        await service.analyze_food_text(f'дедлайн {time.time()}')
+        elapsed = time.perf_counter() - started
+        check(elapsed <= deadline + 0.05, f"10 попыток уложились в дедлайн: {elapsed * 1000:.0f} мс из {deadline * 1000:.0f}")
+        state.fail_chat = False
+        print(f"📈 {service.resilience.stats()}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Микро-бенчмарк save_food_entries: INSERT на каждое блюдо против
+одного multi-row INSERT ... RETURNING id.
+
+Замеряет приемы пищи из 1, 5 и 50 блюд в одном потоке и при нескольких
+параллельных писателях.
+
+Запуск:
+    python benchmarks/bench_save_entries.py [приемов_пищи] [писателей]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_save_entries.db'))
+
+import database
+from database import food_entries
+from database.connection import get_connection
+
+DISH = {'name': 'Гречка с курицей', 'calories': 350, 'protein': 30, 'fat': 8, 'carbs': 40, 'grams': 250}
+
+
+def legacy_save_food_entries(user_id: int, day_id: int, dishes: list) -> list:
+    """Старая реализация: отдельный INSERT и lastrowid на каждое блюдо"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        saved_ids = []
+        for dish in dishes:
+            cursor.execute('''
+                INSERT INTO food_entries
+                (user_id, day_id, dish_name, calories, protein, fat, carbs, grams)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                user_id, day_id, dish['name'], dish['calories'],
+                dish['protein'], dish['fat'], dish['carbs'], dish['grams']
+            ))
+            saved_ids.append(cursor.lastrowid)
+        conn.commit()
+        return saved_ids
+
+
+def run(save, meals: int, dishes_per_meal: int, writers: int) -> float:
+    """Возвращает приемов пищи в секунду"""
+    dishes = [DISH] * dishes_per_meal
+    day_ids = [database.get_or_create_current_day(user_id)[0] for user_id in range(1, writers + 1)]
+
+    def writer(user_id: int, day_id: int):
+        for _ in range(meals // writers):
+            save(user_id, day_id, dishes)
+
+    threads = [
+        threading.Thread(target=writer, args=(user_id, day_id))
+        for user_id, day_id in zip(range(1, writers + 1), day_ids)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (meals // writers * writers) / (time.perf_counter() - started)
+
+
+def main():
+    meals = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    database.init_database()
+    print(f"SQLite {food_entries.sqlite3.sqlite_version}, RETURNING: {food_entries._SUPPORTS_RETURNING}")
+    print(f"{'блюд':>5} {'писателей':>10} {'по одному':>14} {'RETURNING':>14} {'ускорение':>10}")
+    for dishes_per_meal in (1, 5, 50):
+        for writer_count in (1, writers):
+            legacy = run(legacy_save_food_entries, meals, dishes_per_meal, writer_count)
+            batched = run(database.save_food_entries, meals, dishes_per_meal, writer_count)
+            print(
+                f"{dishes_per_meal:>5} {writer_count:>10} "
+                f"{legacy:>10.0f}/сек {batched:>10.0f}/сек {batched / legacy:>9.2f}x"
+            )
+
+    database.aio.shutdown()
+
+
+if __name__ == '__main__':
+    main()
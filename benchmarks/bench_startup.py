@@ -0,0 +1,117 @@
+"""
+Бенчмарк: время запуска (инициализации базы) на базе с миллионом записей.
+
+Сравнивает старую инициализацию при импорте (ALTER TABLE, которые
+заведомо падают, и UPDATE по всем строкам на каждом запуске)
+с версионированными миграциями: первый запуск применяет их один раз,
+последующие только читают PRAGMA user_version.
+
+Запуск:
+    python benchmarks/bench_startup.py [количество_записей]
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connection
+
+USERS = 1000
+
+
+def create_legacy_database(path: str, entries: int) -> None:
+    """Создает базу в схеме до введения миграций"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (
+            user_id INTEGER PRIMARY KEY, username TEXT, first_name TEXT, last_name TEXT,
+            timezone TEXT DEFAULT 'Europe/Moscow', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE days (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, day_number INTEGER DEFAULT 1,
+            is_current BOOLEAN DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, day_number)
+        );
+        CREATE TABLE food_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, day_id INTEGER,
+            dish_name TEXT NOT NULL, calories INTEGER DEFAULT 400, protein INTEGER DEFAULT 10,
+            fat INTEGER DEFAULT 10, carbs INTEGER DEFAULT 10, grams INTEGER DEFAULT 100,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (day_id) REFERENCES days (id)
+        );
+        CREATE INDEX idx_user_day ON food_entries(user_id, day_id);
+        CREATE INDEX idx_day ON food_entries(day_id);
+    ''')
+    conn.executemany('INSERT INTO users (user_id) VALUES (?)', ((i,) for i in range(1, USERS + 1)))
+    conn.executemany('INSERT INTO days (user_id) VALUES (?)', ((i,) for i in range(1, USERS + 1)))
+    conn.executemany(
+        'INSERT INTO food_entries (user_id, day_id, dish_name, calories, protein, fat, carbs, grams) '
+        'VALUES (?, ?, ?, 350, 30, 8, 40, 250)',
+        ((i % USERS + 1, i % USERS + 1, 'Гречка с курицей') for i in range(entries))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_init(path: str) -> None:
+    """Инициализация, которая раньше выполнялась при каждом импорте database"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('ALTER TABLE users ADD COLUMN timezone TEXT DEFAULT "Europe/Moscow"')
+    except sqlite3.OperationalError:
+        pass
+    cursor.execute("UPDATE users SET timezone = 'Europe/Moscow' WHERE timezone IS NULL OR timezone = 'UTC'")
+    try:
+        cursor.execute('ALTER TABLE food_entries ADD COLUMN grams INTEGER DEFAULT 100')
+    except sqlite3.OperationalError:
+        pass
+    cursor.execute('UPDATE food_entries SET grams = 100 WHERE grams IS NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_day ON food_entries(user_id, day_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_day ON food_entries(day_id)')
+    conn.commit()
+    conn.close()
+
+
+def timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def migrated_init(path: str) -> None:
+    connection.close_pool()
+    connection._pool = connection.ConnectionPool(path)
+    connection.init_database()
+    connection.close_pool()
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'template.db')
+        print(f"Создаю базу с {entries} записями...")
+        create_legacy_database(template, entries)
+
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        shutil.copy(template, legacy_path)
+        legacy = [timed(legacy_init, legacy_path) for _ in range(3)]
+
+        migrated_path = os.path.join(tmp, 'migrated.db')
+        shutil.copy(template, migrated_path)
+        first = timed(migrated_init, migrated_path)
+        repeated = [timed(migrated_init, migrated_path) for _ in range(3)]
+
+    print(f"Старая инициализация (каждый запуск): {min(legacy) * 1000:9.1f} мс")
+    print(f"Миграции, первый запуск:              {first * 1000:9.1f} мс")
+    print(f"Миграции, последующие запуски:        {min(repeated) * 1000:9.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
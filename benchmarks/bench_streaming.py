@@ -0,0 +1,148 @@
+"""
+Бенчмарк потоковых ответов GigaChat: время до первого блюда и до полного
+ответа без потока и с потоком (запросы идут в GigaChat-заглушку, которая
+"генерирует" ответ кусками с паузой), а также проверка инкрементального
+парсера и ProgressReply на поддельном сообщении Telegram.
+
+Завершается с кодом 1, если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/bench_streaming.py [блюд_в_ответе] [пауза_между_кусками_мс]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench_streaming.db'))
+os.environ['AI_STREAM_ENABLED'] = 'true'
+
+import database
+from ai import service as ai_service_module
+from ai.cache import analysis_cache
+from ai.service import AIService
+from ai.streaming import IncrementalDishParser
+from benchmarks.stub_server import start_stub
+from handlers.messages import ProgressReply
+
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def make_dishes(count: int) -> dict:
+    return {'dishes': [
+        {'name': f'Блюдо {i} {{"особое"}}', 'calories': 100 + i, 'protein': 5, 'fat': 3, 'carbs': 12, 'grams': 150}
+        for i in range(1, count + 1)
+    ]}
+
+
+class FakeMessage:
+    """Сообщение Telegram: запоминает отправки и правки со временем"""
+
+    def __init__(self, started: float, log: list):
+        self.started = started
+        self.log = log
+
+    async def reply_text(self, text, reply_markup=None):
+        await asyncio.sleep(0.02)
+        self.log.append(('reply', time.perf_counter() - self.started, text, reply_markup))
+        return self
+
+    async def edit_text(self, text, reply_markup=None):
+        await asyncio.sleep(0.02)
+        self.log.append(('edit', time.perf_counter() - self.started, text, reply_markup))
+        return self
+
+
+async def main() -> None:
+    dish_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    chunk_delay_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 40.0
+
+    print("🧩 Инкрементальный парсер")
+    content = json.dumps(make_dishes(dish_count), ensure_ascii=False)
+    for wrapped in (content, f'```json\n{content}\n```'):
+        for size in (1, 7, 64, len(wrapped)):
+            parser = IncrementalDishParser()
+            dishes = []
+            for start in range(0, len(wrapped), size):
+                dishes.extend(parser.feed(wrapped[start:start + size]))
+            if dishes != make_dishes(dish_count)['dishes']:
+                check(False, f"куски по {size} символов: {dishes}")
+                break
+        else:
+            check(True, f"все блюда при любом размере кусков{' (в markdown)' if wrapped != content else ''}")
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=0.2)
+    state.chat_dishes = make_dishes(dish_count)
+    state.stream_chunk_delay = chunk_delay_ms / 1000
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    service = AIService()
+    service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await service.start()
+    await service._get_access_token()
+
+    try:
+        analysis_cache.clear_memory()
+        started = time.perf_counter()
+        plain = await service.analyze_food_text('обед без потока')
+        plain_total = time.perf_counter() - started
+
+        first = []
+        streamed_dishes = []
+
+        async def on_dish(dish):
+            first.append(time.perf_counter())
+            streamed_dishes.append(dish)
+
+        started = time.perf_counter()
+        streamed = await service.analyze_food_text('обед потоком', on_dish)
+        stream_total = time.perf_counter() - started
+        first_dish = first[0] - started if first else float('nan')
+
+        print(f"📊 {dish_count} блюд, пауза между кусками {chunk_delay_ms:.0f} мс")
+        print(f"   Без потока: первое блюдо через {plain_total * 1000:6.0f} мс (вместе с остальными)")
+        print(f"   Потоком:    первое блюдо через {first_dish * 1000:6.0f} мс, все через {stream_total * 1000:6.0f} мс")
+        check(streamed == plain, "итог потокового ответа совпадает с обычным")
+        check(streamed_dishes == streamed, "блюда пришли по одному в порядке ответа")
+        check(first_dish < plain_total / 2, "первое блюдо раньше половины времени полного ответа")
+
+        print("💬 ProgressReply")
+        analysis_cache.clear_memory()
+        log = []
+        started = time.perf_counter()
+        progress = ProgressReply(FakeMessage(started, log))
+        dishes = await service.analyze_food_text('ужин потоком', progress.add_dish)
+        await progress.finish('итог', reply_markup='кнопки')
+        shown = [entry for entry in log if entry[3] is None]
+        check(bool(shown) and shown[0][0] == 'reply' and shown[0][1] < stream_total / 2,
+              f"прогресс показан через {shown[0][1] * 1000:.0f} мс" if shown else "прогресс не показан")
+        check(log[-1][0] == 'edit' and log[-1][2] == 'итог' and log[-1][3] == 'кнопки',
+              "итог заменил сообщение с прогрессом")
+        check(len(log) <= 2 + stream_total / 0.7, f"правок сообщения: {len(log)}")
+        check(len(dishes) == dish_count, "итоговый список полный")
+        print(f"📈 {service.usage}")
+    finally:
+        await service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
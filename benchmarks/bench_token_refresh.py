@@ -0,0 +1,91 @@
+"""
+Бенчмарк обновления OAuth-токена в момент его истечения.
+
+Волна из N одновременных запросов приходит, когда токен уже устарел:
+- старая реализация (проверка + POST без блокировки) отправляет N запросов в OAuth;
+- TokenManager отправляет один (single-flight), а с фоновым обновлением
+  запросы вообще не ждут OAuth.
+
+Запуск:
+    python benchmarks/bench_token_refresh.py [запросов_в_волне] [задержка_oauth_мс]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+
+import aiohttp
+
+from ai.auth import TokenManager
+from benchmarks.stub_server import start_stub
+
+
+class LegacyToken:
+    """Старая логика AIService._get_access_token: каждый запрос сам обновляет устаревший токен"""
+
+    def __init__(self, oauth_url: str, session: aiohttp.ClientSession):
+        self.oauth_url = oauth_url
+        self.session = session
+        self.access_token = None
+        self.token_expires_at = 0
+
+    async def get_token(self) -> str:
+        if self.access_token and time.time() < self.token_expires_at - 300:
+            return self.access_token
+        headers = {'RqUID': str(uuid.uuid4()), 'Authorization': 'Basic bench'}
+        async with self.session.post(self.oauth_url, headers=headers, data={'scope': 'GIGACHAT_API_PERS'}, ssl=False) as response:
+            result = await response.json()
+        self.access_token = result['access_token']
+        self.token_expires_at = result['expires_at'] / 1000
+        return self.access_token
+
+
+async def wave(get_token, requests: int) -> float:
+    """Волна одновременных запросов, возвращает максимальное ожидание токена (мс)"""
+    async def one() -> float:
+        started = time.perf_counter()
+        await get_token()
+        return (time.perf_counter() - started) * 1000
+
+    return max(await asyncio.gather(*(one() for _ in range(requests))))
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+
+    # Токен живет 2 секунды: запас в 300 секунд делает его сразу "устаревшим" для старой логики
+    runner, base_url, state = await start_stub(tls=False, latency=latency_ms / 1000, token_ttl=2)
+    oauth_url = f'{base_url}/api/v2/oauth'
+
+    print(f"📊 Волна из {requests} запросов, задержка OAuth {latency_ms:.0f} мс")
+    async with aiohttp.ClientSession() as session:
+        try:
+            legacy = LegacyToken(oauth_url, session)
+            state.requests['oauth'] = 0
+            waited = await wave(legacy.get_token, requests)
+            print(f"  без блокировки          : POST в OAuth: {state.requests['oauth']:4d}, макс. ожидание {waited:6.1f} мс")
+
+            manager = TokenManager('bench', 'GIGACHAT_API_PERS', lambda: session, oauth_url)
+            state.requests['oauth'] = 0
+            waited = await wave(manager.get_token, requests)
+            print(f"  single-flight           : POST в OAuth: {state.requests['oauth']:4d}, макс. ожидание {waited:6.1f} мс")
+
+            # Фоновое обновление: ждем, пока токен будет продлен заранее, и даем новую волну
+            state.requests['oauth'] = 0
+            await asyncio.sleep(1.5)
+            waited = await wave(manager.get_token, requests)
+            print(f"  фоновое обновление      : POST в OAuth: {state.requests['oauth']:4d}, макс. ожидание {waited:6.1f} мс")
+            print(f"📈 {manager.stats()}")
+            await manager.close()
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,377 @@
+"""
+Нагрузочный прогон бота целиком против локальной заглушки GigaChat и
+SaluteSpeech (benchmarks/stub_server.py) - без реальных API и квоты.
+
+Синтетические пользователи одновременно шлют в обработчики бота
+(handlers.messages.handle_message, handlers.media.handle_voice):
+- сообщения о еде (DefaultSession -> handle_food_message);
+- правки только что сохраненного приема пищи (сессия редактирования,
+  как после кнопки "Редактировать" -> handle_edit_message);
+- голосовые сообщения (handle_voice_message).
+Telegram Bot API заменен поддельными объектами с задержкой; заглушка
+отвечает с логнормальной задержкой и случайными ошибками 500/503 и 429.
+
+Печатается:
+- пропускная способность (действий пользователей в секунду);
+- p50/p95/p99 задержки по этапам: обработчик целиком по видам действий,
+  анализ и правка через AI, попытка запроса к GigaChat (с очередью
+  ai.limiter), распознавание речи, запросы к базе и Bot API;
+- запросов к GigaChat и SaluteSpeech на действие пользователя.
+
+Логи обработчиков на время прогона отключаются. Завершается с кодом 1,
+если какая-то проверка не выполнена.
+
+Запуск:
+    python benchmarks/load_test.py [пользователей] [действий_на_пользователя] [задержка_мс] [доля_ошибок] [доля_429]
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_TOKEN', 'bench')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'bench')
+os.environ.setdefault('SALUTEspeech_API_KEY', 'bench')
+os.environ.setdefault('KBJU_DB_PATH', os.path.join(tempfile.mkdtemp(), 'load_test.db'))
+
+import database
+import texts
+from ai import service as ai_service_module
+from ai.service import get_ai_service
+from benchmarks.stub_server import start_stub
+from handlers import messages as messages_module
+from handlers.media import handle_voice
+from handlers.messages import handle_message
+from services import speech_service as speech_service_module
+from services.speech_service import SpeechService
+from sessions import SessionManager, SessionType
+
+# Задержка одного вызова Bot API (секунд)
+TELEGRAM_LATENCY = 0.03
+# Пауза пользователя между действиями (до, секунд)
+THINK_TIME = 0.2
+# Разброс задержки заглушки: сигма логарифма логнормального распределения
+STUB_JITTER = 0.5
+# Доли действий: текст о еде, правка последнего приема пищи, голосовое
+ACTION_WEIGHTS = {'food': 6, 'edit': 2, 'voice': 2}
+
+FOODS = [
+    'гречка', 'курица', 'рис', 'омлет', 'борщ', 'творог', 'банан', 'овсянка', 'салат',
+    'макароны', 'котлета', 'суп', 'йогурт', 'сырники', 'пельмени', 'яблоко', 'кефир',
+]
+# Правки: количество (применяются без AI) и уточнения состава (через AI)
+EDITS = ['200г', 'x2', 'половина', 'полторы порции', 'это была гречка', 'добавь хлеб', 'на самом деле с сыром']
+VOICE_TEXTS = ['гречка с курицей и салат', 'омлет из двух яиц', 'борщ со сметаной', 'творог с бананом']
+
+VOICE_BYTES = b'OggS' + bytes(4096)
+
+# Вид действия, в рамках которого идет вызов (для подсчета запросов к API на действие)
+current_action: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_action', default=None)
+
+message_ids = itertools.count(1)
+failures = []
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"  {'✅' if condition else '❌'} {description}")
+    if not condition:
+        failures.append(description)
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Metrics:
+    """Задержки по этапам и вызовы внешних API по видам действий"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.api_calls: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, stage: str, started: float) -> None:
+        self.stages[stage].append((time.perf_counter() - started) * 1000)
+
+    def count_call(self, api: str) -> None:
+        self.api_calls[current_action.get() or 'фон'][api] += 1
+
+    def timed(self, stage: str, func: Callable, api: Optional[str] = None) -> Callable:
+        """Обертка корутины: время вызова в этап stage, вызов - в счетчик api"""
+        async def wrapper(*args, **kwargs):
+            if api:
+                self.count_call(api)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, started)
+        return wrapper
+
+
+class FakeBot:
+    """Bot API с задержкой: только методы, которые вызывают обработчики"""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self.calls: Counter = Counter()
+
+    async def api(self, method: str) -> None:
+        self.calls[method] += 1
+        started = time.perf_counter()
+        await asyncio.sleep(TELEGRAM_LATENCY)
+        self.metrics.record('telegram', started)
+
+    async def get_file(self, file_id: str) -> 'FakeFile':
+        await self.api('getFile')
+        return FakeFile(self)
+
+    async def delete_message(self, chat_id: int, message_id: int) -> bool:
+        await self.api('deleteMessage')
+        return True
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str, reply_markup: Any = None) -> 'FakeMessage':
+        await self.api('editMessageText')
+        return FakeMessage(self, SimpleNamespace(id=chat_id), text, reply_markup=reply_markup)
+
+
+class FakeFile:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+
+    async def download_to_drive(self, path: str) -> None:
+        await self.bot.api('downloadFile')
+        with open(path, 'wb') as file:
+            file.write(VOICE_BYTES)
+
+
+class FakeChat:
+    def __init__(self, bot: FakeBot, chat_id: int):
+        self.bot = bot
+        self.id = chat_id
+
+    async def send_action(self, action: str) -> bool:
+        await self.bot.api('sendChatAction')
+        return True
+
+
+class FakeMessage:
+    """Сообщение чата: ответы бота собираются в replies"""
+
+    def __init__(self, bot: FakeBot, chat: Any, text: Optional[str] = None, voice: Any = None, reply_markup: Any = None):
+        self.bot = bot
+        self.chat = chat
+        self.message_id = next(message_ids)
+        self.text = text
+        self.voice = voice
+        self.reply_markup = reply_markup
+        self.replies: List['FakeMessage'] = []
+
+    async def reply_text(self, text: str, reply_markup: Any = None) -> 'FakeMessage':
+        await self.bot.api('sendMessage')
+        reply = FakeMessage(self.bot, self.chat, text, reply_markup=reply_markup)
+        self.replies.append(reply)
+        return reply
+
+    async def edit_text(self, text: str, reply_markup: Any = None) -> 'FakeMessage':
+        await self.bot.api('editMessageText')
+        self.text = text
+        self.reply_markup = reply_markup
+        return self
+
+
+class SyntheticUser:
+    """Пользователь со своим user_data, как в CallbackContext"""
+
+    def __init__(self, user_id: int, bot: FakeBot, bot_data: Dict[str, Any], rng: random.Random):
+        self.user = SimpleNamespace(id=user_id, first_name=f'Load{user_id}', username=f'load{user_id}', last_name=None)
+        self.chat = FakeChat(bot, user_id)
+        self.context = SimpleNamespace(bot=bot, bot_data=bot_data, user_data={})
+        self.bot = bot
+        self.rng = rng
+        # Кнопка "Редактировать" последнего сохраненного приема пищи: "edit_<ids>_<day_id>"
+        self.last_meal: Optional[FakeMessage] = None
+
+    def update(self, message: FakeMessage) -> Any:
+        return SimpleNamespace(effective_user=self.user, effective_chat=self.chat, message=message)
+
+    async def send_food(self) -> FakeMessage:
+        items = self.rng.sample(FOODS, self.rng.randint(1, 2))
+        text = ', '.join(f'{item} {self.rng.randrange(100, 350, 50)}г' for item in items)
+        message = FakeMessage(self.bot, self.chat, text)
+        await handle_message(self.update(message), self.context)
+        return message
+
+    async def send_edit(self) -> FakeMessage:
+        # Как после нажатия "Редактировать" (handlers.callbacks)
+        _, entry_ids, day_id = self.last_meal.reply_markup.inline_keyboard[0][0].callback_data.split('_')
+        SessionManager.set_session(self.context, SessionType.EDITING, {
+            'editing_entry_ids': [int(entry_id) for entry_id in entry_ids.split(',')],
+            'editing_message_id': self.last_meal.message_id,
+            'editing_day_id': int(day_id),
+            'editing_prompt_message_id': next(message_ids),
+        })
+        message = FakeMessage(self.bot, self.chat, self.rng.choice(EDITS))
+        await handle_message(self.update(message), self.context)
+        if SessionManager.is_in_session(self.context, SessionType.EDITING):
+            # Правка не применилась - пользователь нажимает "Отменить"
+            SessionManager.clear_session(self.context)
+        return message
+
+    async def send_voice(self) -> FakeMessage:
+        message = FakeMessage(self.bot, self.chat, voice=SimpleNamespace(file_id=f'voice-{next(message_ids)}'))
+        await handle_voice(self.update(message), self.context)
+        return message
+
+
+def saved_meal(message: FakeMessage) -> Optional[FakeMessage]:
+    """Ответ с кнопками сохраненного приема пищи или None"""
+    for reply in message.replies:
+        if reply.reply_markup is not None:
+            return reply
+    return None
+
+
+async def run_user(user: SyntheticUser, actions: int, metrics: Metrics, outcomes: Dict[str, Counter]) -> None:
+    kinds, weights = zip(*ACTION_WEIGHTS.items())
+    for _ in range(actions):
+        await asyncio.sleep(user.rng.uniform(0, THINK_TIME))
+        kind = user.rng.choices(kinds, weights)[0]
+        if kind == 'edit' and user.last_meal is None:
+            kind = 'food'
+        token = current_action.set(kind)
+        started = time.perf_counter()
+        try:
+            message = await getattr(user, f'send_{kind}')()
+        except Exception as e:
+            outcomes[kind]['исключение'] += 1
+            print(f"❌ {kind}: {e!r}", file=sys.stderr)
+            continue
+        finally:
+            metrics.record(f'действие: {kind}', started)
+            current_action.reset(token)
+
+        outcomes[kind]['всего'] += 1
+        if not message.replies:
+            outcomes[kind]['без ответа'] += 1
+        elif kind == 'edit':
+            ok = any(reply.text == texts.EDIT_SUCCESS_TEXT for reply in message.replies)
+            outcomes[kind]['применено' if ok else 'не применено'] += 1
+        else:
+            meal = saved_meal(message)
+            if meal is not None:
+                user.last_meal = meal
+            outcomes[kind]['сохранено' if meal is not None else 'не сохранено'] += 1
+
+
+def instrument(metrics: Metrics, ai_service: Any, speech_service: SpeechService) -> None:
+    """Замеры этапов: методы сервисов и функции базы оборачиваются таймерами"""
+    ai_service.analyze_food_text = metrics.timed('ai: анализ', ai_service.analyze_food_text)
+    ai_service.process_edit_meal = metrics.timed('ai: правка', ai_service.process_edit_meal)
+    ai_service._post_chat_once = metrics.timed('gigachat: очередь и запрос', ai_service._post_chat_once, api='chat')
+    speech_service.recognize_speech = metrics.timed('speech: распознавание', speech_service.recognize_speech)
+    speech_service._call_recognition_api = metrics.timed(
+        'speech: попытка', speech_service._call_recognition_api, api='speech'
+    )
+    for name in ('log_meal', 'get_food_entries_by_ids', 'update_food_entries'):
+        setattr(database.aio, name, metrics.timed(f'db: {name}', getattr(database.aio, name)))
+
+
+async def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    actions = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+    error_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+    rate_limit_rate = float(sys.argv[5]) if len(sys.argv) > 5 else 0.05
+
+    os.chdir(ROOT)
+    database.init_database()
+
+    runner, base_url, state = await start_stub(tls=False, latency=latency_ms / 1000, seed=1)
+    state.latency_distribution = 'lognormal'
+    state.latency_jitter = STUB_JITTER
+    state.error_rate = error_rate
+    state.rate_limit_rate = rate_limit_rate
+    state.recognized_texts = VOICE_TEXTS
+
+    ai_service_module.GIGACHAT_API_URL = f'{base_url}/api/v1/chat/completions'
+    speech_service_module.SALUTE_SPEECH_URL = f'{base_url}/rest/v1/speech:recognize'
+    ai_service = get_ai_service()
+    ai_service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    speech_service = SpeechService()
+    speech_service.token_manager.oauth_url = f'{base_url}/api/v2/oauth'
+    await ai_service.start()
+    await speech_service.start()
+    assert messages_module.food_service.ai_service is ai_service
+
+    metrics = Metrics()
+    instrument(metrics, ai_service, speech_service)
+    bot = FakeBot(metrics)
+    bot_data = {'speech_service': speech_service}
+    synthetic = [SyntheticUser(user_id, bot, bot_data, random.Random(user_id)) for user_id in range(1, users + 1)]
+    outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    print(f"🚦 {users} пользователей по {actions} действий, заглушка {base_url}: "
+          f"задержка {latency_ms:.0f} мс (логнормальная, сигма {STUB_JITTER}), "
+          f"ошибок {error_rate:.0%}, 429 - {rate_limit_rate:.0%}, Bot API {TELEGRAM_LATENCY * 1000:.0f} мс")
+    try:
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            await asyncio.gather(*(run_user(user, actions, metrics, outcomes) for user in synthetic))
+        elapsed = time.perf_counter() - started
+
+        total = sum(outcome['всего'] for outcome in outcomes.values())
+        print(f"⏱️  {total} действий за {elapsed:.1f} с: {total / elapsed:.1f} действий в секунду")
+        for kind, outcome in sorted(outcomes.items()):
+            print(f"   {kind:5s}: {dict(outcome)}")
+
+        print(f"📊 Задержки по этапам, мс")
+        print(f"   {'этап':32s} {'вызовов':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'макс':>8s}")
+        for stage, values in sorted(metrics.stages.items()):
+            print(f"   {stage:32s} {len(values):8d} {percentile(values, 50):8.1f} {percentile(values, 95):8.1f} "
+                  f"{percentile(values, 99):8.1f} {max(values):8.1f}")
+
+        print("🔢 Запросов к API на действие")
+        for kind, calls in sorted(metrics.api_calls.items()):
+            count = outcomes[kind]['всего'] if kind in outcomes else 0
+            per_action = ', '.join(
+                f"{api} {calls[api] / count:.2f}" if count else f"{api} {calls[api]}" for api in sorted(calls)
+            )
+            print(f"   {kind:5s}: {per_action}")
+        print(f"   заглушка всего: {state.requests} - {sum(state.requests.values()) / total:.2f} на действие "
+              f"(429: {state.rate_limited}, 500/503: {state.injected_errors})")
+        print(f"   Bot API: {dict(bot.calls)}")
+
+        check(all(outcome['исключение'] == 0 for outcome in outcomes.values()), "обработчики отработали без исключений")
+        check(all(outcome['без ответа'] == 0 for outcome in outcomes.values()), "каждое действие получило ответ")
+        check(outcomes['food']['сохранено'] == outcomes['food']['всего'],
+              "каждое сообщение о еде сохранено (при сбоях AI - с примерными значениями)")
+        voice = outcomes['voice']
+        check(voice['сохранено'] >= 0.9 * voice['всего'], "не меньше 90% голосовых распознано и сохранено")
+        edits = outcomes['edit']
+        check(edits['применено'] >= 0.9 * edits['всего'], "не меньше 90% правок применено")
+        chat_per_action = sum(calls['chat'] for calls in metrics.api_calls.values()) / total
+        check(chat_per_action <= 2, f"запросов к GigaChat на действие: {chat_per_action:.2f} (не больше 2)")
+        print(f"📈 {ai_service.stats()}")
+    finally:
+        await speech_service.close()
+        await ai_service.close()
+        await runner.cleanup()
+        database.aio.shutdown()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
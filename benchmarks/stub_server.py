@@ -0,0 +1,341 @@
+"""
+Локальная заглушка GigaChat API для бенчмарков.
+
+Отвечает на OAuth (/api/v2/oauth), chat/completions (/api/v1/chat/completions)
+и распознавание речи SaluteSpeech (/rest/v1/speech:recognize) так же,
+как настоящие сервисы. Для нагрузочных прогонов (benchmarks/load_test.py)
+настраиваются:
+- задержка: фиксированная, равномерная (latency ± jitter) или
+  логнормальная (медиана latency, длинный хвост), своя для каждого
+  эндпоинта;
+- доля случайных ответов 500/503 и 429 на chat/completions и
+  распознавание речи (генератор с seed - прогоны воспроизводимы).
+На правку приема пищи chat/completions возвращает исходные блюда, чтобы
+число блюд в ответе совпадало с правкой. По умолчанию работает по HTTPS
+с самоподписанным сертификатом (создается через openssl), чтобы в
+замерах участвовал TLS-handshake.
+
+Бот можно направить на заглушку через переменные окружения:
+    GIGACHAT_OAUTH_URL=https://127.0.0.1:8443/api/v2/oauth
+    GIGACHAT_API_URL=https://127.0.0.1:8443/api/v1/chat/completions
+    SALUTE_SPEECH_URL=https://127.0.0.1:8443/rest/v1/speech:recognize
+
+Запуск отдельно:
+    python benchmarks/stub_server.py [порт] [задержка_мс] [доля_ошибок] [доля_429]
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ai.batching import BATCH_HEADER
+
+# Время жизни выдаваемого токена (как у GigaChat - 30 минут)
+TOKEN_TTL = 30 * 60
+
+STUB_DISHES = {
+    'dishes': [
+        {'name': 'Гречка с курицей', 'calories': 350, 'protein': 30, 'fat': 8, 'carbs': 40, 'grams': 250},
+    ]
+}
+
+STUB_RECOGNIZED_TEXT = 'гречка с курицей и салат'
+
+# Распределения задержки ответа
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+# Начало исходного приема пищи в промпте правки (AIService.process_edit_meal)
+EDIT_MEAL_MARKER = 'Оригинальный прием пищи: '
+
+
+def make_ssl_context() -> ssl.SSLContext:
+    """Создает самоподписанный сертификат для 127.0.0.1 и серверный SSL-контекст"""
+    cert_dir = tempfile.mkdtemp(prefix='kbju_stub_')
+    cert_file = os.path.join(cert_dir, 'cert.pem')
+    key_file = os.path.join(cert_dir, 'key.pem')
+    subprocess.run(
+        [
+            'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+            '-keyout', key_file, '-out', cert_file, '-days', '1',
+            '-subj', '/CN=127.0.0.1',
+        ],
+        check=True, capture_output=True
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+class StubState:
+    """Настройки и счетчики заглушки"""
+
+    def __init__(self, latency: float = 0.0, token_ttl: float = TOKEN_TTL, seed: Optional[int] = None):
+        self.latency = latency
+        self.token_ttl = token_ttl
+        # Распределение задержки (LATENCY_DISTRIBUTIONS): для 'uniform' jitter -
+        # доля разброса вокруг latency, для 'lognormal' - сигма логарифма
+        self.latency_distribution = 'fixed'
+        self.latency_jitter = 0.0
+        # Своя задержка эндпоинта ('oauth', 'chat', 'speech') вместо latency
+        self.endpoint_latency: Dict[str, float] = {}
+        # Доля случайных ответов 500/503 и 429 на chat/completions и speech:recognize
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.random = random.Random(seed)
+        # Отвечать ошибкой 500 на chat/completions
+        self.fail_chat = False
+        # Ответить 503 на столько следующих chat/completions (временный сбой)
+        self.fail_chat_next = 0
+        # Отвечать на пачку (см. ai.batching) текстом без JSON
+        self.break_batch = False
+        # Отвечать 429 на chat/completions сверх стольких одновременных (0 - без лимита)
+        self.max_concurrent_chat = 0
+        self.chat_inflight = 0
+        # Ответ модели на анализ текста
+        self.chat_dishes = STUB_DISHES
+        # Генерация ответа: символов в куске и пауза на каждый кусок. Потоковый
+        # ответ отдает кусок за куском, обычный - весь текст после всех пауз
+        self.stream_chunk_size = 16
+        self.stream_chunk_delay = 0.0
+        # Последний текст пользователя, отправленный в chat/completions
+        self.last_prompt = ''
+        # Суммарный расход токенов (оценка: 4 символа на токен)
+        self.prompt_tokens = 0
+        # Тексты, которые возвращает распознавание речи (случайный из списка)
+        self.recognized_texts = [STUB_RECOGNIZED_TEXT]
+        self.requests = {'oauth': 0, 'chat': 0, 'speech': 0}
+        self.rate_limited = 0
+        self.injected_errors = 0
+
+    def sample_latency(self, endpoint: str) -> float:
+        """Задержка очередного ответа эндпоинта в секундах"""
+        latency = self.endpoint_latency.get(endpoint, self.latency)
+        if latency <= 0 or not self.latency_jitter:
+            return max(0.0, latency)
+        if self.latency_distribution == 'uniform':
+            return latency * self.random.uniform(max(0.0, 1 - self.latency_jitter), 1 + self.latency_jitter)
+        if self.latency_distribution == 'lognormal':
+            return self.random.lognormvariate(math.log(latency), self.latency_jitter)
+        return latency
+
+    def injected_failure(self) -> Optional[web.Response]:
+        """Случайный ответ 429 или 500/503 с заданными долями, иначе None"""
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.rate_limited += 1
+            return web.json_response({'status': 429, 'message': 'Too Many Requests'}, status=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.injected_errors += 1
+            status = self.random.choice((500, 503))
+            return web.json_response({'status': status, 'message': 'stub injected failure'}, status=status)
+        return None
+
+
+async def _delay(state: StubState, endpoint: str) -> None:
+    latency = state.sample_latency(endpoint)
+    if latency:
+        await asyncio.sleep(latency)
+
+
+async def oauth(request: web.Request) -> web.Response:
+    state: StubState = request.app['state']
+    state.requests['oauth'] += 1
+    await request.post()
+    await _delay(state, 'oauth')
+    return web.json_response({
+        'access_token': f'stub-{uuid.uuid4()}',
+        'expires_at': int((time.time() + state.token_ttl) * 1000),
+    })
+
+
+async def chat_completions(request: web.Request) -> web.Response:
+    state: StubState = request.app['state']
+    state.requests['chat'] += 1
+    body = await request.json()
+    state.last_prompt = body['messages'][-1]['content']
+    prompt_tokens = sum(len(message['content']) for message in body['messages']) // 4
+    state.prompt_tokens += prompt_tokens
+    if state.max_concurrent_chat and state.chat_inflight >= state.max_concurrent_chat:
+        state.rate_limited += 1
+        return web.json_response({'status': 429, 'message': 'Too Many Requests'}, status=429)
+    failure = state.injected_failure()
+    if failure is not None:
+        # Ошибка приходит после обычной задержки, как таймаут модели на стороне API
+        if failure.status != 429:
+            await _delay(state, 'chat')
+        return failure
+    state.chat_inflight += 1
+    try:
+        return await _chat_answer(request, state, body, prompt_tokens)
+    finally:
+        state.chat_inflight -= 1
+
+
+async def _chat_answer(request: web.Request, state: StubState, body: dict, prompt_tokens: int) -> web.StreamResponse:
+    await _delay(state, 'chat')
+    if state.fail_chat:
+        return web.json_response({'status': 500, 'message': 'stub failure'}, status=500)
+    if state.fail_chat_next:
+        state.fail_chat_next -= 1
+        return web.json_response({'status': 503, 'message': 'stub unavailable'}, status=503)
+
+    batch = _batch_numbers(state.last_prompt)
+    edited = _edited_meal(state.last_prompt)
+    if batch and state.break_batch:
+        content = 'Извините, не могу разобрать несколько текстов сразу.'
+    elif batch:
+        content = json.dumps(
+            {'results': [{'id': number, 'dishes': STUB_DISHES['dishes']} for number in batch]},
+            ensure_ascii=False
+        )
+    elif edited is not None:
+        content = json.dumps(edited, ensure_ascii=False)
+    else:
+        content = json.dumps(state.chat_dishes, ensure_ascii=False)
+    completion_tokens = len(content) // 4
+    usage = {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+    }
+    if body.get('stream'):
+        return await _stream_content(request, state, content, usage)
+    if state.stream_chunk_delay:
+        chunks = -(-len(content) // max(1, state.stream_chunk_size))
+        await asyncio.sleep(state.stream_chunk_delay * (chunks - 1))
+    return web.json_response({
+        'choices': [
+            {'message': {'role': 'assistant', 'content': content}}
+        ],
+        'usage': usage,
+    })
+
+
+async def _stream_content(request: web.Request, state: StubState, content: str, usage: dict) -> web.StreamResponse:
+    """Отдает ответ событиями SSE, как GigaChat при "stream": true"""
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    size = max(1, state.stream_chunk_size)
+    for start in range(0, len(content), size):
+        if start and state.stream_chunk_delay:
+            await asyncio.sleep(state.stream_chunk_delay)
+        event = {'choices': [{'delta': {'content': content[start:start + size]}, 'index': 0}]}
+        await response.write(f'data: {json.dumps(event, ensure_ascii=False)}\n\n'.encode('utf-8'))
+    final = {'choices': [{'delta': {'content': ''}, 'index': 0, 'finish_reason': 'stop'}], 'usage': usage}
+    await response.write(f'data: {json.dumps(final, ensure_ascii=False)}\n\n'.encode('utf-8'))
+    await response.write(b'data: [DONE]\n\n')
+    await response.write_eof()
+    return response
+
+
+def _batch_numbers(prompt: str) -> List[int]:
+    """Номера текстов пачки (строки "N. текст" после BATCH_HEADER) или пустой список"""
+    _, found, texts = prompt.partition(BATCH_HEADER)
+    if not found:
+        return []
+    return [int(match.group(1)) for match in re.finditer(r'^(\d+)\. ', texts, re.MULTILINE)]
+
+
+def _edited_meal(prompt: str) -> Optional[Dict[str, Any]]:
+    """Исходный прием пищи из промпта правки (его и возвращает заглушка) или None"""
+    # Последнее вхождение: в промпте правки до него есть примеры с тем же маркером
+    _, found, rest = prompt.rpartition(EDIT_MEAL_MARKER)
+    if not found:
+        return None
+    try:
+        return json.loads(rest.split('\n', 1)[0])
+    except ValueError:
+        return None
+
+
+async def speech_recognize(request: web.Request) -> web.Response:
+    state: StubState = request.app['state']
+    state.requests['speech'] += 1
+    await request.read()
+    failure = state.injected_failure()
+    if failure is not None and failure.status == 429:
+        return failure
+    await _delay(state, 'speech')
+    if failure is not None:
+        return failure
+    return web.json_response({'result': [state.random.choice(state.recognized_texts)], 'status': 200})
+
+
+def create_app(state: StubState) -> web.Application:
+    app = web.Application()
+    app['state'] = state
+    app.router.add_post('/api/v2/oauth', oauth)
+    app.router.add_post('/api/v1/chat/completions', chat_completions)
+    app.router.add_post('/rest/v1/speech:recognize', speech_recognize)
+    return app
+
+
+async def start_stub(
+    port: int = 0,
+    tls: bool = True,
+    latency: float = 0.0,
+    token_ttl: float = TOKEN_TTL,
+    seed: Optional[int] = None
+) -> Tuple[web.AppRunner, str, StubState]:
+    """
+    Запускает заглушку в текущем event loop.
+
+    Args:
+        port: Порт (0 - любой свободный)
+        tls: Работать по HTTPS
+        latency: Задержка ответов в секундах
+        token_ttl: Время жизни выдаваемых токенов в секундах
+        seed: Seed генератора задержек и случайных ошибок
+
+    Returns:
+        (runner для остановки, базовый URL, состояние со счетчиками)
+    """
+    state = StubState(latency, token_ttl, seed)
+    runner = web.AppRunner(create_app(state), access_log=None)
+    await runner.setup()
+    ssl_context: Optional[ssl.SSLContext] = make_ssl_context() if tls else None
+    site = web.TCPSite(runner, '127.0.0.1', port, ssl_context=ssl_context)
+    await site.start()
+
+    bound_port = site._server.sockets[0].getsockname()[1]
+    scheme = 'https' if tls else 'http'
+    return runner, f'{scheme}://127.0.0.1:{bound_port}', state
+
+
+async def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8443
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    error_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    rate_limit_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    runner, base_url, state = await start_stub(port, latency=latency_ms / 1000)
+    state.error_rate = error_rate
+    state.rate_limit_rate = rate_limit_rate
+    print(f"🧪 Заглушка GigaChat запущена: {base_url} (ошибок {error_rate:.0%}, 429 - {rate_limit_rate:.0%})")
+    print(f"   GIGACHAT_OAUTH_URL={base_url}/api/v2/oauth")
+    print(f"   GIGACHAT_API_URL={base_url}/api/v1/chat/completions")
+    print(f"   SALUTE_SPEECH_URL={base_url}/rest/v1/speech:recognize")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
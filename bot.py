@@ -17,8 +17,11 @@ import texts
 # Загружаем переменные из .env
 load_dotenv()
 
-# Импортируем базу данных (она инициализируется автоматически)
+# Импортируем базу данных
 import database
+from ai.service import get_ai_service
+from ai.edits import get_local_edit_stats
+from services.speech_service import SpeechService
 
 TOKEN = os.getenv('TELEGRAM_TOKEN')
 
@@ -35,9 +38,15 @@ async def main():
     print(texts.BOT_START_TITLE)
     print(texts.BOT_START_FOOTER)
     
+    # Применяем миграции схемы базы данных
+    database.init_database()
+    
     # Создаем приложение
     app = Application.builder().token(TOKEN).build()
     
+    # Один сервис распознавания речи на приложение (общие сессия и токен)
+    app.bot_data['speech_service'] = SpeechService()
+    
     # Добавляем обработчики команд
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
@@ -61,6 +70,9 @@ async def main():
     try:
         # Запускаем бота
         await app.initialize()
+        # Общая HTTP-сессия к GigaChat на все время работы бота
+        await get_ai_service().start()
+        await app.bot_data['speech_service'].start()
         await app.start()
         await app.updater.start_polling(allowed_updates=None)
         
@@ -74,6 +86,15 @@ async def main():
         if 'app' in locals():
             await app.stop()
             await app.shutdown()
+            speech_service = app.bot_data['speech_service']
+            print(f"🎤 Статистика распознавания речи: {speech_service.stats()}")
+            await speech_service.close()
+        # Закрываем соединения с GigaChat
+        print(f"🤖 Статистика запросов к GigaChat: {get_ai_service().stats()}")
+        print(f"✏️  Правки без AI: {get_local_edit_stats()}")
+        await get_ai_service().close()
+        # Дожидаемся записей в БД и закрываем подключения
+        database.aio.shutdown()
 
 if __name__ == '__main__':
     # Запускаем асинхронную функцию
@@ -16,9 +16,52 @@ GIGACHAT_AUTH_KEY = os.getenv('GIGACHAT_AUTH_KEY')
 # SaluteSpeech API (Authorization Key из кабинета)
 SALUTEspeech_API_KEY = os.getenv('SALUTEspeech_API_KEY')
 
+# Адреса GigaChat API (можно переопределить, например, для локального стенда)
+GIGACHAT_OAUTH_URL = os.getenv('GIGACHAT_OAUTH_URL', 'https://ngw.devices.sberbank.ru:9443/api/v2/oauth')
+GIGACHAT_API_URL = os.getenv('GIGACHAT_API_URL', 'https://gigachat.devices.sberbank.ru/api/v1/chat/completions')
+
+# Адрес SaluteSpeech API (распознавание речи)
+SALUTE_SPEECH_URL = os.getenv('SALUTE_SPEECH_URL', 'https://smartspeech.sber.ru/rest/v1/speech:recognize')
+
 # Настройки AI
 AI_TIMEOUT = 30  # секунд
 
+# HTTP-подключения к AI (одна сессия на процесс)
+AI_CONNECTION_LIMIT = int(os.getenv('AI_CONNECTION_LIMIT', '20'))  # одновременных соединений
+AI_KEEPALIVE_TIMEOUT = 60  # секунд простоя до закрытия соединения
+AI_DNS_CACHE_TTL = 300  # секунд кэширования DNS
+
+# Микро-батчинг анализов: одновременные запросы уходят в GigaChat одной пачкой
+AI_BATCH_ENABLED = os.getenv('AI_BATCH_ENABLED', 'False').lower() == 'true'
+AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', '8'))  # запросов в пачке
+AI_BATCH_MAX_WAIT_MS = float(os.getenv('AI_BATCH_MAX_WAIT_MS', '20'))  # мс ожидания пачки
+
+# Потоковые ответы GigaChat: бот показывает блюда по мере их появления в ответе
+AI_STREAM_ENABLED = os.getenv('AI_STREAM_ENABLED', 'False').lower() == 'true'
+STREAM_EDIT_INTERVAL = 0.7  # секунд между правками сообщения с прогрессом (лимиты Telegram)
+
+# Очередь к GigaChat: адаптивный (AIMD) лимит одновременных запросов и token bucket
+AI_CONCURRENCY_INITIAL = int(os.getenv('AI_CONCURRENCY_INITIAL', '4'))
+AI_CONCURRENCY_MIN = int(os.getenv('AI_CONCURRENCY_MIN', '1'))
+AI_CONCURRENCY_MAX = int(os.getenv('AI_CONCURRENCY_MAX', str(AI_CONNECTION_LIMIT)))
+# Частота по умолчанию не ограничена: квоту GigaChat задает тариф, а перегрузку
+# (429, 5xx, таймауты) отрабатывает адаптивный лимит одновременных запросов
+AI_RATE_LIMIT = float(os.getenv('AI_RATE_LIMIT', '0'))  # запросов в секунду (0 - без ограничения)
+AI_RATE_BURST = int(os.getenv('AI_RATE_BURST', '10'))  # запросов разом сверх частоты
+AI_QUEUE_TIMEOUT = float(os.getenv('AI_QUEUE_TIMEOUT', '20'))  # секунд ожидания в очереди
+
+# Повторы запросов к AI и circuit breaker
+AI_REQUEST_DEADLINE = float(os.getenv('AI_REQUEST_DEADLINE', '40'))  # секунд на запрос со всеми повторами
+AI_RETRY_ATTEMPTS = int(os.getenv('AI_RETRY_ATTEMPTS', '3'))  # попыток на запрос
+AI_RETRY_BASE_DELAY = float(os.getenv('AI_RETRY_BASE_DELAY', '0.5'))  # секунд перед первым повтором (до)
+AI_RETRY_MAX_DELAY = float(os.getenv('AI_RETRY_MAX_DELAY', '4'))  # секунд между повторами (до)
+AI_BREAKER_THRESHOLD = int(os.getenv('AI_BREAKER_THRESHOLD', '5'))  # сбоев подряд до размыкания
+AI_BREAKER_RESET_TIMEOUT = float(os.getenv('AI_BREAKER_RESET_TIMEOUT', '30'))  # секунд до пробного запроса
+
+# Фоновый пересчет через AI записей с примерными значениями (после сбоя AI)
+AI_REANALYSIS_MAX_PENDING = int(os.getenv('AI_REANALYSIS_MAX_PENDING', '1000'))  # записей в очереди
+AI_REANALYSIS_ATTEMPTS = int(os.getenv('AI_REANALYSIS_ATTEMPTS', '3'))  # попыток на запись
+
 # Настройки приложения
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
@@ -5,6 +5,15 @@
 - users: работа с пользователями
 - days: работа с днями
 - food_entries: работа с записями о еде
+- meals: запись приема пищи одной транзакцией
+- totals: итоги КБЖУ по дням (поддерживаются триггерами)
+- migrations: версионированные миграции схемы
+- day_cache: кэш текущего дня пользователей в памяти процесса
+- analysis_cache: хранилище кэша анализа текста
+- dish_dictionary: локальный словарь блюд (КБЖУ на 100 г из ответов AI)
+- aio: асинхронные версии функций (не блокируют event loop)
+
+Перед использованием базы нужно один раз вызвать init_database().
 """
 
 from .connection import get_connection, init_database
@@ -23,14 +32,21 @@ from .food_entries import (
     save_food_entries,
     get_food_entries_for_day,
     get_food_entry_by_id,
+    get_food_entries_by_ids,
     update_food_entry,
+    update_food_entries,
+    replace_estimated_entries,
     delete_food_entries,
     count_food_entries_for_day,
     get_day_totals,
+    get_prompt_version_stats,
 )
-
-# Инициализация базы данных при импорте
-init_database()
+from .meals import log_meal
+from .day_cache import get_day_cache_stats
+from .analysis_cache import get_cached_analysis, save_cached_analysis, prune_analysis_cache
+from .dish_dictionary import dish_key, find_dishes, get_dish_dictionary_size
+from .totals import rebuild_day_totals, check_day_totals
+from . import aio
 
 __all__ = [
     'get_connection',
@@ -45,8 +61,23 @@ __all__ = [
     'save_food_entries',
     'get_food_entries_for_day',
     'get_food_entry_by_id',
+    'get_food_entries_by_ids',
     'update_food_entry',
+    'update_food_entries',
+    'replace_estimated_entries',
     'delete_food_entries',
     'count_food_entries_for_day',
     'get_day_totals',
+    'get_prompt_version_stats',
+    'log_meal',
+    'get_day_cache_stats',
+    'get_cached_analysis',
+    'save_cached_analysis',
+    'prune_analysis_cache',
+    'dish_key',
+    'find_dishes',
+    'get_dish_dictionary_size',
+    'rebuild_day_totals',
+    'check_day_totals',
+    'aio',
 ]
@@ -0,0 +1,87 @@
+"""
+Асинхронный фасад над пакетом database.
+
+Синхронные функции выполняются вне event loop: все записи идут через один
+выделенный поток-писатель (SQLite допускает только одного писателя, так
+запросы не конкурируют за блокировку), чтения — через небольшой пул
+потоков-читателей (в режиме WAL они не блокируются писателем).
+
+Использование:
+    day_id, day_number = await database.aio.get_or_create_current_day(user_id)
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from . import users, days, food_entries, meals, analysis_cache, dish_dictionary
+from .connection import close_pool
+
+# Количество потоков-читателей (вместе с писателем не больше размера пула подключений)
+READER_THREADS = 3
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix='db-reader')
+
+
+def _run_in(executor: ThreadPoolExecutor, func: Callable) -> Callable:
+    """Оборачивает синхронную функцию БД в корутину, выполняемую в executor"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    return wrapper
+
+
+def writer(func: Callable) -> Callable:
+    """Асинхронная версия функции, которая пишет в базу"""
+    return _run_in(_writer, func)
+
+
+def reader(func: Callable) -> Callable:
+    """Асинхронная версия функции, которая только читает из базы"""
+    return _run_in(_readers, func)
+
+
+# Пользователи
+save_user = writer(users.save_user)
+set_user_timezone = writer(users.set_user_timezone)
+get_user_timezone = reader(users.get_user_timezone)
+
+# Дни
+get_or_create_current_day = writer(days.get_or_create_current_day)
+create_next_day = writer(days.create_next_day)
+is_day_current = reader(days.is_day_current)
+
+# Записи о еде
+save_food_entries = writer(food_entries.save_food_entries)
+update_food_entry = writer(food_entries.update_food_entry)
+update_food_entries = writer(food_entries.update_food_entries)
+replace_estimated_entries = writer(food_entries.replace_estimated_entries)
+delete_food_entries = writer(food_entries.delete_food_entries)
+get_food_entries_for_day = reader(food_entries.get_food_entries_for_day)
+get_food_entry_by_id = reader(food_entries.get_food_entry_by_id)
+get_food_entries_by_ids = reader(food_entries.get_food_entries_by_ids)
+count_food_entries_for_day = reader(food_entries.count_food_entries_for_day)
+get_day_totals = reader(food_entries.get_day_totals)
+get_prompt_version_stats = reader(food_entries.get_prompt_version_stats)
+
+# Прием пищи целиком
+log_meal = writer(meals.log_meal)
+
+# Кэш анализа текста
+get_cached_analysis = reader(analysis_cache.get_cached_analysis)
+save_cached_analysis = writer(analysis_cache.save_cached_analysis)
+prune_analysis_cache = writer(analysis_cache.prune_analysis_cache)
+
+# Словарь блюд
+find_dishes = reader(dish_dictionary.find_dishes)
+get_dish_dictionary_size = reader(dish_dictionary.get_dish_dictionary_size)
+
+
+def shutdown() -> None:
+    """Дожидается завершения запросов и закрывает подключения (при остановке бота)"""
+    _writer.shutdown(wait=True)
+    _readers.shutdown(wait=True)
+    close_pool()
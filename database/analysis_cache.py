@@ -0,0 +1,90 @@
+"""
+Хранилище кэша анализа текста (таблица analysis_cache).
+
+Ключ - нормализованный текст сообщения вместе с версией промпта
+(см. ai.cache), значение - JSON со списком блюд. Срок жизни и размер
+таблицы ограничиваются prune_analysis_cache().
+"""
+
+import sqlite3
+import time
+from typing import Optional
+from .connection import get_connection
+
+
+def _create_analysis_cache_schema(cursor: sqlite3.Cursor) -> None:
+    """Создает таблицу кэша анализа и индекс для вытеснения старых записей"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            key TEXT PRIMARY KEY,
+            prompt_version TEXT,
+            normalized_text TEXT NOT NULL,
+            dishes TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache(created_at)')
+
+
+def get_cached_analysis(key: str, max_age: int) -> Optional[str]:
+    """
+    Возвращает JSON блюд из кэша, если запись не старше max_age секунд.
+
+    Returns:
+        JSON-строка со списком блюд или None (нет записи, устарела или ошибка)
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT dishes FROM analysis_cache
+                WHERE key = ? AND created_at >= ?
+            ''', (key, int(time.time()) - max_age))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при чтении кэша анализа: {e}")
+        return None
+
+
+def save_cached_analysis(key: str, prompt_version: Optional[str], normalized_text: str, dishes_json: str) -> bool:
+    """Сохраняет (или заменяет) результат анализа в кэше"""
+    try:
+        with get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO analysis_cache
+                (key, prompt_version, normalized_text, dishes, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (key, prompt_version, normalized_text, dishes_json, int(time.time())))
+            conn.commit()
+            return True
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при сохранении кэша анализа: {e}")
+        return False
+
+
+def prune_analysis_cache(max_age: int, max_rows: int) -> int:
+    """
+    Удаляет устаревшие записи и самые старые записи сверх max_rows.
+
+    Returns:
+        Количество удаленных записей или -1 в случае ошибки
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM analysis_cache WHERE created_at < ?', (int(time.time()) - max_age,))
+            deleted = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM analysis_cache WHERE key IN (
+                    SELECT key FROM analysis_cache
+                    ORDER BY created_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (max_rows,))
+            deleted += cursor.rowcount
+            conn.commit()
+            return deleted
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при очистке кэша анализа: {e}")
+        return -1
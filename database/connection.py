@@ -1,106 +1,156 @@
 """
 Управление подключением к базе данных.
+
+Подключения долгоживущие: они создаются один раз, настраиваются PRAGMA
+(WAL, synchronous=NORMAL и т.д.) и переиспользуются через небольшой пул.
 """
 
+import os
+import queue
 import sqlite3
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 
 # Путь к файлу базы данных
-DB_PATH = "kbju_bot.db"
+DB_PATH = os.getenv('KBJU_DB_PATH', "kbju_bot.db")
+
+# Максимальное количество одновременно открытых подключений
+POOL_SIZE = 4
+
+# Сколько ждать свободное подключение из пула (секунд)
+POOL_TIMEOUT = 30
 
+# PRAGMA, применяемые к каждому новому подключению
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),         # мс ожидания блокировки вместо мгновенной ошибки
+    ('cache_size', -16000),         # ~16 МБ кэша страниц на подключение
+    ('mmap_size', 64 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+)
 
-def get_connection() -> sqlite3.Connection:
+
+class ConnectionPool:
     """
-    Получает подключение к базе данных.
-    
-    Returns:
-        Подключение к SQLite базе данных
+    Пул долгоживущих подключений к SQLite.
+
+    Подключения создаются лениво (не больше pool_size) и выдаются
+    через контекстный менеджер connection().
     """
-    return sqlite3.connect(DB_PATH)
 
+    def __init__(self, db_path: str, pool_size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
 
-def init_database():
-    """Инициализация базы данных: создание таблиц"""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Таблица пользователей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                timezone TEXT DEFAULT 'Europe/Moscow',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Миграция: добавляем поле timezone если его нет
+    def _create_connection(self) -> sqlite3.Connection:
+        """Открывает новое подключение и применяет PRAGMA"""
+        conn = sqlite3.connect(self.db_path, timeout=POOL_TIMEOUT, check_same_thread=False)
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
         try:
-            cursor.execute('ALTER TABLE users ADD COLUMN timezone TEXT DEFAULT "Europe/Moscow"')
-        except sqlite3.OperationalError:
-            # Поле уже существует, игнорируем ошибку
+            return self._idle.get_nowait()
+        except queue.Empty:
             pass
-        
-        # Обновляем существующих пользователей без часового пояса на Москву
-        cursor.execute('''
-            UPDATE users SET timezone = 'Europe/Moscow' 
-            WHERE timezone IS NULL OR timezone = 'UTC'
-        ''')
-        
-        # Таблица дней
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS days (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                day_number INTEGER DEFAULT 1,
-                is_current BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, day_number)
-            )
-        ''')
-        
-        # Таблица записей о еде
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS food_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                day_id INTEGER,
-                dish_name TEXT NOT NULL,
-                calories INTEGER DEFAULT 400,
-                protein INTEGER DEFAULT 10,
-                fat INTEGER DEFAULT 10,
-                carbs INTEGER DEFAULT 10,
-                grams INTEGER DEFAULT 100,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (day_id) REFERENCES days (id)
-            )
-        ''')
-        
-        # Миграция: добавляем поле grams если его нет
+
+        with self._lock:
+            if len(self._all) < self.pool_size:
+                conn = self._create_connection()
+                self._all.append(conn)
+                return conn
+
         try:
-            cursor.execute('ALTER TABLE food_entries ADD COLUMN grams INTEGER DEFAULT 100')
-        except sqlite3.OperationalError:
-            # Поле уже существует, игнорируем ошибку
-            pass
-        
-        # Обновляем существующие записи без граммов на значение по умолчанию
-        cursor.execute('''
-            UPDATE food_entries SET grams = 100 
-            WHERE grams IS NULL
-        ''')
-        
-        # Индексы для быстрого поиска
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_day ON food_entries(user_id, day_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_day ON food_entries(day_id)')
-        
-        conn.commit()
-        print(f"✅ База данных инициализирована: {DB_PATH}")
-        
+            return self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Нет свободных подключений к базе данных")
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        # Незавершенная транзакция не должна достаться следующему владельцу
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Выдает подключение из пула и возвращает его обратно после использования"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """Закрывает все подключения пула"""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Возвращает пул подключений процесса (создается при первом обращении)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def close_pool() -> None:
+    """Закрывает все подключения (при остановке бота)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_connection():
+    """
+    Получает подключение к базе данных из пула.
+
+    Использование:
+        with get_connection() as conn:
+            ...
+
+    Returns:
+        Контекстный менеджер, выдающий подключение к SQLite базе данных
+    """
+    return get_pool().connection()
+
+
+def init_database():
+    """
+    Инициализация базы данных: применяет недостающие миграции схемы.
+
+    Вызывается явно при запуске бота (не при импорте пакета).
+    """
+    from .migrations import migrate, get_schema_version
+
+    try:
+        with get_connection() as conn:
+            migrate(conn)
+            print(f"✅ База данных инициализирована: {get_pool().db_path} (версия схемы {get_schema_version(conn)})")
+
     except sqlite3.Error as e:
         print(f"❌ Ошибка при создании базы данных: {e}")
-    finally:
-        if conn:
-            conn.close()
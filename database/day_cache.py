@@ -0,0 +1,108 @@
+"""
+Кэш текущего дня пользователей в памяти процесса.
+
+Текущий день меняется раз в сутки, а читается на каждом сообщении.
+Кэш хранит (day_id, day_number, rollover_at, timezone) для недавно активных
+пользователей и обновляется при каждой записи, которая меняет текущий день
+(write-through): автоматический переход, /nextday. Смена часового пояса
+сбрасывает запись пользователя.
+
+Запись считается действительной, пока не наступил rollover_at, поэтому
+автоматический переход в 4:00 не требует отдельной инвалидации.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+# Максимальное количество пользователей в кэше
+DAY_CACHE_SIZE = 10000
+
+
+class CachedDay(NamedTuple):
+    """Текущий день пользователя"""
+    day_id: int
+    day_number: int
+    rollover_at: Optional[int]
+    timezone: str
+
+
+class DayCache:
+    """Ограниченный LRU-кэш текущего дня пользователей с счетчиками попаданий"""
+
+    def __init__(self, max_size: int = DAY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, CachedDay]" = OrderedDict()
+        # Кэш используется из потоков database.aio
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Часовой пояс читается отдельно от текущего дня - свои счетчики
+        self.timezone_hits = 0
+        self.timezone_misses = 0
+
+    def get(self, user_id: int) -> Optional[CachedDay]:
+        """Возвращает действительный (еще не истекший) день пользователя или None"""
+        with self._lock:
+            day = self._entries.get(user_id)
+            if day is not None and (day.rollover_at is None or time.time() < day.rollover_at):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return day
+            self.misses += 1
+            return None
+
+    def get_timezone(self, user_id: int) -> Optional[str]:
+        """Возвращает часовой пояс пользователя из кэша (даже если день уже истек)"""
+        with self._lock:
+            day = self._entries.get(user_id)
+            if day is not None:
+                self.timezone_hits += 1
+                return day.timezone
+            self.timezone_misses += 1
+            return None
+
+    def put(self, user_id: int, day: CachedDay) -> None:
+        """Сохраняет текущий день пользователя"""
+        with self._lock:
+            self._entries[user_id] = day
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Удаляет запись пользователя из кэша"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Очищает кэш и счетчики"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.timezone_hits = 0
+            self.timezone_misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кэша (hit_rate - только по текущему дню)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'timezone_hits': self.timezone_hits,
+                'timezone_misses': self.timezone_misses,
+            }
+
+
+day_cache = DayCache()
+
+
+def get_day_cache_stats() -> Dict[str, Any]:
+    """Счетчики попаданий/промахов кэша текущего дня"""
+    return day_cache.stats()
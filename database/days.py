@@ -1,196 +1,257 @@
 """
 Работа с днями в базе данных.
+
+Момент автоматического перехода на следующий день (4:00 по часовому поясу
+пользователя) вычисляется один раз при создании дня и хранится в
+days.rollover_at_utc (unix-время). Проверка "не пора ли начать новый день"
+сводится к сравнению этого числа с текущим временем.
 """
 
 import sqlite3
+import time
 from datetime import datetime, timedelta
 import pytz
 from typing import Optional, Tuple
 from .connection import get_connection
-from .users import get_user_timezone
+from .users import get_user_timezone, _get_user_timezone
+from .day_cache import day_cache, CachedDay
 
 # Время автоматического перехода на следующий день (4:00 утра)
 AUTO_NEXT_DAY_HOUR = 4
 
 
+def _get_tz(timezone_str: str):
+    """Возвращает объект часового пояса, для неизвестного пояса - UTC"""
+    try:
+        return pytz.timezone(timezone_str)
+    except pytz.exceptions.UnknownTimeZoneError:
+        return pytz.UTC
+
+
+def _parse_created_at(day_created_at) -> datetime:
+    """Парсит days.created_at (хранится в UTC) в aware datetime"""
+    if isinstance(day_created_at, str):
+        # Пробуем разные форматы
+        try:
+            day_created_utc = datetime.fromisoformat(day_created_at.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                day_created_utc = datetime.strptime(day_created_at, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                day_created_utc = datetime.strptime(day_created_at, '%Y-%m-%d %H:%M:%S.%f')
+    else:
+        day_created_utc = datetime.fromtimestamp(day_created_at, pytz.UTC)
+
+    if day_created_utc.tzinfo is None:
+        day_created_utc = pytz.UTC.localize(day_created_utc)
+    return day_created_utc
+
+
+def compute_rollover_at(timezone_str: str, created_at: Optional[float] = None) -> int:
+    """
+    Вычисляет момент перехода на следующий день для дня, созданного в created_at.
+
+    Args:
+        timezone_str: Часовой пояс пользователя
+        created_at: Unix-время создания дня (по умолчанию - сейчас)
+
+    Returns:
+        Unix-время ближайших 4:00 по часовому поясу пользователя после начала дня создания
+    """
+    user_tz = _get_tz(timezone_str)
+    if created_at is None:
+        created_at = time.time()
+    created_user = datetime.fromtimestamp(created_at, user_tz)
+
+    # "Начало дня" - 4:00 того же дня, а если день создан до 4:00 - 4:00 предыдущего
+    day_date = created_user.date()
+    if created_user.hour < AUTO_NEXT_DAY_HOUR:
+        day_date -= timedelta(days=1)
+
+    # Следующий день начинается в 4:00 на следующую дату
+    next_start = datetime(day_date.year, day_date.month, day_date.day, AUTO_NEXT_DAY_HOUR) + timedelta(days=1)
+    return int(user_tz.localize(next_start).timestamp())
+
+
+def _create_rollover_schema(cursor: sqlite3.Cursor) -> bool:
+    """
+    Добавляет колонку days.rollover_at_utc и частичный индекс текущих дней.
+
+    Returns:
+        True если колонка была добавлена только что (нужно заполнить существующие дни)
+    """
+    cursor.execute('PRAGMA table_info(days)')
+    existing = {row[1] for row in cursor.fetchall()}
+
+    added = False
+    if 'rollover_at_utc' not in existing:
+        cursor.execute('ALTER TABLE days ADD COLUMN rollover_at_utc INTEGER')
+        added = True
+
+    # Каждый запрос к дням ищет текущий день пользователя
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_days_current ON days(user_id) WHERE is_current = 1')
+    return added
+
+
+def _backfill_rollover(cursor: sqlite3.Cursor) -> int:
+    """Заполняет rollover_at_utc для текущих дней, где его еще нет"""
+    cursor.execute('''
+        SELECT d.id, d.created_at, u.timezone
+        FROM days d
+        LEFT JOIN users u ON u.user_id = d.user_id
+        WHERE d.is_current = 1 AND d.rollover_at_utc IS NULL
+    ''')
+    updates = [
+        (compute_rollover_at(timezone or 'Europe/Moscow', _parse_created_at(created_at).timestamp()), day_id)
+        for day_id, created_at, timezone in cursor.fetchall()
+    ]
+    cursor.executemany('UPDATE days SET rollover_at_utc = ? WHERE id = ?', updates)
+    return len(updates)
+
+
+def _insert_day(cursor: sqlite3.Cursor, user_id: int, day_number: int) -> CachedDay:
+    """Создает текущий день пользователя с вычисленным моментом перехода"""
+    timezone_str = _get_user_timezone(cursor, user_id)
+    rollover_at = compute_rollover_at(timezone_str)
+    cursor.execute('''
+        INSERT INTO days (user_id, day_number, is_current, rollover_at_utc)
+        VALUES (?, ?, 1, ?)
+    ''', (user_id, day_number, rollover_at))
+    return CachedDay(cursor.lastrowid, day_number, rollover_at, timezone_str)
+
+
 def _create_first_day(cursor: sqlite3.Cursor, user_id: int) -> None:
     """Вспомогательная функция для создания первого дня пользователя"""
+    _insert_day(cursor, user_id, 1)
+
+
+def _update_current_day_rollover(cursor: sqlite3.Cursor, user_id: int, timezone_str: str) -> None:
+    """Пересчитывает момент перехода текущего дня после смены часового пояса"""
     cursor.execute('''
-        INSERT INTO days (user_id, day_number, is_current)
-        VALUES (?, 1, 1)
+        SELECT id, created_at FROM days
+        WHERE user_id = ? AND is_current = 1
     ''', (user_id,))
+    day = cursor.fetchone()
+    if day:
+        day_id, day_created_at = day
+        rollover_at = compute_rollover_at(timezone_str, _parse_created_at(day_created_at).timestamp())
+        cursor.execute('UPDATE days SET rollover_at_utc = ? WHERE id = ?', (rollover_at, day_id))
 
 
 def should_create_new_day(user_id: int, day_created_at) -> bool:
     """Проверяет, нужно ли создавать новый день на основе времени 4:00 в часовом поясе пользователя"""
     try:
-        timezone_str = get_user_timezone(user_id)
-        
-        # Получаем часовой пояс пользователя
-        try:
-            user_tz = pytz.timezone(timezone_str)
-        except pytz.exceptions.UnknownTimeZoneError:
-            # Если часовой пояс неизвестен, используем UTC
-            user_tz = pytz.UTC
-        
-        # Текущее время в часовом поясе пользователя
-        now_user = datetime.now(user_tz)
-        
-        # Время создания дня в часовом поясе пользователя
-        # day_created_at хранится в UTC, конвертируем в часовой пояс пользователя
-        utc_tz = pytz.UTC
-        # Парсим timestamp из базы данных
-        if isinstance(day_created_at, str):
-            # Пробуем разные форматы
-            try:
-                day_created_utc = datetime.fromisoformat(day_created_at.replace('Z', '+00:00'))
-            except ValueError:
-                try:
-                    day_created_utc = datetime.strptime(day_created_at, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    day_created_utc = datetime.strptime(day_created_at, '%Y-%m-%d %H:%M:%S.%f')
-        else:
-            day_created_utc = datetime.fromtimestamp(day_created_at)
-        
-        if day_created_utc.tzinfo is None:
-            day_created_utc = utc_tz.localize(day_created_utc)
-        day_created_user = day_created_utc.astimezone(user_tz)
-        
-        # Вычисляем дату "начала дня" для дня создания (4:00 утра того дня)
-        day_start_created = day_created_user.replace(hour=AUTO_NEXT_DAY_HOUR, minute=0, second=0, microsecond=0)
-        if day_created_user.hour < AUTO_NEXT_DAY_HOUR:
-            # День был создан до 4:00, значит начало дня - это 4:00 предыдущего дня
-            day_start_created = day_start_created - timedelta(days=1)
-        
-        # Вычисляем дату "начала дня" для текущего момента (4:00 утра сегодня)
-        day_start_now = now_user.replace(hour=AUTO_NEXT_DAY_HOUR, minute=0, second=0, microsecond=0)
-        if now_user.hour < AUTO_NEXT_DAY_HOUR:
-            # Сейчас до 4:00, значит начало дня - это 4:00 вчера
-            day_start_now = day_start_now - timedelta(days=1)
-        
-        # Если начало текущего дня > начала дня создания, значит нужно создать новый день
-        return day_start_now > day_start_created
-        
+        created_at = _parse_created_at(day_created_at).timestamp()
+        return time.time() >= compute_rollover_at(get_user_timezone(user_id), created_at)
     except Exception as e:
         print(f"❌ Ошибка при проверке необходимости нового дня: {e}")
         return False
 
 
+def _resolve_current_day(cursor: sqlite3.Cursor, user_id: int) -> CachedDay:
+    """
+    Находит текущий день пользователя в рамках открытой транзакции.
+
+    Создает первый день, если дней нет, и переводит пользователя на новый день,
+    если прошло 4:00 в его часовом поясе. Результат нужно положить в day_cache
+    после коммита транзакции.
+    """
+    cursor.execute('''
+        SELECT d.id, d.day_number, d.rollover_at_utc, u.timezone
+        FROM days d
+        LEFT JOIN users u ON u.user_id = d.user_id
+        WHERE d.user_id = ? AND d.is_current = 1
+    ''', (user_id,))
+
+    day = cursor.fetchone()
+
+    if not day:
+        # Дня нет, создаем первый
+        return _insert_day(cursor, user_id, 1)
+
+    day_id, day_number, rollover_at, timezone_str = day
+
+    # Проверяем, нужно ли автоматически создать новый день
+    if rollover_at is not None and time.time() >= rollover_at:
+        # Создаем новый день автоматически
+        cursor.execute('''
+            UPDATE days SET is_current = 0
+            WHERE id = ?
+        ''', (day_id,))
+
+        new_day = _insert_day(cursor, user_id, day_number + 1)
+        print(f"🌅 Автоматически создан новый день {new_day.day_number} для пользователя {user_id}")
+        return new_day
+
+    return CachedDay(day_id, day_number, rollover_at, timezone_str or 'Europe/Moscow')
+
+
 def get_or_create_current_day(user_id: int) -> Tuple[Optional[int], Optional[int]]:
     """Получает текущий день пользователя, создает если нет или если прошло 4:00 в часовом поясе пользователя"""
+    # Горячий путь: день из кэша, пока не наступил момент перехода
+    cached = day_cache.get(user_id)
+    if cached:
+        return cached.day_id, cached.day_number
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, day_number, created_at FROM days 
-            WHERE user_id = ? AND is_current = 1
-        ''', (user_id,))
-        
-        day = cursor.fetchone()
-        
-        if not day:
-            # Дня нет, создаем первый
-            cursor.execute('''
-                INSERT INTO days (user_id, day_number, is_current)
-                VALUES (?, 1, 1)
-            ''', (user_id,))
-            day_id = cursor.lastrowid
-            day_number = 1
-        else:
-            day_id, day_number, day_created_at = day
-            
-            # Проверяем, нужно ли автоматически создать новый день
-            if should_create_new_day(user_id, day_created_at):
-                # Создаем новый день автоматически
-                cursor.execute('''
-                    UPDATE days SET is_current = 0 
-                    WHERE id = ?
-                ''', (day_id,))
-                
-                new_day_number = day_number + 1
-                cursor.execute('''
-                    INSERT INTO days (user_id, day_number, is_current)
-                    VALUES (?, ?, 1)
-                ''', (user_id, new_day_number))
-                
-                day_id = cursor.lastrowid
-                day_number = new_day_number
-                print(f"🌅 Автоматически создан новый день {day_number} для пользователя {user_id}")
-        
-        conn.commit()
-        return day_id, day_number
+        with get_connection() as conn:
+            day = _resolve_current_day(conn.cursor(), user_id)
+            conn.commit()
+            day_cache.put(user_id, day)
+            return day.day_id, day.day_number
     except sqlite3.Error as e:
         print(f"❌ Ошибка при получении текущего дня: {e}")
         return None, None
-    finally:
-        if conn:
-            conn.close()
 
 
 def create_next_day(user_id: int) -> Tuple[Optional[int], Optional[int]]:
     """Создает следующий день для пользователя"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, day_number FROM days 
-            WHERE user_id = ? AND is_current = 1
-        ''', (user_id,))
-        
-        current_day = cursor.fetchone()
-        
-        if not current_day:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
             cursor.execute('''
-                INSERT INTO days (user_id, day_number, is_current)
-                VALUES (?, 1, 1)
+                SELECT id, day_number FROM days
+                WHERE user_id = ? AND is_current = 1
             ''', (user_id,))
-            day_id = cursor.lastrowid
-            day_number = 1
-        else:
-            current_day_id, current_day_number = current_day
-            
-            cursor.execute('''
-                UPDATE days SET is_current = 0 
-                WHERE id = ?
-            ''', (current_day_id,))
-            
-            new_day_number = current_day_number + 1
-            cursor.execute('''
-                INSERT INTO days (user_id, day_number, is_current)
-                VALUES (?, ?, 1)
-            ''', (user_id, new_day_number))
-            
-            day_id = cursor.lastrowid
-            day_number = new_day_number
-        
-        conn.commit()
-        return day_id, day_number
+
+            current_day = cursor.fetchone()
+
+            if not current_day:
+                day_number = 1
+            else:
+                current_day_id, current_day_number = current_day
+
+                cursor.execute('''
+                    UPDATE days SET is_current = 0
+                    WHERE id = ?
+                ''', (current_day_id,))
+
+                day_number = current_day_number + 1
+
+            day = _insert_day(cursor, user_id, day_number)
+
+            conn.commit()
+            day_cache.put(user_id, day)
+            return day.day_id, day.day_number
     except sqlite3.Error as e:
         print(f"❌ Ошибка при создании следующего дня: {e}")
         return None, None
-    finally:
-        if conn:
-            conn.close()
 
 
 def is_day_current(user_id: int, day_id: int) -> bool:
     """Проверяет, является ли день текущим для пользователя"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT is_current FROM days 
-            WHERE id = ? AND user_id = ?
-        ''', (day_id, user_id))
-        
-        result = cursor.fetchone()
-        return result and result[0] == 1
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT is_current FROM days
+                WHERE id = ? AND user_id = ?
+            ''', (day_id, user_id))
+
+            result = cursor.fetchone()
+            return result and result[0] == 1
     except sqlite3.Error as e:
         print(f"❌ Ошибка при проверке текущего дня: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
@@ -0,0 +1,264 @@
+"""
+Локальный словарь блюд (таблица dish_dictionary).
+
+Для каждого блюда хранятся суммы граммов и КБЖУ по всем ответам AI,
+которые пользователи не редактировали; КБЖУ на 100 г = сумма / граммы.
+- Блюдо из ответа AI добавляется в словарь в транзакции записи приема
+  пищи, правка такой записи вычитает ее вклад перед обновлением.
+- Поиск: точное совпадение по нормализованному названию, затем нечеткий
+  поиск по триграммному индексу FTS5 (dish_dictionary_fts) с проверкой
+  похожести в Python.
+"""
+
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from .connection import get_connection
+
+# Триграммный токенизатор FTS5 появился в SQLite 3.34
+_SUPPORTS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# Кандидатов из FTS5 на одно название
+_FTS_CANDIDATES = 10
+
+_PUNCTUATION = re.compile(r'[^\w\s%]')
+_SPACES = re.compile(r'\s+')
+
+
+def dish_key(name: str) -> str:
+    """Нормализованное название блюда: регистр, ё/е, без пунктуации и лишних пробелов"""
+    name = name.lower().replace('ё', 'е')
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', name)).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_similarity(a: str, b: str) -> float:
+    """Похожесть нормализованных названий: коэффициент Жаккара по триграммам"""
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+def _create_dish_dictionary_schema(cursor: sqlite3.Cursor) -> None:
+    """Создает таблицу словаря и триграммный индекс FTS5 (если SQLite его поддерживает)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dish_dictionary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            samples INTEGER NOT NULL DEFAULT 0,
+            grams REAL NOT NULL DEFAULT 0,
+            calories REAL NOT NULL DEFAULT 0,
+            protein REAL NOT NULL DEFAULT 0,
+            fat REAL NOT NULL DEFAULT 0,
+            carbs REAL NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+    if not _SUPPORTS_TRIGRAM:
+        return
+    # Внешний контент: индекс хранит только триграммы, названия - в dish_dictionary.
+    # Название строки не меняется, поэтому достаточно триггера на вставку
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS dish_dictionary_fts USING fts5(
+            key, content='dish_dictionary', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_dish_dictionary_fts_insert
+        AFTER INSERT ON dish_dictionary
+        BEGIN
+            INSERT INTO dish_dictionary_fts(rowid, key) VALUES (NEW.id, NEW.key);
+        END
+    ''')
+
+
+def _dish_rows(dishes: Iterable[Dict[str, Any]]) -> List[tuple]:
+    """(key, name, grams, calories, protein, fat, carbs) для блюд с названием и весом"""
+    rows = []
+    for dish in dishes:
+        key = dish_key(dish['name'])
+        if key and dish['grams'] > 0:
+            rows.append((
+                key, dish['name'].strip(), dish['grams'],
+                dish['calories'], dish['protein'], dish['fat'], dish['carbs']
+            ))
+    return rows
+
+
+def _add_samples(cursor: sqlite3.Cursor, dishes: Iterable[Dict[str, Any]]) -> int:
+    """Добавляет блюда к суммам словаря"""
+    now = int(time.time())
+    rows = [row + (now,) for row in _dish_rows(dishes)]
+    cursor.executemany('''
+        INSERT INTO dish_dictionary (key, name, samples, grams, calories, protein, fat, carbs, updated_at)
+        VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            samples = samples + 1,
+            grams = grams + excluded.grams,
+            calories = calories + excluded.calories,
+            protein = protein + excluded.protein,
+            fat = fat + excluded.fat,
+            carbs = carbs + excluded.carbs,
+            updated_at = excluded.updated_at
+    ''', rows)
+    return len(rows)
+
+
+def _remove_samples(cursor: sqlite3.Cursor, dishes: Iterable[Dict[str, Any]]) -> int:
+    """Вычитает блюда из сумм словаря"""
+    now = int(time.time())
+    rows = [
+        (grams, calories, protein, fat, carbs, now, key)
+        for key, _, grams, calories, protein, fat, carbs in _dish_rows(dishes)
+    ]
+    cursor.executemany('''
+        UPDATE dish_dictionary SET
+            samples = MAX(samples - 1, 0),
+            grams = MAX(grams - ?, 0),
+            calories = MAX(calories - ?, 0),
+            protein = MAX(protein - ?, 0),
+            fat = MAX(fat - ?, 0),
+            carbs = MAX(carbs - ?, 0),
+            updated_at = ?
+        WHERE key = ?
+    ''', rows)
+    return len(rows)
+
+
+def _rows_to_dishes(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """Строки (dish_name, calories, protein, fat, carbs, grams) -> блюда"""
+    return [
+        {'name': row[0], 'calories': row[1], 'protein': row[2], 'fat': row[3], 'carbs': row[4], 'grams': row[5]}
+        for row in rows
+    ]
+
+
+def _learn_dishes(cursor: sqlite3.Cursor, dishes: List[Dict[str, Any]]) -> int:
+    """Добавляет ответы AI в словарь в рамках открытой транзакции"""
+    return _add_samples(cursor, (dish for dish in dishes if dish.get('source') == 'ai'))
+
+
+def _forget_entries(cursor: sqlite3.Cursor, user_id: int, entry_ids: List[int]) -> int:
+    """
+    Вычитает из словаря вклад записей, полученных от AI (перед их правкой),
+    в рамках открытой транзакции
+    """
+    if not entry_ids:
+        return 0
+    placeholders = ','.join('?' * len(entry_ids))
+    cursor.execute(f'''
+        SELECT dish_name, calories, protein, fat, carbs, grams
+        FROM food_entries
+        WHERE id IN ({placeholders}) AND user_id = ? AND source = 'ai'
+    ''', (*entry_ids, user_id))
+    return _remove_samples(cursor, _rows_to_dishes(cursor.fetchall()))
+
+
+def _rebuild_dish_dictionary(cursor: sqlite3.Cursor) -> int:
+    """Заполняет словарь заново по записям о еде с source = 'ai'"""
+    cursor.execute('UPDATE dish_dictionary SET samples = 0, grams = 0, calories = 0, protein = 0, fat = 0, carbs = 0')
+    cursor.execute('''
+        SELECT dish_name, calories, protein, fat, carbs, grams
+        FROM food_entries WHERE source = 'ai'
+    ''')
+    return _add_samples(cursor, _rows_to_dishes(cursor.fetchall()))
+
+
+def _row_to_entry(row: tuple) -> Dict[str, Any]:
+    """Строка (key, name, samples, grams, calories, protein, fat, carbs) -> КБЖУ на 100 г"""
+    key, name, samples, grams, calories, protein, fat, carbs = row
+    return {
+        'key': key,
+        'name': name,
+        'samples': samples,
+        'portion_grams': grams / samples,
+        'calories_100g': calories * 100 / grams,
+        'protein_100g': protein * 100 / grams,
+        'fat_100g': fat * 100 / grams,
+        'carbs_100g': carbs * 100 / grams,
+    }
+
+
+def _fts_query(key: str) -> Optional[str]:
+    """OR-запрос по основам слов (без окончаний, чтобы "курицей" нашло "курица")"""
+    stems = []
+    for word in key.split():
+        if len(word) < 3:
+            continue
+        stem = word[:-2] if len(word) > 5 else word
+        stems.append('"' + stem.replace('"', '') + '"')
+    return ' OR '.join(stems) or None
+
+
+def find_dishes(keys: List[str], min_samples: int, min_similarity: float) -> List[Optional[Dict[str, Any]]]:
+    """
+    Ищет блюда словаря для списка нормализованных названий одним подключением.
+
+    Args:
+        keys: Нормализованные названия (см. dish_key)
+        min_samples: Минимум ответов AI, на которых основана запись
+        min_similarity: Минимальная похожесть названий для нечеткого совпадения
+
+    Returns:
+        Для каждого названия - запись словаря (КБЖУ на 100 г, типичная порция,
+        similarity) или None; при ошибке - список из None
+    """
+    found: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+    if not keys:
+        return found
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            placeholders = ','.join('?' * len(keys))
+            cursor.execute(f'''
+                SELECT key, name, samples, grams, calories, protein, fat, carbs
+                FROM dish_dictionary
+                WHERE key IN ({placeholders}) AND samples >= ? AND grams > 0
+            ''', (*keys, min_samples))
+            exact = {row[0]: row for row in cursor.fetchall()}
+
+            for i, key in enumerate(keys):
+                if key in exact:
+                    found[i] = {**_row_to_entry(exact[key]), 'similarity': 1.0}
+                    continue
+
+                query = _fts_query(key) if _SUPPORTS_TRIGRAM else None
+                if query is None:
+                    continue
+                cursor.execute('''
+                    SELECT d.key, d.name, d.samples, d.grams, d.calories, d.protein, d.fat, d.carbs
+                    FROM dish_dictionary_fts f
+                    JOIN dish_dictionary d ON d.id = f.rowid
+                    WHERE dish_dictionary_fts MATCH ? AND d.samples >= ? AND d.grams > 0
+                    ORDER BY f.rank
+                    LIMIT ?
+                ''', (query, min_samples, _FTS_CANDIDATES))
+                best, best_similarity = None, min_similarity
+                for row in cursor.fetchall():
+                    similarity = name_similarity(key, row[0])
+                    if similarity >= best_similarity:
+                        best, best_similarity = row, similarity
+                if best is not None:
+                    found[i] = {**_row_to_entry(best), 'similarity': best_similarity}
+            return found
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при поиске в словаре блюд: {e}")
+        return [None] * len(keys)
+
+
+def get_dish_dictionary_size(min_samples: int = 1) -> int:
+    """Количество блюд в словаре, основанных хотя бы на min_samples ответах AI"""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM dish_dictionary WHERE samples >= ?', (min_samples,))
+            return cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при чтении словаря блюд: {e}")
+        return 0
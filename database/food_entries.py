@@ -5,156 +5,216 @@
 import sqlite3
 from typing import List, Dict, Any, Optional
 from .connection import get_connection
+from .dish_dictionary import _forget_entries, _learn_dishes
 
 
-def save_food_entries(user_id: int, day_id: int, dishes: List[Dict[str, Any]]) -> List[int]:
-    """Сохраняет несколько записей о еде за один раз"""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
+# Multi-row INSERT ... RETURNING поддерживается с SQLite 3.35
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Строк в одном INSERT: 10 параметров на строку, лимит старых SQLite - 999 параметров
+_INSERT_CHUNK_SIZE = 90
+
+
+def _insert_food_entries(cursor: sqlite3.Cursor, user_id: int, day_id: int, dishes: List[Dict[str, Any]]) -> List[int]:
+    """Вставляет записи о еде в рамках открытой транзакции и возвращает их ID (в порядке dishes)"""
+    params = [
+        (
+            user_id, day_id, 
+            dish['name'], dish['calories'], 
+            dish['protein'], dish['fat'], dish['carbs'],
+            dish['grams'], dish.get('prompt_version'), dish.get('source')
+        )
+        for dish in dishes
+    ]
+
+    # Для одного блюда обычный INSERT + lastrowid дешевле RETURNING
+    if not _SUPPORTS_RETURNING or len(params) == 1:
         saved_ids = []
-        for dish in dishes:
+        for row in params:
             cursor.execute('''
                 INSERT INTO food_entries 
-                (user_id, day_id, dish_name, calories, protein, fat, carbs, grams)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id, day_id, 
-                dish['name'], dish['calories'], 
-                dish['protein'], dish['fat'], dish['carbs'],
-                dish['grams']
-            ))
+                (user_id, day_id, dish_name, calories, protein, fat, carbs, grams, prompt_version, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', row)
             saved_ids.append(cursor.lastrowid)
-        
-        conn.commit()
         return saved_ids
+
+    saved_ids = []
+    for start in range(0, len(params), _INSERT_CHUNK_SIZE):
+        chunk = params[start:start + _INSERT_CHUNK_SIZE]
+        values = ','.join(['(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'] * len(chunk))
+        cursor.execute(f'''
+            INSERT INTO food_entries 
+            (user_id, day_id, dish_name, calories, protein, fat, carbs, grams, prompt_version, source)
+            VALUES {values}
+            RETURNING id
+        ''', [value for row in chunk for value in row])
+        # Порядок строк RETURNING не гарантирован, но ID одного INSERT
+        # выдаются по возрастанию в порядке VALUES
+        saved_ids.extend(sorted(row[0] for row in cursor.fetchall()))
+    return saved_ids
+
+
+def _count_food_entries(cursor: sqlite3.Cursor, user_id: int, day_id: int) -> int:
+    """Подсчет записей о еде за день в рамках открытой транзакции"""
+    # Счетчик поддерживается триггерами на food_entries (см. database.totals)
+    cursor.execute('''
+        SELECT entries_count FROM days 
+        WHERE id = ? AND user_id = ?
+    ''', (day_id, user_id))
+    result = cursor.fetchone()
+    return result[0] if result else 0
+
+
+def save_food_entries(user_id: int, day_id: int, dishes: List[Dict[str, Any]]) -> List[int]:
+    """Сохраняет несколько записей о еде за один раз"""
+    try:
+        with get_connection() as conn:
+            saved_ids = _insert_food_entries(conn.cursor(), user_id, day_id, dishes)
+            conn.commit()
+            return saved_ids
     except sqlite3.Error as e:
         print(f"❌ Ошибка при сохранении записей о еде: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
 def count_food_entries_for_day(user_id: int, day_id: int) -> int:
     """Подсчет количества записей о еде за день"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM food_entries 
-            WHERE user_id = ? AND day_id = ?
-        ''', (user_id, day_id))
-        
-        count = cursor.fetchone()[0]
-        return count
+        with get_connection() as conn:
+            return _count_food_entries(conn.cursor(), user_id, day_id)
     except sqlite3.Error as e:
         print(f"❌ Ошибка при подсчете записей о еде: {e}")
         return 0
-    finally:
-        if conn:
-            conn.close()
 
 
 def get_food_entries_for_day(user_id: int, day_id: int) -> List[tuple]:
     """Получение записей о еде за день"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, dish_name, calories, protein, fat, carbs, grams
-            FROM food_entries 
-            WHERE user_id = ? AND day_id = ?
-            ORDER BY created_at
-        ''', (user_id, day_id))
-        
-        entries = cursor.fetchall()
-        return entries
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT id, dish_name, calories, protein, fat, carbs, grams
+                FROM food_entries 
+                WHERE user_id = ? AND day_id = ?
+                ORDER BY created_at
+            ''', (user_id, day_id))
+
+            entries = cursor.fetchall()
+            return entries
     except sqlite3.Error as e:
         print(f"❌ Ошибка при получении записей о еде: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+
+def _get_day_totals(cursor: sqlite3.Cursor, user_id: int, day_id: int) -> Dict[str, Any]:
+    """Читает итоги дня в рамках открытой транзакции"""
+    # Итоги поддерживаются триггерами на food_entries (см. database.totals),
+    # поэтому это чтение одной строки по первичному ключу, а не SUM() по записям
+    cursor.execute('''
+        SELECT total_calories, total_protein, total_fat, total_carbs, entries_count
+        FROM days 
+        WHERE id = ? AND user_id = ?
+    ''', (day_id, user_id))
+
+    result = cursor.fetchone()
+    if result and result[4]:
+        return {
+            'calories': round(result[0]),
+            'protein': round(result[1]),
+            'fat': round(result[2]),
+            'carbs': round(result[3]),
+            'count': result[4]
+        }
+    return {
+        'calories': 0,
+        'protein': 0,
+        'fat': 0,
+        'carbs': 0,
+        'count': 0
+    }
 
 
 def get_day_totals(user_id: int, day_id: int) -> Dict[str, Any]:
     """Получение суммарных КБЖУ за день"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                SUM(calories) as total_calories,
-                SUM(protein) as total_protein,
-                SUM(fat) as total_fat,
-                SUM(carbs) as total_carbs,
-                COUNT(*) as count
-            FROM food_entries 
-            WHERE user_id = ? AND day_id = ?
-        ''', (user_id, day_id))
-        
-        result = cursor.fetchone()
-        if result and result[0] is not None:
-            return {
-                'calories': round(result[0]),
-                'protein': round(result[1]),
-                'fat': round(result[2]),
-                'carbs': round(result[3]),
-                'count': result[4]
-            }
-        else:
-            return {
-                'calories': 0,
-                'protein': 0,
-                'fat': 0,
-                'carbs': 0,
-                'count': 0
-            }
+        with get_connection() as conn:
+            return _get_day_totals(conn.cursor(), user_id, day_id)
     except sqlite3.Error as e:
         print(f"❌ Ошибка при получении суммарных КБЖУ: {e}")
         return {}
-    finally:
-        if conn:
-            conn.close()
+
+
+def _entry_to_dict(entry: tuple) -> Dict[str, Any]:
+    """Преобразует строку food_entries (id, user_id, day_id, dish_name, ...) в словарь"""
+    return {
+        'id': entry[0],
+        'user_id': entry[1],
+        'day_id': entry[2],
+        'name': entry[3],
+        'calories': entry[4],
+        'protein': entry[5],
+        'fat': entry[6],
+        'carbs': entry[7],
+        'grams': entry[8]
+    }
 
 
 def get_food_entry_by_id(entry_id: int, user_id: int) -> Optional[Dict[str, Any]]:
     """Получение записи о еде по ID с проверкой пользователя"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, day_id, dish_name, calories, protein, fat, carbs, grams
-            FROM food_entries 
-            WHERE id = ? AND user_id = ?
-        ''', (entry_id, user_id))
-        
-        entry = cursor.fetchone()
-        if entry:
-            return {
-                'id': entry[0],
-                'user_id': entry[1],
-                'day_id': entry[2],
-                'name': entry[3],
-                'calories': entry[4],
-                'protein': entry[5],
-                'fat': entry[6],
-                'carbs': entry[7],
-                'grams': entry[8]
-            }
-        return None
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT id, user_id, day_id, dish_name, calories, protein, fat, carbs, grams
+                FROM food_entries 
+                WHERE id = ? AND user_id = ?
+            ''', (entry_id, user_id))
+
+            entry = cursor.fetchone()
+            if entry:
+                return _entry_to_dict(entry)
+            return None
     except sqlite3.Error as e:
         print(f"❌ Ошибка при получении записи о еде: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+
+def get_food_entries_by_ids(entry_ids: List[int], user_id: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Получение записей о еде по списку ID одним запросом с проверкой пользователя.
+
+    Args:
+        entry_ids: Список ID записей
+        user_id: ID пользователя-владельца
+
+    Returns:
+        Записи в порядке entry_ids или None, если хоть одна запись не найдена
+        или принадлежит другому пользователю
+    """
+    if not entry_ids:
+        return []
+
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            placeholders = ','.join('?' * len(entry_ids))
+            cursor.execute(f'''
+                SELECT id, user_id, day_id, dish_name, calories, protein, fat, carbs, grams
+                FROM food_entries 
+                WHERE id IN ({placeholders}) AND user_id = ?
+            ''', (*entry_ids, user_id))
+
+            entries = {entry[0]: _entry_to_dict(entry) for entry in cursor.fetchall()}
+            if any(entry_id not in entries for entry_id in entry_ids):
+                return None
+            return [entries[entry_id] for entry_id in entry_ids]
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при получении записей о еде: {e}")
+        return None
 
 
 def update_food_entry(
@@ -169,64 +229,221 @@ def update_food_entry(
 ) -> bool:
     """Обновление записи о еде"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE food_entries 
-            SET dish_name = ?, calories = ?, protein = ?, fat = ?, carbs = ?, grams = ?
-            WHERE id = ? AND user_id = ?
-        ''', (dish_name, calories, protein, fat, carbs, grams, entry_id, user_id))
-        
-        if cursor.rowcount == 0:
-            return False
-        
-        conn.commit()
-        return True
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                UPDATE food_entries 
+                SET dish_name = ?, calories = ?, protein = ?, fat = ?, carbs = ?, grams = ?
+                WHERE id = ? AND user_id = ?
+            ''', (dish_name, calories, protein, fat, carbs, grams, entry_id, user_id))
+
+            if cursor.rowcount == 0:
+                return False
+
+            conn.commit()
+            return True
     except sqlite3.Error as e:
         print(f"❌ Ошибка при обновлении записи о еде: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
+
+
+def update_food_entries(user_id: int, rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Обновляет несколько записей о еде (блюда одного приема пищи) одной транзакцией.
+
+    Обновление выполняется по принципу "все или ничего": если хотя бы одна
+    запись не найдена или принадлежит другому пользователю, изменения откатываются.
+
+    Args:
+        user_id: ID пользователя-владельца
+        rows: Список блюд с ключами id, name, calories, protein, fat, carbs, grams
+            (и необязательными prompt_version и source, по умолчанию 'edit')
+
+    Returns:
+        Словарь с day_id, day_number, start_index (сколько блюд в дне перед
+        первой обновленной записью) и обновленными итогами дня (totals)
+        или None в случае ошибки
+    """
+    if not rows:
+        return None
+
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Исправленный пользователем ответ AI больше не основание для словаря блюд
+            _forget_entries(cursor, user_id, [row['id'] for row in rows])
+
+            cursor.executemany('''
+                UPDATE food_entries 
+                SET dish_name = ?, calories = ?, protein = ?, fat = ?, carbs = ?, grams = ?,
+                    prompt_version = ?, source = ?
+                WHERE id = ? AND user_id = ?
+            ''', [
+                (
+                    row['name'], row['calories'], row['protein'], row['fat'], row['carbs'],
+                    row['grams'], row.get('prompt_version'), row.get('source', 'edit'),
+                    row['id'], user_id
+                )
+                for row in rows
+            ])
+
+            if cursor.rowcount != len(rows):
+                print(f"⚠️  Обновлено {cursor.rowcount} из {len(rows)} записей, изменения отменены")
+                conn.rollback()
+                return None
+
+            first_id = min(row['id'] for row in rows)
+            cursor.execute('''
+                SELECT d.id, d.day_number
+                FROM food_entries f
+                JOIN days d ON d.id = f.day_id
+                WHERE f.id = ?
+            ''', (first_id,))
+            day_id, day_number = cursor.fetchone()
+
+            cursor.execute('''
+                SELECT COUNT(*) FROM food_entries 
+                WHERE day_id = ? AND id < ?
+            ''', (day_id, first_id))
+            start_index = cursor.fetchone()[0]
+
+            totals = _get_day_totals(cursor, user_id, day_id)
+
+            conn.commit()
+            return {
+                'day_id': day_id,
+                'day_number': day_number,
+                'start_index': start_index,
+                'totals': totals,
+            }
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при обновлении записей о еде: {e}")
+        return None
+
+
+def replace_estimated_entries(user_id: int, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Заменяет примерные значения (source = 'fallback') ответом AI.
+
+    Запись, которую пользователь уже отредактировал или удалил, не меняется.
+    Итоги дня пересчитываются триггерами; замененные записи с source = 'ai'
+    добавляются в словарь блюд в той же транзакции (при правке они из него
+    вычитаются).
+
+    Args:
+        user_id: ID пользователя-владельца
+        rows: Список блюд с ключами id, name, calories, protein, fat, carbs, grams
+            (и необязательными prompt_version и source, по умолчанию 'ai')
+
+    Returns:
+        ID обновленных записей (пустой список в случае ошибки)
+    """
+    if not rows:
+        return []
+
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            updated = []
+            for row in rows:
+                cursor.execute('''
+                    UPDATE food_entries 
+                    SET dish_name = ?, calories = ?, protein = ?, fat = ?, carbs = ?, grams = ?,
+                        prompt_version = ?, source = ?
+                    WHERE id = ? AND user_id = ? AND source = 'fallback'
+                ''', (
+                    row['name'], row['calories'], row['protein'], row['fat'], row['carbs'],
+                    row['grams'], row.get('prompt_version'), row.get('source', 'ai'),
+                    row['id'], user_id
+                ))
+                if cursor.rowcount:
+                    updated.append(row['id'])
+
+            _learn_dishes(cursor, [
+                {**row, 'source': row.get('source', 'ai')} for row in rows if row['id'] in updated
+            ])
+
+            conn.commit()
+            return updated
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при замене примерных значений: {e}")
+        return []
 
 
 def delete_food_entries(entry_ids: List[int], user_id: int) -> bool:
     """Удаляет записи о еде по списку ID с проверкой пользователя"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Проверяем, что все записи принадлежат пользователю
-        placeholders = ','.join('?' * len(entry_ids))
-        cursor.execute(f'''
-            SELECT COUNT(*) FROM food_entries 
-            WHERE id IN ({placeholders}) AND user_id = ?
-        ''', (*entry_ids, user_id))
-        
-        count = cursor.fetchone()[0]
-        if count != len(entry_ids):
-            print(f"⚠️  Не все записи найдены или принадлежат пользователю {user_id}")
-            return False
-        
-        # Удаляем записи
-        cursor.execute(f'''
-            DELETE FROM food_entries 
-            WHERE id IN ({placeholders}) AND user_id = ?
-        ''', (*entry_ids, user_id))
-        
-        conn.commit()
-        deleted_count = cursor.rowcount
-        
-        if deleted_count == len(entry_ids):
-            print(f"✅ Удалено {deleted_count} записей о еде")
-            return True
-        else:
-            print(f"⚠️  Удалено {deleted_count} из {len(entry_ids)} записей")
-            return False
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Проверяем, что все записи принадлежат пользователю
+            placeholders = ','.join('?' * len(entry_ids))
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM food_entries 
+                WHERE id IN ({placeholders}) AND user_id = ?
+            ''', (*entry_ids, user_id))
+
+            count = cursor.fetchone()[0]
+            if count != len(entry_ids):
+                print(f"⚠️  Не все записи найдены или принадлежат пользователю {user_id}")
+                return False
+
+            # Удаляем записи
+            cursor.execute(f'''
+                DELETE FROM food_entries 
+                WHERE id IN ({placeholders}) AND user_id = ?
+            ''', (*entry_ids, user_id))
+
+            conn.commit()
+            deleted_count = cursor.rowcount
+
+            if deleted_count == len(entry_ids):
+                print(f"✅ Удалено {deleted_count} записей о еде")
+                return True
+            else:
+                print(f"⚠️  Удалено {deleted_count} из {len(entry_ids)} записей")
+                return False
     except sqlite3.Error as e:
         print(f"❌ Ошибка при удалении записей о еде: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
+
+
+def get_prompt_version_stats() -> List[Dict[str, Any]]:
+    """
+    Сводка записей о еде по версиям промпта (для сравнения версий).
+
+    Returns:
+        Список словарей с prompt_version (None - записи без AI), количеством
+        записей и средними КБЖУ и граммами; пустой список в случае ошибки
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT prompt_version, COUNT(*),
+                    AVG(calories), AVG(protein), AVG(fat), AVG(carbs), AVG(grams),
+                    MIN(created_at), MAX(created_at)
+                FROM food_entries
+                GROUP BY prompt_version
+                ORDER BY MIN(created_at)
+            ''')
+            return [
+                {
+                    'prompt_version': row[0],
+                    'entries': row[1],
+                    'avg_calories': round(row[2], 1),
+                    'avg_protein': round(row[3], 1),
+                    'avg_fat': round(row[4], 1),
+                    'avg_carbs': round(row[5], 1),
+                    'avg_grams': round(row[6], 1),
+                    'first_at': row[7],
+                    'last_at': row[8],
+                }
+                for row in cursor.fetchall()
+            ]
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при получении статистики по версиям промпта: {e}")
+        return []
@@ -0,0 +1,69 @@
+"""
+Запись приема пищи одной транзакцией.
+
+Объединяет шаги, которые раньше выполнялись отдельными подключениями:
+сохранение пользователя, определение (или перевод) текущего дня,
+подсчет уже записанных блюд, вставку новых и пополнение словаря блюд.
+"""
+
+import sqlite3
+from typing import List, Dict, Any, Optional
+from .connection import get_connection
+from .users import _upsert_user
+from .days import _resolve_current_day
+from .day_cache import day_cache
+from .food_entries import _insert_food_entries, _count_food_entries
+from .dish_dictionary import _learn_dishes
+
+
+def log_meal(
+    user_id: int,
+    username: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str],
+    dishes: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Сохраняет прием пищи пользователя одним коммитом.
+
+    Args:
+        user_id: ID пользователя
+        username: Имя пользователя
+        first_name: Имя
+        last_name: Фамилия
+        dishes: Список блюд для сохранения
+
+    Returns:
+        Словарь с day_id, day_number, start_index (сколько блюд было в дне
+        до этого приема пищи) и ids сохраненных записей или None в случае ошибки
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Берем блокировку записи сразу: два параллельных сообщения
+            # не смогут одновременно перевести пользователя на новый день
+            cursor.execute('BEGIN IMMEDIATE')
+
+            # Если текущий день есть в кэше, пользователь и день уже существуют
+            day = day_cache.get(user_id)
+            if day is None:
+                _upsert_user(cursor, user_id, username, first_name, last_name)
+                day = _resolve_current_day(cursor, user_id)
+
+            start_index = _count_food_entries(cursor, user_id, day.day_id)
+            saved_ids = _insert_food_entries(cursor, user_id, day.day_id, dishes)
+            # Ответы AI пополняют локальный словарь блюд
+            _learn_dishes(cursor, dishes)
+
+            conn.commit()
+            day_cache.put(user_id, day)
+            return {
+                'day_id': day.day_id,
+                'day_number': day.day_number,
+                'start_index': start_index,
+                'ids': saved_ids,
+            }
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при сохранении приема пищи: {e}")
+        return None
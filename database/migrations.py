@@ -0,0 +1,205 @@
+"""
+Версионированные миграции схемы базы данных.
+
+Версия схемы хранится в PRAGMA user_version. Каждая миграция применяется
+ровно один раз, в своей транзакции вместе с повышением версии, поэтому
+обычный запуск бота на актуальной базе сводится к чтению одного PRAGMA.
+
+Чтобы изменить схему, добавьте новую функцию в конец MIGRATIONS.
+Существующие миграции не редактируются.
+"""
+
+import sqlite3
+from typing import Callable, List
+
+from .totals import _create_day_totals_schema, _rebuild_day_totals
+from .days import _create_rollover_schema, _backfill_rollover
+from .analysis_cache import _create_analysis_cache_schema
+from .dish_dictionary import _create_dish_dictionary_schema, _rebuild_dish_dictionary
+
+# Версии промпта анализа (prompts/kbju_prompt.txt), выпущенные до миграции 7:
+# ai.prompts.prompt_version от текста промпта. Значения зафиксированы, чтобы
+# результат миграции не зависел от файлов промптов на момент ее запуска
+_KBJU_PROMPT_VERSIONS = ('196cd24d59cf',)
+
+
+def _column_names(cursor: sqlite3.Cursor, table: str) -> set:
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _001_base_schema(cursor: sqlite3.Cursor) -> None:
+    """Базовые таблицы users, days, food_entries (включая базы до введения миграций)"""
+    # Таблица пользователей
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            timezone TEXT DEFAULT 'Europe/Moscow',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Старые базы могли быть созданы без поля timezone
+    if 'timezone' not in _column_names(cursor, 'users'):
+        cursor.execute("ALTER TABLE users ADD COLUMN timezone TEXT DEFAULT 'Europe/Moscow'")
+
+    # Существующие пользователи без часового пояса получают Москву
+    cursor.execute('''
+        UPDATE users SET timezone = 'Europe/Moscow'
+        WHERE timezone IS NULL OR timezone = 'UTC'
+    ''')
+
+    # Таблица дней
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS days (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            day_number INTEGER DEFAULT 1,
+            is_current BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, day_number)
+        )
+    ''')
+
+    # Таблица записей о еде
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS food_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            day_id INTEGER,
+            dish_name TEXT NOT NULL,
+            calories INTEGER DEFAULT 400,
+            protein INTEGER DEFAULT 10,
+            fat INTEGER DEFAULT 10,
+            carbs INTEGER DEFAULT 10,
+            grams INTEGER DEFAULT 100,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (day_id) REFERENCES days (id)
+        )
+    ''')
+
+    # Старые базы могли быть созданы без поля grams
+    if 'grams' not in _column_names(cursor, 'food_entries'):
+        cursor.execute('ALTER TABLE food_entries ADD COLUMN grams INTEGER DEFAULT 100')
+
+    # Существующие записи без граммов получают значение по умолчанию
+    cursor.execute('''
+        UPDATE food_entries SET grams = 100
+        WHERE grams IS NULL
+    ''')
+
+    # Индексы для быстрого поиска
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_day ON food_entries(user_id, day_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_day ON food_entries(day_id)')
+
+
+def _002_day_totals(cursor: sqlite3.Cursor) -> None:
+    """Итоги дня в таблице days, поддерживаемые триггерами"""
+    if _create_day_totals_schema(cursor):
+        # Колонки только что добавлены - заполняем их по существующим записям
+        _rebuild_day_totals(cursor)
+
+
+def _003_day_rollover(cursor: sqlite3.Cursor) -> None:
+    """Предвычисленный момент перехода на новый день"""
+    if _create_rollover_schema(cursor):
+        _backfill_rollover(cursor)
+
+
+def _004_prompt_version(cursor: sqlite3.Cursor) -> None:
+    """Версия промпта, которым получена запись о еде"""
+    if 'prompt_version' not in _column_names(cursor, 'food_entries'):
+        cursor.execute('ALTER TABLE food_entries ADD COLUMN prompt_version TEXT')
+
+
+def _005_analysis_cache(cursor: sqlite3.Cursor) -> None:
+    """Кэш анализа текста (нормализованный текст + версия промпта -> блюда)"""
+    _create_analysis_cache_schema(cursor)
+
+
+def _006_dish_dictionary(cursor: sqlite3.Cursor) -> None:
+    """Источник записи о еде и локальный словарь блюд из ответов AI"""
+    if 'source' not in _column_names(cursor, 'food_entries'):
+        cursor.execute('ALTER TABLE food_entries ADD COLUMN source TEXT')
+        # Записи с версией промпта анализа (она есть в кэше анализа) получены
+        # от AI и не редактировались: правка меняет версию на версию промпта правки
+        cursor.execute('''
+            UPDATE food_entries SET source = 'ai'
+            WHERE prompt_version IN (SELECT DISTINCT prompt_version FROM analysis_cache)
+        ''')
+    _create_dish_dictionary_schema(cursor)
+    _rebuild_dish_dictionary(cursor)
+
+
+def _007_ai_source_backfill(cursor: sqlite3.Cursor) -> None:
+    """Источник 'ai' для записей с известной версией промпта анализа, а не только из кэша анализа"""
+    # Миграция 6 отмечала только версии, которые есть в кэше анализа: записи с версией,
+    # вытесненной из кэша по TTL, остались без источника и не попали в словарь блюд.
+    # Остальные записи без источника (до версий промпта, правки через AI) не трогаются
+    placeholders = ','.join('?' * len(_KBJU_PROMPT_VERSIONS))
+    cursor.execute(f'''
+        UPDATE food_entries SET source = 'ai'
+        WHERE source IS NULL AND (
+            prompt_version IN (SELECT DISTINCT prompt_version FROM analysis_cache)
+            OR prompt_version IN ({placeholders})
+        )
+    ''', _KBJU_PROMPT_VERSIONS)
+    if cursor.rowcount:
+        _rebuild_dish_dictionary(cursor)
+
+
+# Порядок важен: номер миграции = ее позиция в списке (начиная с 1)
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _001_base_schema,
+    _002_day_totals,
+    _003_day_rollover,
+    _004_prompt_version,
+    _005_analysis_cache,
+    _006_dish_dictionary,
+    _007_ai_source_backfill,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы базы (PRAGMA user_version)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Применяет недостающие миграции.
+
+    Args:
+        conn: Подключение к базе данных
+
+    Returns:
+        Количество примененных миграций
+    """
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"Версия схемы базы ({version}) новее, чем поддерживает код ({SCHEMA_VERSION})"
+        )
+
+    applied = 0
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        migration = MIGRATIONS[number - 1]
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            migration(cursor)
+            # user_version меняется в той же транзакции, что и сама миграция
+            cursor.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🔧 Применена миграция {number}: {migration.__doc__}")
+        applied += 1
+
+    return applied
@@ -0,0 +1,199 @@
+"""
+Итоги КБЖУ по дням.
+
+Суммы калорий/белков/жиров/углеводов и количество записей хранятся прямо
+в строке дня (таблица days) и поддерживаются триггерами на food_entries
+при вставке, изменении и удалении записей. Поэтому /dayresult читает
+итоги одной строкой по первичному ключу вместо SUM() по всем записям.
+
+Проверка и пересчет итогов для существующей базы:
+    python -m database.totals --check
+    python -m database.totals --rebuild
+"""
+
+import sqlite3
+import sys
+from typing import List, Dict, Any, Optional
+from .connection import get_connection
+
+# Колонки итогов в таблице days
+TOTALS_COLUMNS = (
+    ('total_calories', 'INTEGER NOT NULL DEFAULT 0'),
+    ('total_protein', 'INTEGER NOT NULL DEFAULT 0'),
+    ('total_fat', 'INTEGER NOT NULL DEFAULT 0'),
+    ('total_carbs', 'INTEGER NOT NULL DEFAULT 0'),
+    ('entries_count', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+TOTALS_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_food_entries_totals_insert
+    AFTER INSERT ON food_entries
+    BEGIN
+        UPDATE days SET
+            total_calories = total_calories + IFNULL(NEW.calories, 0),
+            total_protein = total_protein + IFNULL(NEW.protein, 0),
+            total_fat = total_fat + IFNULL(NEW.fat, 0),
+            total_carbs = total_carbs + IFNULL(NEW.carbs, 0),
+            entries_count = entries_count + 1
+        WHERE id = NEW.day_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_food_entries_totals_delete
+    AFTER DELETE ON food_entries
+    BEGIN
+        UPDATE days SET
+            total_calories = total_calories - IFNULL(OLD.calories, 0),
+            total_protein = total_protein - IFNULL(OLD.protein, 0),
+            total_fat = total_fat - IFNULL(OLD.fat, 0),
+            total_carbs = total_carbs - IFNULL(OLD.carbs, 0),
+            entries_count = entries_count - 1
+        WHERE id = OLD.day_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_food_entries_totals_update
+    AFTER UPDATE OF calories, protein, fat, carbs, day_id ON food_entries
+    BEGIN
+        UPDATE days SET
+            total_calories = total_calories - IFNULL(OLD.calories, 0),
+            total_protein = total_protein - IFNULL(OLD.protein, 0),
+            total_fat = total_fat - IFNULL(OLD.fat, 0),
+            total_carbs = total_carbs - IFNULL(OLD.carbs, 0),
+            entries_count = entries_count - 1
+        WHERE id = OLD.day_id;
+        UPDATE days SET
+            total_calories = total_calories + IFNULL(NEW.calories, 0),
+            total_protein = total_protein + IFNULL(NEW.protein, 0),
+            total_fat = total_fat + IFNULL(NEW.fat, 0),
+            total_carbs = total_carbs + IFNULL(NEW.carbs, 0),
+            entries_count = entries_count + 1
+        WHERE id = NEW.day_id;
+    END
+    ''',
+)
+
+# Пересчет итогов из food_entries (для одного дня или всех дней)
+_REBUILD_SQL = '''
+    UPDATE days SET
+        total_calories = IFNULL((SELECT SUM(calories) FROM food_entries WHERE day_id = days.id), 0),
+        total_protein = IFNULL((SELECT SUM(protein) FROM food_entries WHERE day_id = days.id), 0),
+        total_fat = IFNULL((SELECT SUM(fat) FROM food_entries WHERE day_id = days.id), 0),
+        total_carbs = IFNULL((SELECT SUM(carbs) FROM food_entries WHERE day_id = days.id), 0),
+        entries_count = (SELECT COUNT(*) FROM food_entries WHERE day_id = days.id)
+'''
+
+
+def _create_day_totals_schema(cursor: sqlite3.Cursor) -> bool:
+    """
+    Добавляет колонки итогов в days и триггеры на food_entries.
+
+    Returns:
+        True если колонки были добавлены только что (нужен пересчет)
+    """
+    cursor.execute('PRAGMA table_info(days)')
+    existing = {row[1] for row in cursor.fetchall()}
+
+    added = False
+    for name, definition in TOTALS_COLUMNS:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE days ADD COLUMN {name} {definition}')
+            added = True
+
+    for trigger_sql in TOTALS_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+    return added
+
+
+def _rebuild_day_totals(cursor: sqlite3.Cursor, day_id: Optional[int] = None) -> int:
+    """Пересчитывает итоги в рамках открытой транзакции, возвращает число дней"""
+    if day_id is None:
+        cursor.execute(_REBUILD_SQL)
+    else:
+        cursor.execute(_REBUILD_SQL + ' WHERE id = ?', (day_id,))
+    return cursor.rowcount
+
+
+def rebuild_day_totals(day_id: Optional[int] = None) -> int:
+    """
+    Пересчитывает сохраненные итоги из food_entries (backfill).
+
+    Args:
+        day_id: ID дня или None для всех дней
+
+    Returns:
+        Количество пересчитанных дней или -1 в случае ошибки
+    """
+    try:
+        with get_connection() as conn:
+            updated = _rebuild_day_totals(conn.cursor(), day_id)
+            conn.commit()
+            return updated
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при пересчете итогов дней: {e}")
+        return -1
+
+
+def check_day_totals() -> Optional[List[Dict[str, Any]]]:
+    """
+    Сверяет сохраненные итоги дней с фактическими суммами по food_entries.
+
+    Returns:
+        Список расхождений (пустой, если все сходится) или None в случае ошибки
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT d.id, d.user_id,
+                    d.total_calories, d.total_protein, d.total_fat, d.total_carbs, d.entries_count,
+                    IFNULL(SUM(f.calories), 0), IFNULL(SUM(f.protein), 0),
+                    IFNULL(SUM(f.fat), 0), IFNULL(SUM(f.carbs), 0), COUNT(f.id)
+                FROM days d
+                LEFT JOIN food_entries f ON f.day_id = d.id
+                GROUP BY d.id
+            ''')
+
+            mismatches = []
+            for row in cursor.fetchall():
+                stored, actual = row[2:7], row[7:12]
+                if tuple(stored) != tuple(actual):
+                    mismatches.append({
+                        'day_id': row[0],
+                        'user_id': row[1],
+                        'stored': dict(zip(('calories', 'protein', 'fat', 'carbs', 'count'), stored)),
+                        'actual': dict(zip(('calories', 'protein', 'fat', 'carbs', 'count'), actual)),
+                    })
+            return mismatches
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка при проверке итогов дней: {e}")
+        return None
+
+
+def main(argv: List[str]) -> int:
+    """Точка входа для python -m database.totals"""
+    from .connection import init_database
+    init_database()
+
+    if '--rebuild' in argv:
+        updated = rebuild_day_totals()
+        if updated < 0:
+            return 1
+        print(f"✅ Итоги пересчитаны для {updated} дней")
+
+    mismatches = check_day_totals()
+    if mismatches is None:
+        return 1
+    if mismatches:
+        for mismatch in mismatches:
+            print(f"⚠️  День {mismatch['day_id']}: сохранено {mismatch['stored']}, фактически {mismatch['actual']}")
+        print(f"❌ Расхождений: {len(mismatches)}. Запустите с --rebuild для пересчета")
+        return 1
+    print("✅ Итоги всех дней совпадают с записями")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -5,79 +5,93 @@
 import sqlite3
 from typing import Optional
 from .connection import get_connection
+from .day_cache import day_cache
 
 
 def save_user(user_id: int, username: Optional[str], first_name: Optional[str], last_name: Optional[str]) -> bool:
     """Сохранение информации о пользователе"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
-        if not cursor.fetchone():
-            cursor.execute('''
-                INSERT INTO users (user_id, username, first_name, last_name)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, username, first_name, last_name))
-            
-            # Создаем первый день для пользователя
-            from .days import _create_first_day
-            _create_first_day(cursor, user_id)
-        
-        conn.commit()
-        return True
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            if _upsert_user(cursor, user_id, username, first_name, last_name):
+                # Создаем первый день для пользователя
+                from .days import _create_first_day
+                _create_first_day(cursor, user_id)
+
+            conn.commit()
+            return True
     except sqlite3.Error as e:
         print(f"❌ Ошибка при сохранении пользователя: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
+
+
+def _upsert_user(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    username: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str]
+) -> bool:
+    """Добавляет пользователя, если его еще нет. Возвращает True для нового пользователя"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (user_id, username, first_name, last_name)
+        VALUES (?, ?, ?, ?)
+    ''', (user_id, username, first_name, last_name))
+    return cursor.rowcount == 1
+
+
+def _get_user_timezone(cursor: sqlite3.Cursor, user_id: int) -> str:
+    """Читает часовой пояс пользователя в рамках открытой транзакции"""
+    cursor.execute('SELECT timezone FROM users WHERE user_id = ?', (user_id,))
+    result = cursor.fetchone()
+
+    if result and result[0]:
+        return result[0]
+    return 'Europe/Moscow'  # По умолчанию Москва
 
 
 def get_user_timezone(user_id: int) -> str:
     """Получает часовой пояс пользователя"""
+    cached = day_cache.get_timezone(user_id)
+    if cached:
+        return cached
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT timezone FROM users WHERE user_id = ?', (user_id,))
-        result = cursor.fetchone()
-        
-        if result and result[0]:
-            return result[0]
-        return 'Europe/Moscow'  # По умолчанию Москва
+        with get_connection() as conn:
+            return _get_user_timezone(conn.cursor(), user_id)
     except sqlite3.Error as e:
         print(f"❌ Ошибка при получении часового пояса: {e}")
         return 'Europe/Moscow'
-    finally:
-        if conn:
-            conn.close()
 
 
 def set_user_timezone(user_id: int, timezone: str) -> bool:
     """Устанавливает часовой пояс пользователя"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Проверяем, существует ли пользователь
-        cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
-        if not cursor.fetchone():
-            # Создаем пользователя если его нет
-            cursor.execute('''
-                INSERT INTO users (user_id, timezone)
-                VALUES (?, ?)
-            ''', (user_id, timezone))
-        else:
-            cursor.execute('''
-                UPDATE users SET timezone = ? WHERE user_id = ?
-            ''', (timezone, user_id))
-        
-        conn.commit()
-        return True
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Проверяем, существует ли пользователь
+            cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
+            if not cursor.fetchone():
+                # Создаем пользователя если его нет
+                cursor.execute('''
+                    INSERT INTO users (user_id, timezone)
+                    VALUES (?, ?)
+                ''', (user_id, timezone))
+            else:
+                cursor.execute('''
+                    UPDATE users SET timezone = ? WHERE user_id = ?
+                ''', (timezone, user_id))
+
+            # Момент перехода на новый день зависит от часового пояса
+            from .days import _update_current_day_rollover
+            _update_current_day_rollover(cursor, user_id, timezone)
+
+            conn.commit()
+            # Часовой пояс и момент перехода изменились
+            day_cache.invalidate(user_id)
+            return True
     except sqlite3.Error as e:
         print(f"❌ Ошибка при установке часового пояса: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
@@ -49,13 +49,12 @@ async def handle_callback(update: Update, context: CallbackContext):
                 entry_ids = [int(x) for x in entry_ids_str.split(',')]
                 print(f"📝 entry_ids = {entry_ids}")
                 
-                # Проверяем, что все записи существуют
-                for entry_id in entry_ids:
-                    entry = database.get_food_entry_by_id(entry_id, user.id)
-                    if not entry:
-                        print(f"⚠️  Запись {entry_id} не найдена для пользователя {user.id}")
-                        await query.message.reply_text(texts.EDIT_NOT_FOUND_TEXT)
-                        return
+                # Проверяем одним запросом, что все записи существуют и принадлежат пользователю
+                entries = await database.aio.get_food_entries_by_ids(entry_ids, user.id)
+                if not entries:
+                    print(f"⚠️  Записи {entry_ids} не найдены для пользователя {user.id}")
+                    await query.message.reply_text(texts.EDIT_NOT_FOUND_TEXT)
+                    return
                 
                 # Устанавливаем сессию редактирования
                 SessionManager.set_session(
@@ -94,19 +93,18 @@ async def handle_callback(update: Update, context: CallbackContext):
                 entry_ids = [int(x) for x in entry_ids_str.split(',')]
                 print(f"🗑️  entry_ids = {entry_ids}")
                 
-                # Проверяем, что все записи существуют и принадлежат пользователю
-                for entry_id in entry_ids:
-                    entry = database.get_food_entry_by_id(entry_id, user.id)
-                    if not entry:
-                        print(f"⚠️  Запись {entry_id} не найдена для пользователя {user.id}")
-                        await query.message.reply_text(texts.DELETE_NOT_FOUND_TEXT)
-                        return
+                # Проверяем одним запросом, что все записи существуют и принадлежат пользователю
+                entries = await database.aio.get_food_entries_by_ids(entry_ids, user.id)
+                if not entries:
+                    print(f"⚠️  Записи {entry_ids} не найдены для пользователя {user.id}")
+                    await query.message.reply_text(texts.DELETE_NOT_FOUND_TEXT)
+                    return
                 
                 # Сохраняем chat_id перед удалением сообщения
                 chat_id = query.message.chat.id
                 
                 # Удаляем записи через сервис
-                success = food_service.delete_food_entries(user.id, entry_ids)
+                success = await food_service.delete_food_entries(user.id, entry_ids)
                 
                 if not success:
                     print(f"❌ Не удалось удалить записи {entry_ids}")
@@ -19,7 +19,7 @@ async def help_command(update: Update, context: CallbackContext):
 async def nextday_command(update: Update, context: CallbackContext):
     """Создать следующий день"""
     user = update.effective_user
-    day_id, day_number = database.create_next_day(user.id)
+    day_id, day_number = await database.aio.create_next_day(user.id)
     
     if day_id:
         await update.message.reply_text(
@@ -35,7 +35,7 @@ async def dayresult_command(update: Update, context: CallbackContext):
     user = update.effective_user
     
     # Получаем текущий день
-    day_id, day_number = database.get_or_create_current_day(user.id)
+    day_id, day_number = await database.aio.get_or_create_current_day(user.id)
     
     if not day_id:
         await update.message.reply_text(
@@ -44,10 +44,10 @@ async def dayresult_command(update: Update, context: CallbackContext):
         return
     
     # Получаем записи о еде за этот день
-    entries = database.get_food_entries_for_day(user.id, day_id)
+    entries = await database.aio.get_food_entries_for_day(user.id, day_id)
     
     # Получаем итоги за день
-    totals = database.get_day_totals(user.id, day_id)
+    totals = await database.aio.get_day_totals(user.id, day_id)
     
     # Сохраняем ID сообщения команды /dayresult для возможного удаления
     command_message_id = update.message.message_id
@@ -70,7 +70,7 @@ async def timezone_command(update: Update, context: CallbackContext):
     
     if not context.args:
         # Показываем текущий часовой пояс и инструкцию
-        current_tz = database.get_user_timezone(user.id)
+        current_tz = await database.aio.get_user_timezone(user.id)
         await update.message.reply_text(
             texts.get_timezone_info_text(current_tz)
         )
@@ -89,7 +89,7 @@ async def timezone_command(update: Update, context: CallbackContext):
         return
     
     # Устанавливаем часовой пояс
-    if database.set_user_timezone(user.id, timezone_str):
+    if await database.aio.set_user_timezone(user.id, timezone_str):
         await update.message.reply_text(
             texts.get_timezone_set_text(timezone_str)
         )
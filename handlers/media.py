@@ -8,6 +8,19 @@ import asyncio
 from telegram import Update
 from telegram.ext import CallbackContext
 from sessions import SessionManager
+from services.speech_service import SpeechService
+
+
+def get_speech_service(context: CallbackContext) -> SpeechService:
+    """
+    Возвращает общий SpeechService приложения.
+    Создается при запуске бота, здесь - только если приложение запущено без него.
+    """
+    speech_service = context.bot_data.get('speech_service')
+    if speech_service is None:
+        speech_service = SpeechService()
+        context.bot_data['speech_service'] = speech_service
+    return speech_service
 
 
 async def handle_photo(update: Update, context: CallbackContext):
@@ -86,9 +99,8 @@ async def handle_voice_message(update: Update, context: CallbackContext):
         
         print(f"📥 Голосовое сообщение скачано: {temp_file_path}")
         
-        # Распознаем речь
-        from services.speech_service import SpeechService
-        speech_service = SpeechService()
+        # Распознаем речь общим сервисом приложения
+        speech_service = get_speech_service(context)
         
         print(f"🔍 Начинаю распознавание речи из файла: {temp_file_path}")
         recognized_text = await speech_service.recognize_speech(temp_file_path)
@@ -114,46 +126,23 @@ async def handle_voice_message(update: Update, context: CallbackContext):
         
         # Обрабатываем распознанный текст напрямую, без изменения update.message
         # Используем ту же логику, что и в handle_food_message, но с нашим текстом
-        from services.food_service import FoodService
-        from services.user_service import UserService
-        from services.day_service import DayService
-        from handlers.messages import create_edit_delete_buttons
-        import database
+        from handlers.messages import create_edit_delete_buttons, food_service
         import texts
         
-        food_service = FoodService()
-        user_service = UserService()
-        day_service = DayService()
-        
-        # Сохраняем информацию о пользователе
-        user_service.save_user(
-            user_id=user.id,
-            username=user.username,
-            first_name=user.first_name,
-            last_name=user.last_name
-        )
-        
-        # Получаем или создаем текущий день
-        day_id, day_number = day_service.get_or_create_current_day(user.id)
-        
-        if not day_id:
-            await update.message.reply_text(texts.DATABASE_ERROR_TEXT)
-            return
-        
-        # Получаем количество уже сохраненных блюд за день ДО сохранения новых
-        existing_count = database.count_food_entries_for_day(user.id, day_id)
-        
         # Показываем статус "печатает"
         await update.message.chat.send_action(action="typing")
         
-        # Обрабатываем сообщение через сервис
-        dishes = await food_service.process_food_message(user.id, day_id, recognized_text)
+        # Анализируем текст и сохраняем прием пищи одной транзакцией
+        meal = await food_service.process_food_message(
+            user.id, user.username, user.first_name, user.last_name, recognized_text
+        )
         
-        if not dishes:
-            await update.message.reply_text(texts.AI_ERROR_TEXT)
+        if not meal or meal.get('error'):
+            await update.message.reply_text(texts.DATABASE_ERROR_TEXT if meal else texts.AI_ERROR_TEXT)
             return
         
-        print(f"🍽️  Сохранено {len(dishes)} блюд в базу...")
+        dishes = meal['dishes']
+        print(f"🍽️  Сохранено {len(dishes)} блюд в базу (источники: {meal['sources']})...")
         import sys
         sys.stdout.flush()
         
@@ -161,10 +150,12 @@ async def handle_voice_message(update: Update, context: CallbackContext):
         saved_ids = [dish.get('id') for dish in dishes if dish.get('id')]
         
         # Формируем ответ с учетом сквозной нумерации
-        response = texts.get_food_entries_saved_text(day_number, dishes, start_index=existing_count)
+        response = texts.get_food_entries_saved_text(meal['day_number'], dishes, start_index=meal['start_index'])
+        if meal['estimated']:
+            response += texts.get_estimated_values_text(food_service.ai_service.available)
         
         # Создаем кнопки для всего приема пищи
-        reply_markup = create_edit_delete_buttons(saved_ids, day_id)
+        reply_markup = create_edit_delete_buttons(saved_ids, meal['day_id'])
         
         # Отправляем одно сообщение с отчетом и кнопками
         await update.message.reply_text(response, reply_markup=reply_markup)
@@ -2,10 +2,13 @@
 Обработчики сообщений от пользователей.
 """
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from telegram import Message, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-import database
 import texts
+from config import AI_STREAM_ENABLED, STREAM_EDIT_INTERVAL
 from services.food_service import FoodService
 from services.user_service import UserService
 from services.day_service import DayService
@@ -43,6 +46,69 @@ def create_edit_delete_buttons(entry_ids: list, day_id: int, is_current_day: boo
     return InlineKeyboardMarkup(keyboard)
 
 
+class ProgressReply:
+    """
+    Ответ на сообщение о еде, который дополняется блюдами по мере
+    потокового ответа AI и в конце заменяется итоговым текстом с кнопками.
+    
+    Первое блюдо показывается сразу, следующие правки - не чаще раза
+    в STREAM_EDIT_INTERVAL секунд (лимиты Telegram на редактирование).
+    """
+    
+    def __init__(self, message: Message):
+        self.message = message
+        self.reply: Optional[Message] = None
+        self.dishes: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._sending = False
+        self._shown = 0
+        self._edited_at = 0.0
+    
+    async def add_dish(self, dish: Dict[str, Any]) -> None:
+        """Добавляет блюдо; обновление сообщения идет в фоне и не задерживает чтение ответа"""
+        self.dishes.append(dish)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._update())
+    
+    async def finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """Показывает итоговый текст (правкой сообщения с прогрессом или новым сообщением)"""
+        if self._task is not None and not self._task.done():
+            if self._sending:
+                await self._task
+            else:
+                self._task.cancel()
+        
+        if self.reply is not None:
+            try:
+                await self.reply.edit_text(text, reply_markup=reply_markup)
+                return
+            except Exception as e:
+                print(f"⚠️  Не удалось обновить сообщение с прогрессом: {e}")
+        await self.message.reply_text(text, reply_markup=reply_markup)
+    
+    async def _update(self) -> None:
+        while self._shown < len(self.dishes):
+            if self.reply is not None:
+                wait = STREAM_EDIT_INTERVAL - (time.monotonic() - self._edited_at)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            dishes = list(self.dishes)
+            self._sending = True
+            try:
+                text = texts.get_food_entries_progress_text(dishes)
+                if self.reply is None:
+                    self.reply = await self.message.reply_text(text)
+                else:
+                    await self.reply.edit_text(text)
+            except Exception as e:
+                print(f"⚠️  Не удалось показать прогресс: {e}")
+            finally:
+                self._sending = False
+            self._shown = len(dishes)
+            self._edited_at = time.monotonic()
+
+
 def create_cancel_button() -> InlineKeyboardMarkup:
     """Создает кнопку 'Отменить' для сессии редактирования"""
     keyboard = [[InlineKeyboardButton("Отменить", callback_data="cancel_edit")]]
@@ -76,47 +142,45 @@ async def handle_food_message(update: Update, context: CallbackContext):
     
     print(f"📩 Получено сообщение от {user.first_name}: '{user_message}'")
     
-    # Сохраняем информацию о пользователе
-    user_service.save_user(
-        user_id=user.id,
-        username=user.username,
-        first_name=user.first_name,
-        last_name=user.last_name
-    )
-    
-    # Получаем или создаем текущий день
-    day_id, day_number = day_service.get_or_create_current_day(user.id)
-    
-    if not day_id:
-        await update.message.reply_text(texts.DATABASE_ERROR_TEXT)
-        return
-    
-    # Получаем количество уже сохраненных блюд за день ДО сохранения новых (для сквозной нумерации)
-    existing_count = database.count_food_entries_for_day(user.id, day_id)
-    
     # Показываем статус "печатает"
     await update.message.chat.send_action(action="typing")
     
-    # Обрабатываем сообщение через сервис
-    dishes = await food_service.process_food_message(user.id, day_id, user_message)
+    # При потоковом ответе AI блюда показываются по мере получения
+    progress = ProgressReply(update.message) if AI_STREAM_ENABLED else None
     
-    if not dishes:
-        await update.message.reply_text(texts.AI_ERROR_TEXT)
+    # Анализируем сообщение и сохраняем прием пищи одной транзакцией
+    meal = await food_service.process_food_message(
+        user.id, user.username, user.first_name, user.last_name, user_message,
+        on_dish=progress.add_dish if progress else None
+    )
+    
+    if not meal or meal.get('error'):
+        error_text = texts.DATABASE_ERROR_TEXT if meal else texts.AI_ERROR_TEXT
+        if progress:
+            await progress.finish(error_text)
+        else:
+            await update.message.reply_text(error_text)
         return
     
-    print(f"🍽️  Сохранено {len(dishes)} блюд в базу...")
+    dishes = meal['dishes']
+    print(f"🍽️  Сохранено {len(dishes)} блюд в базу (источники: {meal['sources']})...")
     
     # Извлекаем ID сохраненных записей
     saved_ids = [dish.get('id') for dish in dishes if dish.get('id')]
     
     # Формируем ответ с учетом сквозной нумерации
-    response = texts.get_food_entries_saved_text(day_number, dishes, start_index=existing_count)
+    response = texts.get_food_entries_saved_text(meal['day_number'], dishes, start_index=meal['start_index'])
+    if meal['estimated']:
+        response += texts.get_estimated_values_text(food_service.ai_service.available)
     
     # Создаем кнопки для всего приема пищи
-    reply_markup = create_edit_delete_buttons(saved_ids, day_id)
+    reply_markup = create_edit_delete_buttons(saved_ids, meal['day_id'])
     
-    # Отправляем одно сообщение с отчетом и кнопками
-    await update.message.reply_text(response, reply_markup=reply_markup)
+    # Отправляем одно сообщение с отчетом и кнопками (или заменяем им прогресс)
+    if progress:
+        await progress.finish(response, reply_markup)
+    else:
+        await update.message.reply_text(response, reply_markup=reply_markup)
 
 
 async def handle_edit_message(update: Update, context: CallbackContext):
@@ -139,10 +203,14 @@ async def handle_edit_message(update: Update, context: CallbackContext):
     await update.message.chat.send_action(action="typing")
     
     # Обрабатываем редактирование через сервис
-    updated_dishes = await food_service.edit_food_entries(user.id, entry_ids, user_message)
-    
-    if not updated_dishes:
-        await update.message.reply_text(texts.EDIT_ERROR_TEXT)
+    edit_result = await food_service.edit_food_entries(user.id, entry_ids, user_message)
+    
+    if not edit_result:
+        # Пока AI недоступен, правка не может быть применена - говорим об этом прямо
+        if food_service.ai_service.available:
+            await update.message.reply_text(texts.EDIT_ERROR_TEXT)
+        else:
+            await update.message.reply_text(texts.EDIT_AI_UNAVAILABLE_TEXT)
         return
     
     # Удаляем сообщение с инструкцией "Введите изменения или уточнения"
@@ -159,18 +227,11 @@ async def handle_edit_message(update: Update, context: CallbackContext):
     # Отправляем сообщение об успешном обновлении
     await update.message.reply_text(texts.EDIT_SUCCESS_TEXT)
     
-    # Формируем обновленный текст сообщения
-    day_id_current, day_number = day_service.get_or_create_current_day(user.id)
-    
-    # Получаем количество блюд до этих записей для правильной нумерации
-    all_entries = database.get_food_entries_for_day(user.id, day_id)
-    start_index = 0
-    for e in all_entries:
-        if e[0] in entry_ids:
-            break
-        start_index += 1
-    
-    updated_text = texts.get_food_entries_saved_text(day_number, updated_dishes, start_index=start_index)
+    # Формируем обновленный текст сообщения (номер дня, нумерация и итоги дня - из результата обновления)
+    updated_text = texts.get_food_entries_saved_text(
+        edit_result['day_number'], edit_result['dishes'], start_index=edit_result['start_index']
+    )
+    updated_text += texts.get_edit_day_totals_text(edit_result['totals'])
     updated_text += texts.EDIT_UPDATED_SUFFIX
     
     # Кнопки показываются всегда
@@ -2,62 +2,129 @@
 Сервис для работы с едой и записями о еде.
 """
 
+from collections import Counter
 from typing import List, Dict, Any, Optional
 import database
-from ai.service import AIService
+from ai.service import AIService, DishCallback, get_ai_service
+from ai.dictionary import DishDictionary, dish_dictionary
+from ai.edits import LocalEditInterpreter, local_edits
+from ai.food_items import split_food_items
 
 
 class FoodService:
     """Сервис для работы с записями о еде"""
     
-    def __init__(self):
-        self.ai_service = AIService()
+    def __init__(
+        self,
+        ai_service: Optional[AIService] = None,
+        dictionary: Optional[DishDictionary] = None,
+        edits: Optional[LocalEditInterpreter] = None
+    ):
+        # По умолчанию используется общий AIService процесса (общая HTTP-сессия)
+        self.ai_service = ai_service or get_ai_service()
+        self.dictionary = dictionary or dish_dictionary
+        self.edits = edits or local_edits
     
     async def process_food_message(
         self,
         user_id: int,
-        day_id: int,
-        message_text: str
-    ) -> Optional[List[Dict[str, Any]]]:
+        username: Optional[str],
+        first_name: Optional[str],
+        last_name: Optional[str],
+        message_text: str,
+        on_dish: Optional[DishCallback] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Обрабатывает сообщение пользователя о еде.
         
         Args:
             user_id: ID пользователя
-            day_id: ID дня
+            username: Имя пользователя
+            first_name: Имя
+            last_name: Фамилия
             message_text: Текст сообщения пользователя
+            on_dish: Вызывается для каждого блюда до сохранения, как только
+                оно найдено в словаре или пришло в потоковом ответе AI
             
         Returns:
-            Список сохраненных записей о еде или None в случае ошибки
+            Словарь с day_id, day_number, start_index, списком сохраненных
+            блюд с их ID и источником (dishes: source = 'dictionary', 'ai',
+            'ai_cached' или 'fallback'), количеством блюд по источникам (sources) и
+            признаком примерных значений (estimated: AI не ответил хотя бы
+            для одного блюда, такие блюда пересчитываются в фоне),
+            {'error': 'database'}, если блюда разобраны, но не сохранились,
+            или None, если сообщение не удалось разобрать
         """
-        # Анализируем текст через AI
-        dishes = await self.ai_service.analyze_food_text(message_text)
+        # Известные блюда считаем по словарю, остальное - через AI
+        dishes = await self._analyze(message_text, on_dish)
         
         if not dishes:
             return None
         
-        # Сохраняем в базу данных
-        saved_ids = database.save_food_entries(user_id, day_id, dishes)
+        # Пользователь, текущий день и блюда сохраняются одной транзакцией
+        meal = await database.aio.log_meal(user_id, username, first_name, last_name, dishes)
         
-        if not saved_ids:
-            return None
+        if not meal or not meal['ids']:
+            # Разбор удался, не удалось сохранить - это другая ошибка для пользователя
+            return {'error': 'database'}
+        
+        saved_dishes = [
+            {**dish, 'id': entry_id}
+            for dish, entry_id in zip(dishes, meal['ids'])
+        ]
+        estimated = any(dish.get('source') == 'fallback' for dish in dishes)
+        if estimated:
+            # Примерные значения пересчитаются через AI, когда он снова ответит
+            self.ai_service.reanalyzer.schedule(user_id, saved_dishes)
         
         # Возвращаем сохраненные блюда с их ID
-        result = []
-        for i, dish in enumerate(dishes):
-            result.append({
-                **dish,
-                'id': saved_ids[i] if i < len(saved_ids) else None
-            })
-        
-        return result
+        return {
+            'day_id': meal['day_id'],
+            'day_number': meal['day_number'],
+            'start_index': meal['start_index'],
+            'dishes': saved_dishes,
+            'sources': dict(Counter(dish.get('source') for dish in dishes)),
+            'estimated': estimated,
+        }
+    
+    async def _analyze(self, message_text: str, on_dish: Optional[DishCallback] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Разбирает сообщение: пункты, уверенно найденные в словаре блюд,
+        считаются локально, в GigaChat уходят только остальные.
+        Блюда AI встают на место первого не найденного пункта.
+        """
+        items = split_food_items(message_text)
+        local = await self.dictionary.resolve(items)
+        
+        leftovers = [item.text for item, dish in zip(items, local) if dish is None]
+        if len(leftovers) == len(items):
+            # В словаре ничего не нашлось - анализируем исходный текст целиком
+            return await self.ai_service.analyze_food_text(message_text, on_dish)
+        
+        if on_dish is not None:
+            for dish in local:
+                if dish is not None:
+                    await on_dish(dish)
+        
+        ai_dishes = await self.ai_service.analyze_food_text(', '.join(leftovers), on_dish) if leftovers else []
+        if leftovers and not ai_dishes:
+            return None
+        
+        dishes = []
+        for dish in local:
+            if dish is not None:
+                dishes.append(dish)
+            elif ai_dishes:
+                dishes.extend(ai_dishes)
+                ai_dishes = []
+        return dishes
     
     async def edit_food_entries(
         self,
         user_id: int,
         entry_ids: List[int],
         edit_text: str
-    ) -> Optional[List[Dict[str, Any]]]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Редактирует записи о еде.
         
@@ -67,42 +134,35 @@ class FoodService:
             edit_text: Текст с изменениями
             
         Returns:
-            Список обновленных записей или None в случае ошибки
+            Словарь со списком обновленных блюд (dishes), day_id, day_number,
+            start_index и итогами дня (totals) или None в случае ошибки
         """
-        # Получаем оригинальные записи
-        original_entries = []
-        for entry_id in entry_ids:
-            entry = database.get_food_entry_by_id(entry_id, user_id)
-            if not entry:
-                return None
-            original_entries.append(entry)
+        # Получаем оригинальные записи одним запросом (с проверкой владельца)
+        original_entries = await database.aio.get_food_entries_by_ids(entry_ids, user_id)
+        if not original_entries:
+            return None
         
-        # Обрабатываем редактирование через AI
-        updated_dishes = await self.ai_service.process_edit_meal(original_entries, edit_text)
+        # Правки количества ("200г", "x2", "без сахара") применяются сразу, остальные - через AI
+        updated_dishes = self.edits.apply(original_entries, edit_text)
+        if updated_dishes is None:
+            updated_dishes = await self.ai_service.process_edit_meal(original_entries, edit_text)
         
         if not updated_dishes or len(updated_dishes) != len(entry_ids):
             return None
         
-        # Обновляем записи в базе данных
-        for i, entry_id in enumerate(entry_ids):
-            updated_dish = updated_dishes[i]
-            success = database.update_food_entry(
-                entry_id=entry_id,
-                user_id=user_id,
-                dish_name=updated_dish['name'],
-                calories=updated_dish['calories'],
-                protein=updated_dish['protein'],
-                fat=updated_dish['fat'],
-                carbs=updated_dish['carbs'],
-                grams=updated_dish['grams']
-            )
-            
-            if not success:
-                return None
+        # Обновляем все записи одной транзакцией (все или ничего)
+        rows = [
+            {**updated_dish, 'id': entry_id}
+            for entry_id, updated_dish in zip(entry_ids, updated_dishes)
+        ]
+        result = await database.aio.update_food_entries(user_id, rows)
+        
+        if not result:
+            return None
         
-        return updated_dishes
+        return {**result, 'dishes': updated_dishes}
     
-    def delete_food_entries(self, user_id: int, entry_ids: List[int]) -> bool:
+    async def delete_food_entries(self, user_id: int, entry_ids: List[int]) -> bool:
         """
         Удаляет записи о еде.
         
@@ -113,4 +173,4 @@ class FoodService:
         Returns:
             True если удаление успешно
         """
-        return database.delete_food_entries(entry_ids, user_id)
+        return await database.aio.delete_food_entries(entry_ids, user_id)
@@ -6,18 +6,78 @@
 import os
 import asyncio
 import aiohttp
-import uuid
-import time
-from typing import Optional
-from config import SALUTEspeech_API_KEY, DEBUG, AI_TIMEOUT
+from typing import Any, Dict, Optional
+from config import (
+    SALUTEspeech_API_KEY, DEBUG, AI_TIMEOUT, SALUTE_SPEECH_URL,
+    AI_CONNECTION_LIMIT, AI_KEEPALIVE_TIMEOUT, AI_DNS_CACHE_TTL,
+    AI_RETRY_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY,
+    AI_BREAKER_THRESHOLD, AI_BREAKER_RESET_TIMEOUT
+)
+from ai.auth import TokenManager
+from ai.resilience import APIError, CircuitBreaker, CircuitOpenError, Deadline, ResilientCaller
+
+# Дедлайн распознавания со всеми повторами (секунд)
+SPEECH_DEADLINE = AI_TIMEOUT * 2
 
 
 class SpeechService:
-    """Сервис для распознавания речи через SaluteSpeech API"""
+    """
+    Сервис для распознавания речи через SaluteSpeech API.
+    
+    Один экземпляр на процесс (хранится в application.bot_data['speech_service']):
+    HTTP-сессия и токен общие для всех голосовых сообщений.
+    """
     
     def __init__(self):
-        self.access_token = None
-        self.token_expires_at = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Повторы и свой circuit breaker: сбой SaluteSpeech не влияет на GigaChat
+        self.breaker = CircuitBreaker(AI_BREAKER_THRESHOLD, AI_BREAKER_RESET_TIMEOUT)
+        self.resilience = ResilientCaller(
+            AI_RETRY_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY,
+            SPEECH_DEADLINE, self.breaker
+        )
+        self.token_manager = TokenManager(
+            SALUTEspeech_API_KEY, 'SALUTE_SPEECH_PERS', self._get_session, caller=self.resilience
+        )
+        
+        # Счетчики распознаваний
+        self.recognitions = 0
+        self.token_reused = 0
+        self.token_fetched = 0
+    
+    async def start(self) -> None:
+        """Открывает HTTP-сессию и запускает фоновое обновление токена (при запуске бота)"""
+        self._get_session()
+        self.token_manager.start()
+    
+    async def close(self) -> None:
+        """Останавливает обновление токена и закрывает HTTP-сессию (при остановке бота)"""
+        await self.token_manager.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая ее при первом обращении"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=AI_CONNECTION_LIMIT,
+                keepalive_timeout=AI_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=AI_DNS_CACHE_TTL,
+                ssl=False
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики распознаваний и переиспользования токена"""
+        return {
+            'recognitions': self.recognitions,
+            'token_reused': self.token_reused,
+            'token_fetched': self.token_fetched,
+            'token': self.token_manager.stats(),
+            'resilience': self.resilience.stats(),
+        }
     
     async def recognize_speech(self, audio_file_path: str) -> Optional[str]:
         """
@@ -34,11 +94,20 @@ class SpeechService:
         sys.stdout.flush()
         
         try:
+            self.recognitions += 1
+            
             # Получаем токен доступа
+            refreshes = self.token_manager.refreshes
             token = await self._get_access_token()
+            if self.token_manager.refreshes == refreshes:
+                self.token_reused += 1
+            else:
+                self.token_fetched += 1
             
-            # Отправляем запрос на распознавание
-            text = await self._call_recognition_api(token, audio_file_path)
+            # Отправляем запрос на распознавание (временные ошибки повторяются)
+            text = await self.resilience.call(
+                lambda deadline: self._call_recognition_api(token, audio_file_path, deadline)
+            )
             
             if text:
                 print(f"✅ Распознан текст: '{text}'")
@@ -48,7 +117,11 @@ class SpeechService:
                 print("⚠️  Пустой ответ от API распознавания")
                 sys.stdout.flush()
                 return None
-                
+        
+        except CircuitOpenError:
+            print("⚠️  SaluteSpeech недоступен, распознавание пропущено")
+            sys.stdout.flush()
+            return None
         except Exception as e:
             print(f"❌ Ошибка распознавания речи: {e}")
             import traceback
@@ -58,70 +131,17 @@ class SpeechService:
     
     async def _get_access_token(self) -> str:
         """
-        Получаем access token для SaluteSpeech API.
-        POST https://ngw.devices.sberbank.ru:9443/api/v2/oauth
-        Authorization: Basic {authorization_key}
-        scope: SALUTE_SPEECH_PERS
+        Получаем access token для SaluteSpeech API (scope SALUTE_SPEECH_PERS)
+        через TokenManager: токен переиспользуется и обновляется в фоне
         """
-        # Если токен ещё действителен (30 минут - 5 минут запаса)
-        if self.access_token and time.time() < self.token_expires_at - 300:
-            return self.access_token
-        
-        if not SALUTEspeech_API_KEY:
-            raise ValueError("SALUTEspeech_API_KEY не установлен в .env")
-        
-        # Создаем уникальный RqUID
-        rquid = str(uuid.uuid4())
-        
-        # Заголовки как в документации
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Accept': 'application/json',
-            'RqUID': rquid,
-            'Authorization': f'Basic {SALUTEspeech_API_KEY}'
-        }
-        
-        # Данные формы - правильный scope для SaluteSpeech
-        data = {'scope': 'SALUTE_SPEECH_PERS'}
-        
-        print(f"🔑 Запрашиваю токен SaluteSpeech...")
-        print(f"📋 Scope: SALUTE_SPEECH_PERS")
-        import sys
-        sys.stdout.flush()
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    'https://ngw.devices.sberbank.ru:9443/api/v2/oauth',
-                    headers=headers,
-                    data=data,
-                    ssl=False,
-                    timeout=AI_TIMEOUT
-                ) as response:
-                    
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Ошибка получения токена: {response.status} - {error_text}")
-                    
-                    result = await response.json()
-                    
-                    # Сохраняем токен
-                    self.access_token = result['access_token']
-                    # expires_at в миллисекундах, переводим в секунды
-                    self.token_expires_at = result.get('expires_at', 0) / 1000
-                    
-                    print(f"✅ Токен SaluteSpeech получен, действителен до: {time.ctime(self.token_expires_at)}")
-                    import sys
-                    sys.stdout.flush()
-                    return self.access_token
-                    
-            except Exception as e:
-                print(f"❌ Ошибка при получении токена SaluteSpeech: {e}")
-                import sys
-                sys.stdout.flush()
-                raise
+        return await self.token_manager.get_token()
     
-    async def _call_recognition_api(self, access_token: str, audio_file_path: str) -> Optional[str]:
+    async def _call_recognition_api(
+        self,
+        access_token: str,
+        audio_file_path: str,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[str]:
         """
         Отправляет аудиофайл на распознавание речи.
         POST https://smartspeech.sber.ru/rest/v1/speech:recognize
@@ -182,103 +202,103 @@ class SpeechService:
         }
         
         print(f"📤 Отправляю аудио на распознавание (размер: {len(audio_data)} байт, формат: {format_param})...")
-        print(f"🔗 URL: https://smartspeech.sber.ru/rest/v1/speech:recognize")
+        print(f"🔗 URL: {SALUTE_SPEECH_URL}")
         print(f"📋 Параметры: {params}")
         print(f"📋 Content-Type: {content_type}")
         import sys
         sys.stdout.flush()
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    'https://smartspeech.sber.ru/rest/v1/speech:recognize',
-                    headers=headers,
-                    params=params,
-                    data=audio_data,
-                    ssl=False,
-                    timeout=AI_TIMEOUT * 2  # Распознавание может занять больше времени
-                ) as response:
-                    
-                    response_text = await response.text()
-                    print(f"📥 Статус ответа: {response.status}")
-                    print(f"📋 Тело ответа (первые 500 символов): {response_text[:500]}")
-                    
-                    if response.status != 200:
-                        print(f"❌ Ошибка API распознавания: {response.status}")
-                        print(f"📋 Полный ответ: {response_text}")
-                        raise Exception(f"Ошибка API распознавания: {response.status} - {response_text}")
-                    
-                    try:
-                        result = await response.json()
-                    except Exception as json_error:
-                        print(f"❌ Ошибка парсинга JSON: {json_error}")
-                        print(f"📋 Ответ был: {response_text}")
-                        raise
-                    
-                    print(f"📥 Ответ получен, извлекаю текст...")
-                    print(f"📋 Полный ответ API: {result}")
-                    
-                    # Извлекаем распознанный текст
-                    # Формат ответа может быть разным, проверяем несколько вариантов
-                    if 'result' in result:
-                        if isinstance(result['result'], str):
-                            print(f"✅ Найден текст в result (str): '{result['result']}'")
-                            return result['result']
-                        elif isinstance(result['result'], list) and len(result['result']) > 0:
-                            # Если результат - массив, берем первый элемент
-                            first_result = result['result'][0]
-                            if isinstance(first_result, dict) and 'alternatives' in first_result:
-                                alternatives = first_result['alternatives']
-                                if len(alternatives) > 0:
-                                    text = alternatives[0].get('text', '')
-                                    print(f"✅ Найден текст в result[0].alternatives[0].text: '{text}'")
-                                    return text
-                            elif isinstance(first_result, str):
-                                print(f"✅ Найден текст в result[0] (str): '{first_result}'")
-                                return first_result
-                        elif isinstance(result['result'], dict):
-                            # Если результат - объект с полем text
-                            if 'text' in result['result']:
-                                text = result['result']['text']
-                                print(f"✅ Найден текст в result.text: '{text}'")
+        session = self._get_session()
+        try:
+            async with session.post(
+                SALUTE_SPEECH_URL,
+                headers=headers,
+                params=params,
+                data=audio_data,
+                # Распознавание может занять больше времени; не дольше дедлайна запроса
+                timeout=aiohttp.ClientTimeout(total=deadline.cap(SPEECH_DEADLINE) if deadline else SPEECH_DEADLINE)
+            ) as response:
+                
+                response_text = await response.text()
+                print(f"📥 Статус ответа: {response.status}")
+                print(f"📋 Тело ответа (первые 500 символов): {response_text[:500]}")
+                
+                if response.status != 200:
+                    print(f"❌ Ошибка API распознавания: {response.status}")
+                    print(f"📋 Полный ответ: {response_text}")
+                    raise APIError(response.status, f"Ошибка API распознавания: {response.status} - {response_text}")
+                
+                try:
+                    result = await response.json()
+                except Exception as json_error:
+                    print(f"❌ Ошибка парсинга JSON: {json_error}")
+                    print(f"📋 Ответ был: {response_text}")
+                    raise
+                
+                print(f"📥 Ответ получен, извлекаю текст...")
+                print(f"📋 Полный ответ API: {result}")
+                
+                # Извлекаем распознанный текст
+                # Формат ответа может быть разным, проверяем несколько вариантов
+                if 'result' in result:
+                    if isinstance(result['result'], str):
+                        print(f"✅ Найден текст в result (str): '{result['result']}'")
+                        return result['result']
+                    elif isinstance(result['result'], list) and len(result['result']) > 0:
+                        # Если результат - массив, берем первый элемент
+                        first_result = result['result'][0]
+                        if isinstance(first_result, dict) and 'alternatives' in first_result:
+                            alternatives = first_result['alternatives']
+                            if len(alternatives) > 0:
+                                text = alternatives[0].get('text', '')
+                                print(f"✅ Найден текст в result[0].alternatives[0].text: '{text}'")
                                 return text
-                            elif 'alternatives' in result['result']:
-                                alternatives = result['result']['alternatives']
-                                if len(alternatives) > 0:
-                                    text = alternatives[0].get('text', '')
-                                    print(f"✅ Найден текст в result.alternatives[0].text: '{text}'")
-                                    return text
-                    
-                    # Альтернативный формат ответа
-                    if 'text' in result:
-                        text = result['text']
-                        print(f"✅ Найден текст в text: '{text}'")
-                        return text
-                    
-                    # Еще один вариант - может быть массив результатов напрямую
-                    if isinstance(result, list) and len(result) > 0:
-                        first_item = result[0]
-                        if isinstance(first_item, dict) and 'text' in first_item:
-                            text = first_item['text']
-                            print(f"✅ Найден текст в [0].text: '{text}'")
+                        elif isinstance(first_result, str):
+                            print(f"✅ Найден текст в result[0] (str): '{first_result}'")
+                            return first_result
+                    elif isinstance(result['result'], dict):
+                        # Если результат - объект с полем text
+                        if 'text' in result['result']:
+                            text = result['result']['text']
+                            print(f"✅ Найден текст в result.text: '{text}'")
                             return text
-                        elif isinstance(first_item, str):
-                            print(f"✅ Найден текст в [0] (str): '{first_item}'")
-                            return first_item
-                    
-                    print(f"⚠️  Неожиданный формат ответа: {result}")
-                    print(f"⚠️  Тип результата: {type(result)}")
-                    if isinstance(result, dict):
-                        print(f"⚠️  Ключи в результате: {list(result.keys())}")
-                    import sys
-                    sys.stdout.flush()
-                    return None
-                    
-            except Exception as e:
-                print(f"❌ Ошибка при вызове API распознавания: {e}")
-                import traceback
-                print(f"📋 Трассировка ошибки:\n{traceback.format_exc()}")
+                        elif 'alternatives' in result['result']:
+                            alternatives = result['result']['alternatives']
+                            if len(alternatives) > 0:
+                                text = alternatives[0].get('text', '')
+                                print(f"✅ Найден текст в result.alternatives[0].text: '{text}'")
+                                return text
+                
+                # Альтернативный формат ответа
+                if 'text' in result:
+                    text = result['text']
+                    print(f"✅ Найден текст в text: '{text}'")
+                    return text
+                
+                # Еще один вариант - может быть массив результатов напрямую
+                if isinstance(result, list) and len(result) > 0:
+                    first_item = result[0]
+                    if isinstance(first_item, dict) and 'text' in first_item:
+                        text = first_item['text']
+                        print(f"✅ Найден текст в [0].text: '{text}'")
+                        return text
+                    elif isinstance(first_item, str):
+                        print(f"✅ Найден текст в [0] (str): '{first_item}'")
+                        return first_item
+                
+                print(f"⚠️  Неожиданный формат ответа: {result}")
+                print(f"⚠️  Тип результата: {type(result)}")
+                if isinstance(result, dict):
+                    print(f"⚠️  Ключи в результате: {list(result.keys())}")
                 import sys
                 sys.stdout.flush()
-                raise
-    
+                return None
+                
+        except Exception as e:
+            print(f"❌ Ошибка при вызове API распознавания: {e}")
+            import traceback
+            print(f"📋 Трассировка ошибки:\n{traceback.format_exc()}")
+            import sys
+            sys.stdout.flush()
+            raise
+
@@ -9,7 +9,7 @@ import database
 class UserService:
     """Сервис для работы с пользователями"""
     
-    def save_user(
+    async def save_user(
         self,
         user_id: int,
         username: Optional[str],
@@ -28,9 +28,9 @@ class UserService:
         Returns:
             True если сохранение успешно
         """
-        return database.save_user(user_id, username, first_name, last_name)
+        return await database.aio.save_user(user_id, username, first_name, last_name)
     
-    def get_timezone(self, user_id: int) -> str:
+    async def get_timezone(self, user_id: int) -> str:
         """
         Получает часовой пояс пользователя.
         
@@ -40,9 +40,9 @@ class UserService:
         Returns:
             Название часового пояса
         """
-        return database.get_user_timezone(user_id)
+        return await database.aio.get_user_timezone(user_id)
     
-    def set_timezone(self, user_id: int, timezone: str) -> bool:
+    async def set_timezone(self, user_id: int, timezone: str) -> bool:
         """
         Устанавливает часовой пояс пользователя.
         
@@ -53,4 +53,4 @@ class UserService:
         Returns:
             True если установка успешна
         """
-        return database.set_user_timezone(user_id, timezone)
+        return await database.aio.set_user_timezone(user_id, timezone)
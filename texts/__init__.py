@@ -8,7 +8,9 @@ from .telegram_texts import (
     HELP_TEXT,
     get_processing_text,
     get_food_entries_saved_text,
+    get_food_entries_progress_text,
     AI_ERROR_TEXT,
+    get_estimated_values_text,
     get_nextday_success_text,
     NEXTDAY_ERROR_TEXT,
     get_dayresult_no_entries_text,
@@ -23,9 +25,11 @@ from .telegram_texts import (
     EDIT_SUCCESS_TEXT,
     EDIT_CANCEL_TEXT,
     EDIT_ERROR_TEXT,
+    EDIT_AI_UNAVAILABLE_TEXT,
     EDIT_NOT_CURRENT_DAY_TEXT,
     EDIT_NOT_FOUND_TEXT,
     EDIT_UPDATED_SUFFIX,
+    get_edit_day_totals_text,
     DELETE_SUCCESS_TEXT,
     DELETE_ERROR_TEXT,
     DELETE_NOT_FOUND_TEXT,
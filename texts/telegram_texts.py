@@ -53,8 +53,22 @@ def get_food_entries_saved_text(day_number: int, dishes: list, start_index: int
     response += f"Всего:\n{total_calories} ккал, {total_protein} белков, {total_fat} жиров, {total_carbs} углеводов"
     return response
 
+def get_food_entries_progress_text(dishes: list) -> str:
+    """Форматирует блюда, полученные до конца ответа AI (прогресс)"""
+    response = "⏳ Считаю КБЖУ...\n\n"
+    for i, dish in enumerate(dishes, 1):
+        response += f"{i}. {dish['name']} – {dish['grams']}г\n"
+        response += f"{dish['calories']} ккал, {dish['protein']} белков, {dish['fat']} жиров, {dish['carbs']} углеводов\n\n"
+    return response.rstrip()
+
 AI_ERROR_TEXT = "❌ Не удалось обработать запрос. Использую приблизительные значения."
 
+def get_estimated_values_text(ai_available: bool) -> str:
+    """Пометка для блюд с примерными значениями (AI не ответил)"""
+    if ai_available:
+        return "\n\n⚠️ Часть значений примерная (по таблице продуктов): AI не ответил вовремя. Они пересчитаются автоматически, когда AI ответит."
+    return "\n\n⚠️ AI сейчас недоступен, значения примерные (по таблице продуктов). Они пересчитаются автоматически, когда сервис восстановится."
+
 # ==== КОМАНДА /nextday ====
 def get_nextday_success_text(day_number: int) -> str:
     return (
@@ -128,10 +142,19 @@ EDIT_PROMPT_TEXT = "Введите изменения или уточнения.
 EDIT_SUCCESS_TEXT = "✅ Информация обновлена!"
 EDIT_CANCEL_TEXT = "❌ Редактирование отменено."
 EDIT_ERROR_TEXT = "❌ Не удалось обработать редактирование. Попробуйте позже."
+EDIT_AI_UNAVAILABLE_TEXT = "❌ AI сейчас недоступен, изменения не применены. Количество можно поправить и сейчас: «200г», «x2», «половина», «без сахара»."
 EDIT_NOT_CURRENT_DAY_TEXT = "❌ Редактирование доступно только для записей текущего дня."
 EDIT_NOT_FOUND_TEXT = "❌ Запись не найдена или у вас нет доступа к ней."
 EDIT_UPDATED_SUFFIX = "\n\nОбновлено"
 
+def get_edit_day_totals_text(totals: dict) -> str:
+    """Итоги дня после правки (из update_food_entries)"""
+    return (
+        f"\n\nИтого за день:\n"
+        f"{totals['calories']} ккал, {totals['protein']} белков, {totals['fat']} жиров, {totals['carbs']} углеводов\n"
+        f"Всего блюд: {totals['count']}"
+    )
+
 # ==== УДАЛЕНИЕ ====
 DELETE_SUCCESS_TEXT = "🗑️ Прием пищи удален"
 DELETE_ERROR_TEXT = "❌ Не удалось удалить прием пищи. Попробуйте позже."